@@ -2,37 +2,39 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 from streamlit_calendar import calendar
+from booking_store import get_booking_store
+import availability
+import booking_api
+import booking_service
+import recurrence
+from calendar_events import create_calendar_events, bookings_in_window, month_window
+import instrumentation
 
-# Define available meeting rooms
-meeting_rooms = ["DFO Conference Room (Max 16 Pax)", "I-Room (Max 10 Pax)"]
-
-# Load bookings data
-try:
-    bookings = pd.read_csv("bookings.csv")
-    bookings['Start Time'] = pd.to_datetime(bookings['Start Time'])
-    bookings['End Time'] = pd.to_datetime(bookings['End Time'])
-    bookings['Contact Number'] = bookings['Contact Number'].astype(str)  # Ensure contact number is treated as string
-except FileNotFoundError:
-    bookings = pd.DataFrame(columns=["Room", "Date", "Start Time", "End Time", "Booked By", "Meeting Title", "Contact Number", "Password"])
-
-# Load blocked dates
-try:
-    blocked_dates_df = pd.read_csv("blocked_dates.csv")
-    blocked_dates = set(pd.to_datetime(blocked_dates_df['Blocked Date']).dt.date)
-except FileNotFoundError:
-    blocked_dates = set()
-
-# Load transaction log
-try:
-    transaction_log = pd.read_csv("transaction_log.csv")
-    transaction_log['Contact Number'] = transaction_log['Contact Number'].astype(str)  # Ensure contact number is treated as string
-except FileNotFoundError:
-    transaction_log = pd.DataFrame(columns=["Action", "Room", "Date", "Start Time", "End Time", "User", "Meeting Title", "Contact Number", "Password", "Timestamp"])
-
-# Generate time options in 30-minute intervals between 8 AM and 6 PM
+# Time this rerun (no-op unless profiling is enabled, see instrumentation.py)
+instrumentation.begin_rerun("Bookingapp")
+
+# Load bookings data from the shared in-process store (parsed once per server, not per rerun)
+booking_store = get_booking_store()
+bookings = booking_store.refresh()
+
+# Function to serve the HTTP API (booking_api.py) from the shared store when BOOKING_API_PORT is set (once per server process)
+@st.cache_resource(show_spinner=False)
+def start_booking_api():
+    return booking_api.start_from_env(booking_store)
+
+start_booking_api()
+
+# Meeting rooms, the maximum number of people each room holds and their calendar colours (room registry, rooms.csv)
+meeting_rooms = booking_store.room_names
+room_capacity = booking_store.room_capacity
+room_colors = booking_store.room_colors
+
+# Shared business-day calendar: weekends and blocked dates, for every room or a single room (see business_days.py)
+business_calendar = booking_store.business_calendar
+
+# Generate time options in 30-minute intervals between 8 AM and 6 PM (the availability slot grid)
 def generate_time_options():
-    base_time = datetime(2000, 1, 1, 8, 0)
-    return [(base_time + timedelta(minutes=30 * i)).time() for i in range(21)]
+    return list(availability.SLOT_BOUNDARIES)
 
 time_options = generate_time_options()
 
@@ -40,37 +42,29 @@ time_options = generate_time_options()
 def convert_to_readable_time(time_obj):
     return time_obj.strftime('%I:%M %p')
 
-# Function to check if a date is a weekend or a blocked date
-def is_blocked_or_weekend(date):
-    if date.weekday() >= 5:  # Check if it's a weekend (Saturday=5, Sunday=6)
-        return True
-    if date in blocked_dates:  # Check if it's a blocked date
-        return True
-    return False
-
-# Function to log transactions
-def log_transaction(action, room, date, start_time, end_time, user, meeting_title, contact_number, password):
-    global transaction_log
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_log = pd.DataFrame({
-        "Action": [action],
-        "Room": [room],
-        "Date": [date],
-        "Start Time": [start_time],
-        "End Time": [end_time],
-        "User": [user],
-        "Meeting Title": [meeting_title],
-        "Contact Number": [str(contact_number)],  # Ensure contact number is logged as string
-        "Password": [password],
-        "Timestamp": [timestamp]
-    })
-    transaction_log = pd.concat([transaction_log, new_log], ignore_index=True)
-    transaction_log.to_csv("transaction_log.csv", index=False)
+# Function to check if a date is a weekend or a blocked date (for every room, or only the given room)
+def is_blocked_or_weekend(date, room=None):
+    return business_calendar.is_closed(date, room)
+
+# Function to explain why a date is closed (for every room, or only the given room)
+def closed_message(date, room=None):
+    if business_calendar.closed_reason(date, room)[0] == "Blocked date":
+        place = room if room else "The meeting room"
+        return f"{place} is unavailable on {date.strftime('%A, %B %d, %Y')} due to a blocked date."
+    return f"The meeting room is closed on {date.strftime('%A, %B %d, %Y')} (weekend)."
 
 # Function to convert string time to datetime.time object
 def string_to_time(time_str):
     return datetime.strptime(time_str, "%I:%M %p").time()
 
+# Function to return the selection the page showed on the previous run (the one a button was clicked on) and
+# remember the current one. The time options only list free times: when another session books the room they
+# change, and Streamlit resets the selection to the first option on that same run, so clicks use the shown one.
+def shown_selection(key, selection):
+    shown = st.session_state.get(key, selection)
+    st.session_state[key] = selection
+    return shown
+
 # Streamlit Interface
 image_path = "images/background.jpg"
 st.set_page_config(
@@ -81,54 +75,13 @@ st.image(image_path, use_column_width=True)
 # Tabs setup
 tabs = st.tabs(["Book a Room", "Edit or Cancel Booking"])
 
-# Create events for the calendar view with room-specific display
-def create_calendar_events(bookings, room_colors, view_type):
-    calendar_events = []
-    for index, booking in bookings.iterrows():
-        # Handle missing values with defaults
-        title = booking.get('Meeting Title', 'Untitled Meeting')
-        booked_by = booking.get('Booked By', 'Unknown')
-        room = booking.get('Room', 'Unspecified Room')
-        contact_number = booking.get('Contact Number', 'N/A')  # Optional field for contact
-        start_time = booking.get('Start Time')
-        end_time = booking.get('End Time')
-
-        # Ensure start_time and end_time are properly formatted
-        if start_time and end_time:
-            # Format start and end times
-            formatted_start_time = start_time.strftime('%I:%M %p').lstrip("0").lower()
-            formatted_end_time = end_time.strftime('%I:%M%p').lstrip("0").lower()
-
-            # Adjust title and description based on view type
-            if view_type == "dayGridMonth":  # Grid view
-                event_title = f"m-{formatted_end_time}"
-                event_description = ""  # Grid view doesn't need a detailed description
-            elif view_type == "listMonth":  # List view
-                event_title = f"{booked_by} ({contact_number}) - {title}"
-                event_description = (
-                    f"Room: {room}\n"
-                    f"Booked by: {booked_by}\n"
-                    f"Contact: {contact_number}\n"
-                    f"Meeting Title: {title}\n"
-                    f"Start: {formatted_start_time}\n"
-                    f"End: {formatted_end_time}"
-                )
-            else:
-                # Default fallback
-                event_title = f"{title}"
-                event_description = ""
-
-            event = {
-                "title": event_title,
-                "start": start_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                "end": end_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                "resourceId": room,
-                "backgroundColor": "#FFFFFF",  # White background for events
-                "borderColor": room_colors.get(room, "#3788d8"),  # Border color based on room
-                "description": event_description,
-            }
-            calendar_events.append(event)
-    return calendar_events
+# Function to build (and cache) the events of one room filter, month and view.
+# Only bookings inside the visible window are converted; the store version in the cache key
+# invalidates every cached month as soon as a booking is added, edited or cancelled.
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_calendar_events(store_version, room, month_start, view_type, room_colors):
+    window = bookings_in_window(get_booking_store().bookings_between(*month_window(month_start)), room, month_start)
+    return create_calendar_events(window, room_colors, view_type)
 
 # First Tab: Calendar Overview
 with tabs[0]:
@@ -142,12 +95,6 @@ with tabs[0]:
         index=0
     )
 
-    # Define room-specific colors (for border)
-    room_colors = {
-        "DFO Conference Room (Max 16 Pax)": "#4CAF50",  # Green
-        "I-Room (Max 10 Pax)": "#2196F3",  # Blue
-    }
-
     # Optimize the views for mobile users with clear options
     calendar_views = {
         "Calendar View (Desktop)": "dayGridMonth",
@@ -162,22 +109,28 @@ with tabs[0]:
     )
     selected_view = calendar_views[selected_view_label]
 
-    # Create the events based on the bookings and selected view
-    calendar_events = create_calendar_events(bookings, room_colors, selected_view)
-
-    # Filter events based on the selected room
-    if selected_room != "All Rooms":
-        filtered_events = [
-            event for event in calendar_events if event["resourceId"] == selected_room
-        ]
-    else:
-        filtered_events = calendar_events  # Show all events if "All Rooms" is selected
+    # Month navigation is handled here (rather than by the calendar's own prev/next buttons)
+    # so that only the visible month's events are built and sent to the browser
+    if 'calendar_month' not in st.session_state:
+        st.session_state.calendar_month = datetime.today().date().replace(day=1)
+    nav_prev, nav_today, nav_next = st.columns(3)
+    if nav_prev.button("◀ Previous Month", use_container_width=True):
+        st.session_state.calendar_month = (st.session_state.calendar_month - timedelta(days=1)).replace(day=1)
+    if nav_today.button("Today", use_container_width=True):
+        st.session_state.calendar_month = datetime.today().date().replace(day=1)
+    if nav_next.button("Next Month ▶", use_container_width=True):
+        st.session_state.calendar_month = (st.session_state.calendar_month + timedelta(days=32)).replace(day=1)
+    calendar_month = st.session_state.calendar_month
+
+    # Create the events for the selected room, visible month and view
+    filtered_events = load_calendar_events(booking_store.version, selected_room, calendar_month, selected_view, room_colors)
 
     # Default calendar options with the selected view
     calendar_options = {
         "initialView": selected_view,
+        "initialDate": calendar_month.strftime('%Y-%m-%d'),
         "headerToolbar": {
-            "left": "prev,next today",
+            "left": "",  # Month navigation uses the buttons above
             "center": "title",
             "right": "",  # Remove unnecessary view options
         },
@@ -229,7 +182,7 @@ with tabs[0]:
     """
 
     # Display the calendar with filtered events and optimized view
-    calendar_widget = calendar(events=filtered_events, options=calendar_options, custom_css=custom_css)
+    calendar_widget = calendar(events=filtered_events, options=calendar_options, custom_css=custom_css, key=f"calendar-{calendar_month}-{selected_view}")
     st.write(calendar_widget)
 
     # First Tab: Book a Room
@@ -237,13 +190,41 @@ with tabs[0]:
     st.title("Meeting Room Booking System")
     st.subheader("Book a Room")
     today = datetime.today()
+
+    # Search the availability index for the next free slots instead of guessing and retrying
+    with st.expander("Find me the next free slot"):
+        duration_options = list(range(1, availability.SLOTS_PER_DAY + 1))
+        search_duration = st.selectbox("Duration", duration_options, index=1, format_func=lambda n: f"{n * availability.SLOT_MINUTES // 60}h {n * availability.SLOT_MINUTES % 60:02d}m")
+        search_date = st.date_input("Earliest Date", min_value=today, format="DD/MM/YYYY")
+        search_headcount = st.number_input("Number of Attendees", min_value=1, value=1, step=1)
+        search_room = st.selectbox("Room", ["Any Room"] + meeting_rooms)
+
+        if st.button("Search Free Slots"):
+            try:
+                free_slots = booking_service.search_free_slots(
+                    booking_store, search_date, search_duration, search_headcount,
+                    None if search_room == "Any Room" else [search_room], limit=10
+                )
+            except booking_service.BookingError as e:
+                st.error(str(e))
+            else:
+                if not free_slots:
+                    st.info("No free slots found in the next 90 days.")
+                else:
+                    st.dataframe(pd.DataFrame([
+                        {
+                            "Date": slot_date.strftime('%a, %d/%m/%Y'),
+                            "Room": slot_room,
+                            "Start Time": convert_to_readable_time(slot_start),
+                            "End Time": convert_to_readable_time(slot_end),
+                        }
+                        for slot_date, slot_room, slot_start, slot_end in free_slots
+                    ]), hide_index=True)
+
     date = st.date_input("Select a Date", min_value=today,format="DD/MM/YYYY")
 
     if is_blocked_or_weekend(date):
-        if date in blocked_dates:
-            st.error(f"The meeting room is unavailable on {date.strftime('%A, %B %d, %Y')} due to a blocked date.")
-        else:
-            st.error(f"The meeting room is closed on {date.strftime('%A, %B %d, %Y')} (weekend).")
+        st.error(closed_message(date))
     else:
         date_bookings = bookings[bookings['Date'] == date.strftime('%Y-%m-%d')]
         if date_bookings.empty:
@@ -253,54 +234,57 @@ with tabs[0]:
             date_bookings['Start Time'] = date_bookings['Start Time'].dt.strftime('%I:%M %p')
             date_bookings['End Time'] = date_bookings['End Time'].dt.strftime('%I:%M %p')
             date_bookings['Contact Number'] = date_bookings['Contact Number'].astype(str)  # Ensure contact numbers are displayed without commas
-            st.dataframe(date_bookings.drop(columns=['Date', "Password"]), hide_index=True)
+            st.dataframe(date_bookings.drop(columns=['Date', "Password Hash", "Version", "Series"]), hide_index=True)
 
         room = st.selectbox("Select a Room", meeting_rooms)
-        start_time = st.selectbox("Start Time", time_options, format_func=lambda x: convert_to_readable_time(x) if x else "")
-        end_time = st.selectbox("End Time", time_options, format_func=lambda x: convert_to_readable_time(x) if x else "")
+        if is_blocked_or_weekend(date, room):
+            st.error(closed_message(date, room))
+
+        # Only offer start/end times that are free for this room and day (slot bitmask lookup)
+        day_mask = booking_store.day_mask(room, date.strftime('%Y-%m-%d'))
+        start_time = st.selectbox("Start Time", availability.valid_start_times(day_mask), format_func=lambda x: convert_to_readable_time(x) if x else "")
+        end_time = st.selectbox("End Time", availability.valid_end_times(day_mask, start_time), format_func=lambda x: convert_to_readable_time(x) if x else "")
+        if day_mask == availability.FULL_DAY_MASK:
+            st.warning("This room is fully booked on the selected date.")
         booked_by = st.text_input("Your Name")
         meeting_title = st.text_input("Meeting Title (Do not use words related to the organisation)")
         contact_number = st.text_input("Contact Number")
         password = st.text_input("Meeting Password (Cap Sensitive - Required when you want to edit/cancel your booking)")
 
-        if st.button("Book Room"):
-            if not start_time or not end_time:
-                st.error("Please select both start and end times.")
-            elif start_time >= end_time:
-                st.error("End time must be after start time.")
-            elif not booked_by.strip():
-                st.error("Please enter your name.")
-            elif not meeting_title.strip():
-                st.error("Please enter a meeting title.")
-            elif not contact_number.strip():
-                st.error("Please enter a contact number.")
-            elif not password.strip():
-                st.error("Please enter a meeting password.")
+        # Optional recurrence: the series is expanded and checked as a whole when booking
+        repeat = st.selectbox("Repeat", ["Does not repeat"] + list(recurrence.FREQUENCIES))
+        if repeat != "Does not repeat":
+            repeat_end = st.radio("Ends", ["After a number of occurrences", "On a date"], horizontal=True)
+            if repeat_end == "On a date":
+                repeat_occurrences = None
+                repeat_until = st.date_input("End Date", min_value=date, value=date + timedelta(weeks=4 * recurrence.FREQUENCIES[repeat]), format="DD/MM/YYYY")
             else:
-                start_datetime = datetime.combine(date, start_time)
-                end_datetime = datetime.combine(date, end_time)
+                repeat_occurrences = st.number_input("Occurrences", min_value=2, max_value=recurrence.MAX_OCCURRENCES, value=4, step=1)
+                repeat_until = None
+            skip_unavailable = st.checkbox("Skip dates that are unavailable (weekends, blocked dates or already booked)")
 
-                conflict = bookings[(bookings['Room'] == room) & 
-                                    (bookings['Date'] == date.strftime('%Y-%m-%d')) & 
-                                    ((bookings['Start Time'] < end_datetime) & (bookings['End Time'] > start_datetime))]
-
-                if not conflict.empty:
-                    st.error(f"This room is already booked during the selected time by: {conflict['Booked By'].iloc[0]}.")
-                else:
-                    new_booking = pd.DataFrame({
-                        "Room": [room],
-                        "Date": [date.strftime('%Y-%m-%d')],
-                        "Start Time": [start_datetime],
-                        "End Time": [end_datetime],
-                        "Booked By": [booked_by],
-                        "Meeting Title": [meeting_title],
-                        "Contact Number": [str(contact_number)],  # Ensure contact number is stored as string
-                        "Password": [password]
-                    })
-                    bookings = pd.concat([bookings, new_booking], ignore_index=True)
-                    bookings.to_csv("bookings.csv", index=False)
-                    log_transaction("Booking", room, date.strftime('%Y-%m-%d'), start_datetime, end_datetime, booked_by, meeting_title, contact_number, password)
+        shown = shown_selection('book_selection', (room, date, start_time, end_time))
+        if st.button("Book Room"):
+            room, date, start_time, end_time = shown
+            try:
+                if repeat == "Does not repeat":
+                    booking_service.book(
+                        booking_store, room, date, start_time, end_time, booked_by, meeting_title, contact_number, password, today.date()
+                    )
                     st.success("Room booked successfully!")
+                else:
+                    # The series is checked as a whole and booked in one transaction
+                    booking_ids, skipped = booking_service.book_series(
+                        booking_store, room, date, start_time, end_time, booked_by, meeting_title, contact_number, password,
+                        recurrence.FREQUENCIES[repeat], repeat_occurrences, repeat_until, skip_unavailable, today.date()
+                    )
+                    st.success(f"Room booked successfully for {len(booking_ids)} dates!")
+                    if not skipped.empty:
+                        st.info("Skipped: " + ", ".join(f"{row.Date} ({row.Status})" for row in skipped.itertuples()))
+            except booking_service.BookingError as e:
+                st.error(str(e))
+                if e.details is not None:
+                    st.dataframe(e.details, hide_index=True)
 
 
 # Add custom CSS to hide specific parts of the JSON output
@@ -364,7 +348,7 @@ with tabs[1]:
     if password:
         # Search for existing bookings matching the password
         today = datetime.today().date()
-        matched_bookings = bookings[(bookings['Password'] == password) & (bookings['Date'] > today.strftime('%Y-%m-%d'))]
+        matched_bookings = booking_store.find_by_password(password, today.strftime('%Y-%m-%d'))
 
         if matched_bookings.empty:
             st.error("No matching bookings found. Please check the meeting password. If you forget your password, please contact Wei Zhong @ 90890631")
@@ -373,133 +357,112 @@ with tabs[1]:
             st.subheader("Your Bookings")
             matched_bookings['Start Time'] = matched_bookings['Start Time'].dt.strftime('%I:%M %p')
             matched_bookings['End Time'] = matched_bookings['End Time'].dt.strftime('%I:%M %p')
-            st.dataframe(matched_bookings.drop(columns=["Password"]), hide_index=True)
+            st.dataframe(matched_bookings.drop(columns=["Password Hash", "Version", "Series"]), hide_index=True)
 
             # If multiple bookings exist, allow the user to select one
-            booking_to_edit = st.selectbox("Select a Booking to Edit or Cancel", matched_bookings.index, format_func=lambda x: f"Room: {matched_bookings.loc[x, 'Room']} | Date: {matched_bookings.loc[x, 'Date']} | Start: {matched_bookings.loc[x, 'Start Time']} | End: {matched_bookings.loc[x, 'End Time']}")
+            booking_to_edit = st.selectbox("Select a Booking to Edit or Cancel", matched_bookings.index, format_func=lambda x: f"Room: {matched_bookings.loc[x, 'Room']} | Date: {matched_bookings.loc[x, 'Date']} | Start: {matched_bookings.loc[x, 'Start Time']} | End: {matched_bookings.loc[x, 'End Time']}" + (" | Recurring" if pd.notna(matched_bookings.loc[x, 'Series']) else ""))
 
             if booking_to_edit is not None:
-                # Store the selected booking in session state
-                st.session_state.selected_booking = matched_bookings.loc[booking_to_edit]
+                # Store the selected booking in session state when it is first selected; its "Version" is the
+                # one the user is looking at, so saving or cancelling fails if another session changed it since
+                if st.session_state.get('selected_booking') is None or st.session_state.selected_booking.name != booking_to_edit:
+                    st.session_state.selected_booking = matched_bookings.loc[booking_to_edit]
 
                 # Retrieve the selected booking from session state
                 selected_booking = st.session_state.selected_booking
 
                 action = st.radio("Select Action", ["Edit Booking", "Cancel Booking"])
 
+                # Recurring bookings can be changed one occurrence at a time or as a whole series
+                whole_series = False
+                if pd.notna(selected_booking['Series']):
+                    scope = st.radio("Apply to", ["This occurrence only", "All upcoming occurrences in the series"])
+                    whole_series = scope != "This occurrence only"
+                    series_bookings = booking_store.series_bookings(selected_booking['Series'], today.strftime('%Y-%m-%d'))
+
                 if action == "Edit Booking":
                     # Convert the string date to a datetime.date object
                     selected_date = datetime.strptime(selected_booking['Date'], '%Y-%m-%d').date()
 
-                    # Allow user to select a new date
+                    # Allow user to select a new date (each occurrence keeps its own date when editing a whole series)
                     new_date = st.date_input(
                         "Select a New Date", 
                         min_value=datetime.today(), 
                         value=selected_date, 
-                        format="DD/MM/YYYY"
+                        format="DD/MM/YYYY",
+                        disabled=whole_series
                     )
+                    if whole_series:
+                        new_date = selected_date
+                        st.caption(f"The new room, times and title will apply to all {len(series_bookings)} upcoming occurrences.")
 
                     if is_blocked_or_weekend(new_date):
-                        if new_date in blocked_dates:
-                            st.error(f"The meeting room is unavailable on {new_date.strftime('%A, %B %d, %Y')} due to a blocked date.")
-                        else:
-                            st.error(f"The meeting room is closed on {new_date.strftime('%A, %B %d, %Y')} (weekend).")
+                        st.error(closed_message(new_date))
                     else:
                         # Populate the form with the selected booking details
-                        new_room = st.selectbox("New Room", meeting_rooms, index=meeting_rooms.index(selected_booking['Room']))
+                        new_room = st.selectbox("New Room", meeting_rooms, index=meeting_rooms.index(selected_booking['Room']) if selected_booking['Room'] in meeting_rooms else 0)
+                        if not whole_series and is_blocked_or_weekend(new_date, new_room):
+                            st.error(closed_message(new_date, new_room))
+
+                        # Offer only slots that are free once this booking (and the same user's own bookings) are set aside
+                        day_ids = booking_store.find_conflicts(new_room, new_date.strftime('%Y-%m-%d'), datetime.combine(new_date, time_options[0]), datetime.combine(new_date, time_options[-1]))
+                        # (owners are read from the store's current frame: the index may hold bookings made since this rerun started)
+                        owners = booking_store.bookings['Booked By']
+                        own_ids = [i for i in day_ids if i == booking_to_edit or owners.get(i) == selected_booking['Booked By']]
+                        day_mask = booking_store.day_mask(new_room, new_date.strftime('%Y-%m-%d'), exclude_ids=own_ids)
+                        start_options = availability.valid_start_times(day_mask)
 
                         # Convert the string time to datetime.time objects for comparison
+                        current_start_time = string_to_time(selected_booking['Start Time'])
                         new_start_time = st.selectbox(
                             "New Start Time", 
-                            time_options, 
+                            start_options, 
                             format_func=lambda x: convert_to_readable_time(x) if x else "",
-                            index=time_options.index(string_to_time(selected_booking['Start Time']))
+                            index=start_options.index(current_start_time) if current_start_time in start_options else 0
                         )
+                        end_options = availability.valid_end_times(day_mask, new_start_time)
+                        current_end_time = string_to_time(selected_booking['End Time'])
                         new_end_time = st.selectbox(
                             "New End Time", 
-                            time_options, 
+                            end_options, 
                             format_func=lambda x: convert_to_readable_time(x) if x else "",
-                            index=time_options.index(string_to_time(selected_booking['End Time']))
+                            index=end_options.index(current_end_time) if current_end_time in end_options else 0
                         )
 
                         new_meeting_title = st.text_input("New Meeting Title", value=selected_booking['Meeting Title'])
 
+                        shown = shown_selection('edit_selection', (new_room, new_date, new_start_time, new_end_time))
                         if st.button("Save Changes"):
-                            if not new_start_time or not new_end_time:
-                                st.error("Please select both start and end times.")
-                            elif new_start_time >= new_end_time:
-                                st.error("End time must be after start time.")
-                            elif not new_meeting_title.strip():
-                                st.error("Please enter a new meeting title.")
+                            new_room, new_date, new_start_time, new_end_time = shown
+                            try:
+                                changed = booking_service.edit(
+                                    booking_store, booking_to_edit, password, new_room, new_date, new_start_time, new_end_time,
+                                    new_meeting_title, int(selected_booking['Version']), whole_series, today
+                                )
+                            except booking_service.BookingError as e:
+                                if e.code == "stale":
+                                    st.session_state.selected_booking = None  # Show the current version on the next rerun
+                                st.error(str(e))
                             else:
-                                # Convert selected times back to datetime objects using the selected date
-                                new_start_datetime = datetime.combine(new_date, new_start_time)
-                                new_end_datetime = datetime.combine(new_date, new_end_time)
-
-                                # Check for any conflicts with existing bookings (ignoring the current booking being edited)
-                                conflict = bookings[
-                                    (bookings['Room'] == new_room) & 
-                                    (bookings['Date'] == new_date.strftime('%Y-%m-%d')) & 
-                                    ((bookings['Start Time'] < new_end_datetime) & (bookings['End Time'] > new_start_datetime))
-                                ]
-
-                                # Exclude the current booking from conflict check
-                                conflict = conflict[conflict.index != booking_to_edit]
-
-                                if not conflict.empty:
-                                    conflict_user = conflict['Booked By'].iloc[0]
-                                    
-                                    # If the conflicting booking is by a different user, show an error
-                                    if conflict_user != selected_booking['Booked By']:
-                                        st.error(f"This room is already booked during the selected time by {conflict_user}. Please choose a different time.")
-                                    else:
-                                        # If the conflict is by the same user, allow the edit
-                                        bookings.loc[booking_to_edit, ['Date', 'Room', 'Start Time', 'End Time', 'Meeting Title']] = [
-                                            new_date.strftime('%Y-%m-%d'), 
-                                            new_room, 
-                                            new_start_datetime, 
-                                            new_end_datetime, 
-                                            new_meeting_title
-                                        ]
-                                        bookings.to_csv("bookings.csv", index=False)
-
-                                        # Log the transaction
-                                        log_transaction(
-                                            "Edit", new_room, new_date.strftime('%Y-%m-%d'), 
-                                            new_start_datetime, new_end_datetime, 
-                                            selected_booking['Booked By'], new_meeting_title, 
-                                            selected_booking['Contact Number'], password
-                                        )
-                                        
-                                        st.success("Booking updated successfully!")
-                                else:
-                                    # No conflict, proceed with the edit
-                                    bookings.loc[booking_to_edit, ['Date', 'Room', 'Start Time', 'End Time', 'Meeting Title']] = [
-                                        new_date.strftime('%Y-%m-%d'), 
-                                        new_room, 
-                                        new_start_datetime, 
-                                        new_end_datetime, 
-                                        new_meeting_title
-                                    ]
-                                    bookings.to_csv("bookings.csv", index=False)
-
-                                    # Log the transaction
-                                    log_transaction(
-                                        "Edit", new_room, new_date.strftime('%Y-%m-%d'), 
-                                        new_start_datetime, new_end_datetime, 
-                                        selected_booking['Booked By'], new_meeting_title, 
-                                        selected_booking['Contact Number'], password
-                                    )
-                                    
-                                    st.success("Booking updated successfully!")
+                                st.session_state.selected_booking = None
+                                st.success(f"{changed} bookings updated successfully!" if whole_series else "Booking updated successfully!")
                 
+
                 elif action == "Cancel Booking":
                     if st.button("Confirm Cancellation"):
-                        # Remove the booking from the dataframe
-                        bookings = bookings.drop(booking_to_edit)
-                        bookings.to_csv("bookings.csv", index=False)
-
-                        # Log the cancellation transaction
-                        log_transaction("Cancellation", selected_booking['Room'], selected_booking['Date'], selected_booking['Start Time'], selected_booking['End Time'], selected_booking['Booked By'], selected_booking['Meeting Title'], selected_booking['Contact Number'], password)
-                        
-                        st.success("Booking cancelled successfully!")
\ No newline at end of file
+                        # Only cancelled if unchanged since it was shown (the whole series in one transaction)
+                        try:
+                            cancelled = booking_service.cancel(
+                                booking_store, booking_to_edit, password, int(selected_booking['Version']), whole_series, today
+                            )
+                        except booking_service.BookingError as e:
+                            if e.code == "stale":
+                                st.session_state.selected_booking = None  # Show the current version on the next rerun
+                            st.error(str(e))
+                        else:
+                            st.session_state.selected_booking = None
+                            st.success(f"{cancelled} bookings cancelled successfully!" if whole_series else "Booking cancelled successfully!")
+
+
+# Finish timing this rerun
+instrumentation.end_rerun()
@@ -0,0 +1,223 @@
+import argparse
+import json
+from bisect import bisect_left
+from datetime import datetime
+import pandas as pd
+import booking_db
+import booking_rules
+from availability import SLOT_MINUTES, SLOTS_PER_DAY, SLOT_BOUNDARIES, DAY_START, free_runs
+
+# Room allocation for batches of requests that give a headcount and an allowed time window instead of a room.
+# Rooms are the "colours" of an interval-colouring problem on each day's 30-minute slot grid:
+# requests are placed largest group first (then tightest window), each into the smallest room tier that
+# can hold it, and within that tier into the busiest room at a start that packs against existing bookings.
+# Large rooms therefore stay free for large groups, and free time is kept in long unbroken runs.
+# All occupancy checks are bitmask operations on the day masks (see availability.py), so a run costs
+# O(requests x rooms tried) and scales to hundreds of rooms and thousands of requests.
+
+
+# Function to convert a time to a slot index, rounding up or down to the 30-minute grid
+def _slot_index(t, round_up):
+    minutes = t.hour * 60 + t.minute - (DAY_START.hour * 60 + DAY_START.minute)
+    index = -(-minutes // SLOT_MINUTES) if round_up else minutes // SLOT_MINUTES
+    return min(max(index, 0), SLOTS_PER_DAY)
+
+
+# Function to build the bitmask of start slots that keep `length` slots inside the window [earliest, latest)
+def window_starts(earliest, latest, length):
+    first = _slot_index(earliest, round_up=True)
+    last = _slot_index(latest, round_up=False) - length
+    if length < 1 or last < first:
+        return 0
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+# Function to pick the start slot within a set of candidate starts, preferring starts that pack
+# against a busy slot (or the edge of the day) on either side; returns (packed, start)
+def _best_start(candidates, mask, length):
+    before_busy = (mask << 1) | 1  # Bit i set when slot i-1 is busy or i is the first slot
+    after_busy = (mask >> length) | (1 << (SLOTS_PER_DAY - length))  # Bit i set when slot i+length is busy or past the day
+    packed = candidates & (before_busy | after_busy)
+    chosen = packed or candidates
+    return bool(packed), (chosen & -chosen).bit_length() - 1
+
+
+# Function to allocate rooms and start times to a batch of requests.
+# Each request is a dict with "Date" (datetime.date), "Headcount", "Slots" (duration in 30-minute slots),
+# "Earliest" and "Latest" (datetime.time window the meeting must fit in). rooms maps room name -> capacity,
+# day_mask_for(room, date_str) returns the busy mask of existing bookings (e.g. BookingStore.day_mask, where a
+# date blocked for one room is busy all day) and is_closed(date) is True on weekends and dates blocked for every room.
+# Returns one result per request, in input order: {"Room", "Start Time", "End Time"} or {"Reason"}.
+def allocate(requests, rooms, day_mask_for, is_closed):
+    tiers = {}
+    for room, capacity in rooms.items():
+        tiers.setdefault(capacity, []).append(room)
+    capacities = sorted(tiers)
+    masks = {}  # (room, date_str) -> busy mask including this run's assignments
+    results = [None] * len(requests)
+
+    windows = [window_starts(r["Earliest"], r["Latest"], r["Slots"]) for r in requests]
+    order = sorted(range(len(requests)), key=lambda i: (
+        requests[i]["Date"], -requests[i]["Headcount"], bin(windows[i]).count("1"), -requests[i]["Slots"], i
+    ))
+    for i in order:
+        request = requests[i]
+        date, length = request["Date"], request["Slots"]
+        if is_closed(date):
+            results[i] = {"Reason": f"The meeting room is closed on {date.strftime('%A, %B %d, %Y')} (weekend or blocked date)."}
+            continue
+        if not windows[i]:
+            results[i] = {"Reason": "The time window is shorter than the meeting."}
+            continue
+        first_tier = bisect_left(capacities, request["Headcount"])
+        if first_tier == len(capacities):
+            results[i] = {"Reason": f"No room can hold {request['Headcount']} attendees."}
+            continue
+
+        date_str = date.strftime('%Y-%m-%d')
+        best = None  # (not packed, -busy slots, start, room)
+        for capacity in capacities[first_tier:]:
+            for room in tiers[capacity]:
+                key = (room, date_str)
+                if key not in masks:
+                    masks[key] = day_mask_for(room, date_str)
+                mask = masks[key]
+                candidates = free_runs(mask, length) & windows[i]
+                if not candidates:
+                    continue
+                packed, start = _best_start(candidates, mask, length)
+                option = (not packed, -bin(mask).count("1"), start, room)
+                if best is None or option < best:
+                    best = option
+            if best is not None:
+                break  # Stop at the smallest tier with a free room; a bigger tier is only tried when this one is full
+        if best is None:
+            results[i] = {"Reason": "No room is free for the whole meeting within the time window."}
+            continue
+
+        _, _, start, room = best
+        masks[(room, date_str)] |= ((1 << length) - 1) << start
+        results[i] = {"Room": room, "Start Time": SLOT_BOUNDARIES[start], "End Time": SLOT_BOUNDARIES[start + length]}
+    return results
+
+
+# Function to parse a field of a request as a timestamp (raises ValueError if it is missing or unparseable)
+def _parse_timestamp(request, field, default=None):
+    value = pd.Timestamp(str(request.get(field, default) or ""))
+    if pd.isna(value):
+        raise ValueError(f"missing {field}")
+    return value
+
+
+# Function to parse a field of a request as a positive whole number (raises ValueError if it is missing or not one)
+def _parse_count(request, field):
+    value = request.get(field)
+    if value in (None, ""):
+        raise ValueError(f"missing {field}")
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not a number")
+    if count < 1:
+        raise ValueError(f"{field} must be at least 1")
+    return count
+
+
+# Function to parse one line of a requests file (raises ValueError, TypeError or AttributeError if it is invalid)
+def parse_request(line, line_number):
+    request = json.loads(line)
+    request["Line"] = line_number
+    request["Date"] = _parse_timestamp(request, "Date").date()
+    request["Headcount"] = _parse_count(request, "Headcount")
+    request["Slots"] = -(-_parse_count(request, "Duration") // SLOT_MINUTES)
+    request["Earliest"] = _parse_timestamp(request, "Earliest", "08:00").time()
+    request["Latest"] = _parse_timestamp(request, "Latest", "18:00").time()
+    return request
+
+
+# Function to read allocation requests from a JSONL file: Date, Headcount, Duration (minutes), Earliest and
+# Latest, plus the booking fields (Booked By, Meeting Title, Contact Number, Password).
+# Returns (requests, rejected); a line that cannot be parsed is rejected on its own as {"line", "status", "reason"}
+# (as in bulk_ingest.py) and the rest of the file is still read.
+def read_requests(path):
+    requests, rejected = [], []
+    with open(path, encoding="utf-8") as requests_file:
+        for line_number, line in enumerate(requests_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                requests.append(parse_request(line, line_number))
+            except (ValueError, TypeError, AttributeError) as e:
+                rejected.append({"line": line_number, "status": "rejected", "reason": f"Invalid request: {e}"})
+    return requests, rejected
+
+
+# Run as a script: python allocation.py requests.jsonl [--results allocation.jsonl] [--commit]
+if __name__ == "__main__":
+    from booking_store import BookingStore, BookingConflictError
+
+    parser = argparse.ArgumentParser(description="Allocate rooms and times to a batch of booking requests.")
+    parser.add_argument("requests", help="JSONL file with one request per line")
+    parser.add_argument("--results", help="Result file (default: <requests>.allocation.jsonl)")
+    parser.add_argument("--commit", action="store_true", help="Book the allocated rooms (one transaction)")
+    parser.add_argument("--db", default=booking_db.DB_FILE)
+    args = parser.parse_args()
+
+    store = BookingStore(args.db)
+    is_closed = store.business_calendar.is_closed
+    requests, rejected = read_requests(args.requests)
+
+    # Check the booking fields first (with a placeholder room and slot), so invalid requests take no room
+    results = [None] * len(requests)
+    valid = []
+    for i, request in enumerate(requests):
+        error = booking_rules.booking_error(
+            store.room_names[0], request["Date"], SLOT_BOUNDARIES[0], SLOT_BOUNDARIES[1], request.get("Booked By"),
+            request.get("Meeting Title"), request.get("Contact Number"), request.get("Password"), is_closed, datetime.today().date(),
+            store.room_names
+        )
+        if error:
+            results[i] = {"Reason": error}
+        else:
+            valid.append(i)
+    for i, result in zip(valid, allocate([requests[i] for i in valid], store.room_capacity, store.day_mask, is_closed)):
+        results[i] = result
+
+    bookings = []
+    for request, result in zip(requests, results):
+        if "Room" not in result:
+            continue
+        bookings.append({
+            "Room": result["Room"],
+            "Date": request["Date"].strftime('%Y-%m-%d'),
+            "Start Time": datetime.combine(request["Date"], result["Start Time"]),
+            "End Time": datetime.combine(request["Date"], result["End Time"]),
+            "Booked By": request["Booked By"],
+            "Meeting Title": request["Meeting Title"],
+            "Contact Number": str(request["Contact Number"]),
+            "Password": request["Password"],
+        })
+
+    if args.commit and bookings:
+        try:
+            booking_ids = store.add_bookings(bookings)
+        except BookingConflictError as e:
+            parser.exit(1, f"Another booking by {e.booked_by} was made meanwhile; nothing was booked. Please re-run.\n")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        store.log_transactions([
+            dict(b, Action="Booking", User=b["Booked By"], Timestamp=timestamp, Booking=booking_id)
+            for b, booking_id in zip(bookings, booking_ids)
+        ])
+
+    results_path = args.results or args.requests.rsplit(".", 1)[0] + ".allocation.jsonl"
+    lines = list(rejected)
+    for request, result in zip(requests, results):
+        status = "allocated" if "Room" in result else "unallocated"
+        fields = {key: value.strftime('%H:%M') if hasattr(value, "strftime") else value for key, value in result.items()}
+        lines.append({"line": request["Line"], "status": status, **fields})
+    with open(results_path, "w", encoding="utf-8") as results_file:
+        for line in sorted(lines, key=lambda line: line["line"]):
+            results_file.write(json.dumps(line) + "\n")
+    print("Allocated %d of %d requests%s (%d rejected as invalid); results written to %s." % (
+        len(bookings), len(requests) + len(rejected), " and booked them" if args.commit else "", len(rejected), results_path
+    ))
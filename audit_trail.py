@@ -0,0 +1,214 @@
+import argparse
+import json
+from datetime import date as date_type, datetime
+import pandas as pd
+import booking_db
+from booking_db import quote
+
+# Audit trail over the transaction log: what happened to a booking, a room or a user, and what the
+# schedule looked like at any point in time. Events are ordered by event time, then id ("Timestamp", id),
+# and are read through the event-time indexes of transaction_log (overall, per booking, room and user).
+# Point-in-time states are rebuilt by replaying events: for one booking, its own few events (found through
+# the booking index); for the whole schedule, only the events after the latest checkpoint before that time.
+# Checkpoints (table audit_checkpoints) hold the live bookings after an event and are taken lazily, at
+# least CHECKPOINT_EVENTS events and at least one schedule's worth of events apart, so a replay never
+# reads more events than the checkpoint it starts from holds bookings, and all checkpoints together stay
+# about the size of the log.
+# Rows logged before booking ids were recorded have no "Booking"; they are matched by their fields
+# (room, date, times and user), which ties a cancellation to its booking but not an edit.
+CHECKPOINT_EVENTS = 500
+CHUNK_ROWS = 1000  # Events fetched from SQLite at a time while replaying
+STATE_COLUMNS = ["Room", "Date", "Start Time", "End Time", "User", "Meeting Title", "Contact Number"]
+EVENT_COLUMNS = ["Action", "Booking"] + STATE_COLUMNS + ["Timestamp"]
+SCHEDULE_COLUMNS = ["Booking"] + STATE_COLUMNS + ["Last Action", "Last Changed"]
+EVENT_SELECT = "SELECT id, " + ", ".join(quote(c) for c in EVENT_COLUMNS) + " FROM transaction_log"
+
+
+# Function to convert a datetime/Timestamp/string to the stored event-time text ("YYYY-MM-DD HH:MM:SS");
+# a bare date (or "YYYY-MM-DD") stands for the end of that day
+def event_time(value):
+    timestamp = pd.Timestamp(value)
+    if (isinstance(value, str) and len(value.strip()) <= 10) or (isinstance(value, date_type) and not isinstance(value, datetime)):
+        timestamp += pd.Timedelta(days=1, seconds=-1)
+    return timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Function to return the key a booking is tracked under while replaying: its id, or its fields for legacy rows
+def _booking_key(event, legacy=False):
+    if event["Booking"] is not None and not legacy:
+        return str(event["Booking"])
+    return "legacy:" + "|".join(str(event[c]) for c in ["Room", "Date", "Start Time", "End Time", "User"])
+
+
+# Function to apply one event (dict keyed by EVENT_COLUMNS) to a schedule state ({key: booking dict}).
+# Booking and Edit events carry the booking's full new fields; a Cancellation removes it.
+def apply_event(state, event):
+    if event["Action"] == "Cancellation":
+        state.pop(_booking_key(event), None)
+        state.pop(_booking_key(event, legacy=True), None)  # Booked before ids were logged
+    elif event["Action"] == "Booking" or (event["Action"] == "Edit" and event["Booking"] is not None):
+        booking = {c: event[c] for c in STATE_COLUMNS}
+        booking.update({"Booking": event["Booking"], "Last Action": event["Action"], "Last Changed": event["Timestamp"]})
+        state[_booking_key(event)] = booking
+    return state
+
+
+# Function to iterate over (id, event dict) in event order, after a checkpoint position ((time, id)) and up to a time
+def _iter_events(conn, after=None, until=None):
+    conditions, params = ['"Timestamp" IS NOT NULL'], []
+    if after is not None:
+        conditions.append('("Timestamp", id) > (?, ?)')
+        params.extend(after)
+    if until is not None:
+        conditions.append('"Timestamp" <= ?')
+        params.append(until)
+    cursor = conn.execute(EVENT_SELECT + " WHERE " + " AND ".join(conditions) + ' ORDER BY "Timestamp", id', params)
+    try:
+        while True:
+            rows = cursor.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                yield row[0], dict(zip(EVENT_COLUMNS, row[1:]))
+    finally:
+        cursor.close()
+
+
+# Function to read the latest checkpoint, optionally the latest taken at or before a time;
+# returns ((event time, event id), events replayed, bookings held, state JSON) or None when there is none
+def _latest_checkpoint(conn, until=None):
+    query, params = 'SELECT "Event Time", "Last Event", "Events", "Bookings", "State" FROM audit_checkpoints', ()
+    if until is not None:
+        query, params = query + ' WHERE "Event Time" <= ?', (until,)
+    row = conn.execute(query + ' ORDER BY "Event Time" DESC, "Last Event" DESC LIMIT 1', params).fetchone()
+    return None if row is None else ((row[0], row[1]),) + tuple(row[2:])
+
+
+# Function to count the events after a checkpoint position (event-time index only, nothing is replayed)
+def _count_events_after(conn, position):
+    if position is None:
+        return conn.execute('SELECT COUNT(*) FROM transaction_log WHERE "Timestamp" IS NOT NULL').fetchone()[0]
+    return conn.execute('SELECT COUNT(*) FROM transaction_log WHERE ("Timestamp", id) > (?, ?)', position).fetchone()[0]
+
+
+# Function to take the checkpoints due since the latest one; returns the number taken.
+# Events are replayed outside the write lock; the checkpoints are only stored if no log row arrived meanwhile.
+def update_checkpoints(conn, every=CHECKPOINT_EVENTS):
+    last_id = conn.execute("SELECT MAX(id) FROM transaction_log").fetchone()[0]
+    latest = _latest_checkpoint(conn)
+    position, events, bookings, state = latest if latest else (None, 0, 0, None)
+    due = max(every, bookings)  # Events until the next checkpoint
+    if _count_events_after(conn, position) < due:
+        return 0  # Not due yet
+    state = json.loads(state) if state else {}
+    checkpoints, since = [], 0
+    for event_id, event in _iter_events(conn, after=position):
+        apply_event(state, event)
+        events += 1
+        since += 1
+        if since >= due:
+            checkpoints.append((event["Timestamp"], event_id, events, len(state), json.dumps(state)))
+            since, due = 0, max(every, len(state))
+    if not checkpoints:
+        return 0
+    with booking_db.transaction(conn):
+        if conn.execute("SELECT MAX(id) FROM transaction_log").fetchone()[0] != last_id:
+            return 0  # Taken on the next call
+        conn.executemany(
+            'INSERT OR REPLACE INTO audit_checkpoints ("Event Time", "Last Event", "Events", "Bookings", "State") '
+            'VALUES (?, ?, ?, ?, ?)',
+            checkpoints,
+        )
+    return len(checkpoints)
+
+
+# Function to type an events or schedule frame (datetimes, nullable integer booking ids, categorical rooms/users)
+def _typed(frame):
+    for column in ["Start Time", "End Time", "Timestamp", "Last Changed"]:
+        if column in frame.columns:
+            frame[column] = pd.to_datetime(frame[column], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    frame["Booking"] = pd.to_numeric(frame["Booking"]).astype("Int64")
+    frame["Contact Number"] = frame["Contact Number"].astype(str)
+    for column in ["Action", "Room", "User"]:
+        if column in frame.columns:
+            frame[column] = frame[column].astype("category")
+    return frame
+
+
+# Function to query events, oldest first. Every filter is optional: a booking id, lists of rooms, users and
+# actions, and an event-time range (start/end: datetimes, or dates meaning their whole day).
+def events(conn, booking=None, rooms=None, users=None, actions=None, start=None, end=None, limit=None):
+    conditions, params = ['"Timestamp" IS NOT NULL'], []
+    if booking is not None:
+        conditions.append('"Booking" = ?')
+        params.append(int(booking))
+    for column, values in [("Room", rooms), ("User", users), ("Action", actions)]:
+        values = list(values or [])
+        if values:
+            conditions.append(quote(column) + " IN (" + ", ".join("?" for _ in values) + ")")
+            params.extend(values)
+    if start is not None:
+        conditions.append('"Timestamp" >= ?')
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d %H:%M:%S'))
+    if end is not None:
+        conditions.append('"Timestamp" <= ?')
+        params.append(event_time(end))
+    query = EVENT_SELECT + " WHERE " + " AND ".join(conditions) + ' ORDER BY "Timestamp", id'
+    if limit is not None:
+        query += " LIMIT %d" % int(limit)
+    return _typed(pd.read_sql_query(query, conn, params=params, index_col="id"))
+
+
+# Function to list every event of one booking, oldest first (booking id index)
+def booking_history(conn, booking_id):
+    return events(conn, booking=booking_id)
+
+
+# Function to rebuild one booking as it stood at a time; returns a dict (SCHEDULE_COLUMNS) or None
+# if it was not booked yet, or already cancelled, at that time
+def booking_state_at(conn, booking_id, at):
+    state = {}
+    rows = conn.execute(
+        EVENT_SELECT + ' WHERE "Booking" = ? AND "Timestamp" <= ? ORDER BY "Timestamp", id', (int(booking_id), event_time(at))
+    ).fetchall()
+    for row in rows:
+        apply_event(state, dict(zip(EVENT_COLUMNS, row[1:])))
+    return state.get(str(int(booking_id)))
+
+
+# Function to rebuild the whole schedule (every live booking, past and upcoming) as it stood at a time:
+# the latest checkpoint before that time plus the events since, as a DataFrame sorted by date, start and room
+def schedule_at(conn, at):
+    until = event_time(at)
+    update_checkpoints(conn)
+    latest = _latest_checkpoint(conn, until)
+    position, state = (latest[0], json.loads(latest[3])) if latest else (None, {})
+    for _, event in _iter_events(conn, after=position, until=until):
+        apply_event(state, event)
+    schedule = _typed(pd.DataFrame(list(state.values()), columns=SCHEDULE_COLUMNS))
+    return schedule.sort_values(["Date", "Start Time", "Room"], ignore_index=True)
+
+
+# Run as a script: python audit_trail.py --booking 12 [--at "2025-02-01 10:00"] | --schedule-at 2025-02-01 |
+# [--room ...] [--user ...] [--start ...] [--end ...]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the audit trail of the transaction log.")
+    parser.add_argument("--booking", type=int, help="Booking id: its events, or its state --at a time")
+    parser.add_argument("--at", help="Point in time for --booking (default: now)")
+    parser.add_argument("--schedule-at", help="Rebuild the whole schedule as it stood at this time")
+    parser.add_argument("--room", action="append", dest="rooms")
+    parser.add_argument("--user", action="append", dest="users")
+    parser.add_argument("--action", action="append", dest="actions")
+    parser.add_argument("--start", help="First event time")
+    parser.add_argument("--end", help="Last event time")
+    parser.add_argument("--db", default=booking_db.DB_FILE)
+    args = parser.parse_args()
+
+    conn = booking_db.connect(args.db)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        if args.schedule_at:
+            print(schedule_at(conn, args.schedule_at).to_string(index=False))
+        elif args.booking is not None and args.at:
+            print(json.dumps(booking_state_at(conn, args.booking, args.at), indent=2))
+        else:
+            print(events(conn, args.booking, args.rooms, args.users, args.actions, args.start, args.end).to_string())
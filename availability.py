@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+# Fixed booking grid: 30-minute slots from 8 AM to 6 PM (the same grid as generate_time_options())
+DAY_START = datetime(2000, 1, 1, 8, 0)
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 20
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+# The 21 slot boundaries (08:00, 08:30, ..., 18:00) as datetime.time objects
+SLOT_BOUNDARIES = [(DAY_START + timedelta(minutes=SLOT_MINUTES * i)).time() for i in range(SLOTS_PER_DAY + 1)]
+
+
+# Function to convert a time/datetime to minutes after 8 AM
+def _minutes_from_day_start(t):
+    return t.hour * 60 + t.minute - (DAY_START.hour * 60 + DAY_START.minute) + t.second / 60
+
+
+# Function to build the bitmask of slots touched by [start, end); bit i is the slot starting at 8:00 + 30*i min.
+# Partially covered slots count as busy, and times outside 8 AM - 6 PM are clipped to the grid.
+def slot_mask(start, end):
+    first = int(max(0, _minutes_from_day_start(start) // SLOT_MINUTES))
+    last = int(min(SLOTS_PER_DAY, -(-_minutes_from_day_start(end) // SLOT_MINUTES)))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+# Function to build the bitmask of slots lying entirely within opening hours [opens, closes)
+def hours_mask(opens, closes):
+    first = int(max(0, -(-_minutes_from_day_start(opens) // SLOT_MINUTES)))
+    last = int(min(SLOTS_PER_DAY, _minutes_from_day_start(closes) // SLOT_MINUTES))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+# Function to check whether [start, end) touches any busy slot in a day mask
+def overlaps(mask, start, end):
+    return mask & slot_mask(start, end) != 0
+
+
+# Function to list the indices of free slots in a day mask
+def free_slots(mask):
+    return [i for i in range(SLOTS_PER_DAY) if not mask >> i & 1]
+
+
+# Function to compute the share of the day's slots that are booked (0.0 - 1.0)
+def utilization(mask):
+    return bin(mask & FULL_DAY_MASK).count("1") / SLOTS_PER_DAY
+
+
+# Function to list the start times whose first slot is free
+def valid_start_times(mask):
+    return [SLOT_BOUNDARIES[i] for i in free_slots(mask)]
+
+
+# Function to list the end times that keep [start, end) entirely within free slots
+def valid_end_times(mask, start):
+    if start is None or start not in SLOT_BOUNDARIES:
+        return []
+    ends = []
+    for i in range(SLOT_BOUNDARIES.index(start), SLOTS_PER_DAY):
+        if mask >> i & 1:
+            break
+        ends.append(SLOT_BOUNDARIES[i + 1])
+    return ends
+
+
+# Function to list the free stretches of a day mask as (start, end) time pairs, earliest first
+def free_intervals(mask):
+    intervals = []
+    for i in free_slots(mask):
+        if intervals and intervals[-1][1] == SLOT_BOUNDARIES[i]:
+            intervals[-1] = (intervals[-1][0], SLOT_BOUNDARIES[i + 1])
+        else:
+            intervals.append((SLOT_BOUNDARIES[i], SLOT_BOUNDARIES[i + 1]))
+    return intervals
+
+
+# Function to build a mask whose bit i is set when slots i .. i+length-1 are all free
+def free_runs(mask, length):
+    runs = ~mask & FULL_DAY_MASK
+    for _ in range(length - 1):
+        runs &= runs >> 1
+    return runs
+
+
+# Function to search for the first free slots of a given length across rooms and days.
+# day_mask_for(room, date_str) returns a day's busy mask (e.g. BookingStore.day_mask) and
+# is_closed(date) skips weekends/blocked dates; the search only touches per-day bitmasks.
+def find_free_slots(day_mask_for, rooms, earliest_date, duration_slots, is_closed, limit=5, max_days=90, not_before=None):
+    results = []
+    if duration_slots < 1 or duration_slots > SLOTS_PER_DAY:
+        return results
+    for offset in range(max_days):
+        day = earliest_date + timedelta(days=offset)
+        if is_closed(day):
+            continue
+        first_slot = 0
+        if not_before is not None and day == not_before.date():
+            first_slot = max(0, -int(-_minutes_from_day_start(not_before) // SLOT_MINUTES))
+        day_results = []
+        for room in rooms:
+            runs = free_runs(day_mask_for(room, day.strftime('%Y-%m-%d')), duration_slots) >> first_slot << first_slot
+            while runs:
+                i = (runs & -runs).bit_length() - 1  # Lowest set bit = earliest start
+                day_results.append((i, room))
+                runs &= runs - 1
+        for i, room in sorted(day_results, key=lambda r: r[0]):
+            results.append((day, room, SLOT_BOUNDARIES[i], SLOT_BOUNDARIES[i + duration_slots]))
+            if len(results) >= limit:
+                return results
+    return results
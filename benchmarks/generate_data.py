@@ -0,0 +1,79 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+BOOKINGS_PER_ROOM_DAY = 4
+SLOTS_PER_BLOCK = 5  # Each booking sits in its own 5-slot block of the day, so generated bookings never overlap
+
+
+# Function to name the synthetic rooms ("Room 007 (Max 10 Pax)")
+def room_names(rooms):
+    capacities = [4, 6, 8, 10, 16, 24]
+    return [f"Room {i:03d} (Max {capacities[i % len(capacities)]} Pax)" for i in range(rooms)]
+
+
+# Function to generate synthetic bookings.csv, transaction_log.csv and blocked_dates.csv for one size
+def generate(size, out_dir, rooms=50, start_date=None, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Spread bookings over room-days (business days only), BOOKINGS_PER_ROOM_DAY per room and day
+    room_day = np.arange(size) // BOOKINGS_PER_ROOM_DAY
+    position = np.arange(size) % BOOKINGS_PER_ROOM_DAY
+    periods = int(room_day.max()) // rooms + 1
+    if start_date is None:
+        # About a fifth of the bookings lie in the past (archived by the store), the rest today and later
+        start_date = pd.Timestamp.today().normalize() - pd.offsets.BDay(periods // 5)
+    business_days = pd.bdate_range(start_date, periods=periods)
+    dates = business_days[room_day // rooms]
+    start_slot = position * SLOTS_PER_BLOCK + rng.integers(0, 2, size)
+    duration = rng.integers(1, 4, size)
+    start = dates + pd.to_timedelta(8 * 60 + 30 * start_slot, unit="min")
+    end = start + pd.to_timedelta(30 * duration, unit="min")
+
+    users = np.array([f"User {i:05d}" for i in range(max(10, size // 20))])
+    passwords = np.array([f"pw{i:06d}" for i in range(max(10, size // 3))])
+    bookings = pd.DataFrame({
+        "Room": np.array(room_names(rooms))[room_day % rooms],
+        "Date": dates.strftime('%Y-%m-%d'),
+        "Start Time": start.strftime('%Y-%m-%d %H:%M:%S'),
+        "End Time": end.strftime('%Y-%m-%d %H:%M:%S'),
+        "Booked By": users[rng.integers(0, len(users), size)],
+        "Meeting Title": np.char.add("Meeting ", rng.integers(0, 1000, size).astype(str)),
+        "Contact Number": rng.integers(80000000, 99999999, size).astype(str),
+        "Password": passwords[rng.integers(0, len(passwords), size)],
+    })
+    bookings.to_csv(os.path.join(out_dir, "bookings.csv"), index=False)
+
+    # One "Booking" entry per booking plus ~5% edits and ~2% cancellations, in the app's log format
+    log = bookings.rename(columns={"Booked By": "User"})
+    log.insert(0, "Action", "Booking")
+    extra = log.sample(frac=0.07, random_state=seed).copy()
+    extra["Action"] = np.where(rng.random(len(extra)) < 0.7, "Edit", "Cancellation")
+    log = pd.concat([log, extra], ignore_index=True)
+    log["Timestamp"] = (pd.to_datetime(log["Start Time"]) - pd.Timedelta(days=7)).dt.strftime('%Y-%m-%d %H:%M:%S')
+    log.to_csv(os.path.join(out_dir, "transaction_log.csv"), index=False)
+
+    # About ten blocked dates per year covered by the bookings
+    blocked = pd.Series(business_days).sample(n=max(1, len(business_days) // 25), random_state=seed).sort_values()
+    pd.DataFrame({"Blocked Date": blocked.dt.strftime('%d/%m/%Y')}).to_csv(os.path.join(out_dir, "blocked_dates.csv"), index=False)
+    return out_dir
+
+
+# Function to return the data directory for a size, generating the files if they are missing
+def ensure_data(size, rooms=50):
+    out_dir = os.path.join(DATA_DIR, str(size))
+    if not os.path.exists(os.path.join(out_dir, "bookings.csv")):
+        generate(size, out_dir, rooms=rooms)
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic booking data for the benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rooms", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.sizes:
+        print("Generated", generate(size, os.path.join(DATA_DIR, str(size)), rooms=args.rooms))
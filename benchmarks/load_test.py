@@ -0,0 +1,422 @@
+# Concurrent-session load test: simulated users drive Bookingapp.py through Streamlit's AppTest at the same
+# moment, booking, moving and cancelling meetings in one room over a few overlapping slots, then the database
+# is checked for double-booked intervals, lost or phantom writes and log/booking mismatches.
+# Runs offline, on a scratch database imported from the repository's CSV files. Run from the repository root:
+#   python benchmarks/load_test.py --processes 4 --sessions 2 --rounds 20
+#   python benchmarks/load_test.py --processes 8 --sessions 4 --rounds 50 --slots 2
+# Sessions advance in lock-step rounds: each one renders the page and fills in its form, then all of them
+# click at once, every click acting on the state its session saw before anyone else's (the race users hit).
+# Each process is one app server (its own store and write-behind journal, in its own run directory) running
+# --sessions sessions as threads, and the servers share the one database. Within a process the sessions' reruns
+# take turns (AppTest swaps process-wide runtime and config state for every run), so clicks only execute in
+# parallel across processes; within one they still race on what each session saw.
+# Results (throughput, click latency percentiles, violations) are printed and written as JSON to
+# benchmarks/results/; the exit status is 1 when any violation was found.
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import audit_trail  # noqa: E402
+import booking_db  # noqa: E402
+from booking_store import BookingStore, get_booking_store  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+APP_PATH = os.path.join(ROOT_DIR, "Bookingapp.py")
+DATA_FILES = [booking_db.BOOKINGS_CSV, booking_db.TRANSACTION_LOG_CSV, booking_db.BLOCKED_DATES_CSV, booking_db.ROOMS_CSV, "images"]
+FIRST_SLOT = datetime.min.replace(hour=9)
+SLOT_LENGTH = timedelta(minutes=60)
+SLOT_STAGGER = timedelta(minutes=30)  # Consecutive slots overlap by half
+LOAD_USER = "Load User"
+SUCCESS_MESSAGES = {
+    "book": "Room booked successfully!",
+    "edit": "Booking updated successfully!",
+    "cancel": "Booking cancelled successfully!",
+}
+LOG_ACTIONS = {"book": "Booking", "edit": "Edit", "cancel": "Cancellation"}
+VIOLATION_EXAMPLES = 10  # Violations listed per kind in the report
+RUN_LOCK = threading.Lock()  # One AppTest run at a time per process
+
+
+# Function to keep Streamlit's "no runtime" warnings out of the report
+def quiet():
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+
+
+# Function to list the slots sessions compete for: (start, end) times, each overlapping the next
+def hot_slots(count):
+    return [((FIRST_SLOT + i * SLOT_STAGGER).time(), (FIRST_SLOT + i * SLOT_STAGGER + SLOT_LENGTH).time()) for i in range(count)]
+
+
+# Function to return the widget of a kind (e.g. at.selectbox) with a label
+def widget(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise KeyError(label)
+
+
+class Session:
+    def __init__(self, session_id, settings):
+        self.id = session_id
+        self.user = f"{LOAD_USER} {session_id}"
+        self.password = f"load-{session_id}"
+        self.settings = settings
+        self.rng = random.Random(settings["seed"] * 100003 + session_id)
+        self.booking = None  # (meeting title, slot) of the booking this session was told it holds
+        self.reruns = 0
+        self.at = AppTest.from_file(APP_PATH, default_timeout=settings["timeout"])
+
+    # Function to rerun the page; returns how long the rerun took (not counting the wait for its turn)
+    def run(self):
+        with RUN_LOCK:
+            started = time.perf_counter()
+            self.at.run()
+            self.reruns += 1
+            return time.perf_counter() - started
+
+    # Function to open the page and fill in the fields that stay the same for the whole run
+    def start(self):
+        self.run()
+        widget(self.at.date_input, "Select a Date").set_value(self.settings["date"])
+        self.run()
+        widget(self.at.selectbox, "Select a Room").set_value(self.settings["room"])
+        widget(self.at.text_input, "Your Name").input(self.user)
+        widget(self.at.text_input, "Contact Number").input(f"9{self.id:07d}")
+        widget(self.at.text_input, "Meeting Password (Cap Sensitive - Required when you want to edit/cancel your booking)").input(self.password)
+        widget(self.at.text_input, "Enter Meeting Password (Cap Sensitive)").input(self.password)
+        self.run()
+
+    # Function to select a slot's start and end time, rerunning after each as the browser does; False when the
+    # page does not offer them, or no longer shows them selected (taken since, as this session sees it)
+    def choose_times(self, start_label, end_label, slot):
+        for label, value in [(start_label, slot[0]), (end_label, slot[1])]:
+            box = widget(self.at.selectbox, label)
+            if box.format_func(value) not in box.options:
+                return False
+            box.set_value(value)
+            self.run()
+        return [widget(self.at.selectbox, label).value for label in (start_label, end_label)] == list(slot)
+
+    # Function to get this round's operation ready up to its final click; returns (operation, slot, button label),
+    # with no button when the chosen slot is not offered
+    def prepare(self, round_number):
+        slots = self.settings["slots"]
+        if self.booking is None:
+            slot = self.rng.choice(slots)
+            widget(self.at.text_input, "Meeting Title (Do not use words related to the organisation)").input(f"load {self.id}-{round_number}")
+            self.run()  # The Book tab of the last click's run was drawn before that click's change
+            return "book", slot, "Book Room" if self.choose_times("Start Time", "End Time", slot) else None
+        if self.rng.random() < 0.5:
+            widget(self.at.radio, "Select Action").set_value("Cancel Booking")
+            self.run()
+            return "cancel", self.booking[1], "Confirm Cancellation"
+        slot = self.rng.choice([s for s in slots if s != self.booking[1]] or slots)
+        widget(self.at.radio, "Select Action").set_value("Edit Booking")
+        self.run()
+        return "edit", slot, "Save Changes" if self.choose_times("New Start Time", "New End Time", slot) else None
+
+    # Function to click the prepared button; returns (outcome, click latency in seconds, message)
+    def click(self, operation, button):
+        widget(self.at.button, button).click()
+        latency = self.run()
+        if self.at.exception:
+            return "exception", latency, self.at.exception[0].message
+        successes = [s.value for s in self.at.success if s.value == SUCCESS_MESSAGES[operation]]
+        if successes:
+            return "success", latency, successes[0]
+        errors = [e.value for e in self.at.error]
+        return ("rejected", latency, errors[0]) if errors else ("no response", latency, None)
+
+    # Function to play every round; returns one record per operation
+    def play(self, barrier):
+        records = []
+        try:
+            self.start()
+        except Exception:
+            records.append({"session": self.id, "round": 0, "operation": "start", "outcome": "exception", "latency": None,
+                            "message": traceback.format_exc(limit=3)})
+        for round_number in range(1, self.settings["rounds"] + 1):
+            record = {"session": self.id, "round": round_number, "latency": None, "message": None}
+            button = None
+            try:
+                record["operation"], slot, button = self.prepare(round_number)
+                record["slot"] = f"{slot[0]:%H:%M}-{slot[1]:%H:%M}"
+                record["outcome"] = "unavailable" if button is None else None
+            except Exception:
+                record.update(operation=record.get("operation", "prepare"), outcome="exception", message=traceback.format_exc(limit=3))
+            try:
+                barrier.wait(self.settings["timeout"])
+            except threading.BrokenBarrierError:
+                pass  # Another session is stuck; carry on without the lock-step
+            if button is not None:
+                try:
+                    record["outcome"], record["latency"], record["message"] = self.click(record["operation"], button)
+                except Exception:
+                    record.update(outcome="exception", message=traceback.format_exc(limit=3))
+                if record["outcome"] == "success":
+                    if record["operation"] == "book":
+                        self.booking = (f"load {self.id}-{round_number}", slot)
+                    elif record["operation"] == "edit":
+                        self.booking = (self.booking[0], slot)
+                    else:
+                        self.booking = None
+            records.append(record)
+        records.append({"session": self.id, "operation": "final", "reruns": self.reruns,
+                        "booking": None if self.booking is None else [self.booking[0], f"{self.booking[1][0]:%H:%M}-{self.booking[1][1]:%H:%M}"]})
+        return records
+
+
+# Function to run sessions as threads in this process (one app server) from its run directory; returns their records
+def run_sessions(run_dir, session_ids, barrier, settings):
+    os.chdir(run_dir)
+    quiet()
+    records = []
+    sessions = [Session(i, settings) for i in session_ids]
+    threads = [threading.Thread(target=lambda s=s: records.extend(s.play(barrier)), name=f"session-{s.id}") for s in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    get_booking_store().log_writer.close()  # Commit the queued transaction log rows before the checks
+    return records
+
+
+# Function run by each extra process (spawned): its records go back through the queue
+def _process_main(run_dir, session_ids, barrier, settings, results):
+    try:
+        results.put(run_sessions(run_dir, session_ids, barrier, settings))
+    except Exception:
+        results.put([{"session": None, "operation": "process", "outcome": "exception", "latency": None, "message": traceback.format_exc()}])
+
+
+# Function to create the scratch data directory (the CSV files, imported into a new database) and one run
+# directory per process; returns the run directories
+def prepare_workdir(work_dir, processes):
+    for name in DATA_FILES:
+        source = os.path.join(ROOT_DIR, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(work_dir, name))
+        elif os.path.exists(source):
+            shutil.copy(source, work_dir)
+    os.chdir(work_dir)
+    BookingStore().conn.close()  # Imports the CSV files once, before any server starts
+    if processes == 1:
+        return [work_dir]
+    run_dirs = []
+    for p in range(processes):
+        run_dir = os.path.join(work_dir, f"server-{p}")
+        os.makedirs(run_dir)
+        for name in DATA_FILES + [booking_db.DB_FILE]:
+            if os.path.exists(os.path.join(work_dir, name)):
+                os.symlink(os.path.join(work_dir, name), os.path.join(run_dir, name))
+        run_dirs.append(run_dir)
+    return run_dirs
+
+
+# Function to pick the day to load: the first day a week or more ahead on which the room is open
+def load_day(room):
+    store = BookingStore()
+    day = datetime.today().date() + timedelta(days=7)
+    while store.business_calendar.is_closed(day, room):
+        day += timedelta(days=1)
+    store.conn.close()
+    return day
+
+
+# Function to check the database against what the sessions were told; returns {violation kind: [details]}
+def check_integrity(records, settings):
+    conn = booking_db.connect(booking_db.DB_FILE)
+    violations = {"double_booked": [], "lost_write": [], "phantom_write": [], "mismatched_write": [], "log_mismatch": []}
+
+    # No two bookings of a room may overlap
+    for row in conn.execute(
+        'SELECT a.id, b.id, a."Room", a."Date", a."Start Time", a."End Time", b."Start Time", b."End Time" '
+        'FROM bookings a JOIN bookings b ON a."Room" = b."Room" AND a."Date" = b."Date" AND a.id < b.id '
+        'AND a."Start Time" < b."End Time" AND b."Start Time" < a."End Time" WHERE a."Date" = ?',
+        (settings["date"].strftime('%Y-%m-%d'),),
+    ):
+        violations["double_booked"].append({"bookings": [row[0], row[1]], "room": row[2], "date": row[3],
+                                            "times": [f"{row[4][11:16]}-{row[5][11:16]}", f"{row[6][11:16]}-{row[7][11:16]}"]})
+
+    # Each session holds exactly the booking it was last told it holds (or none)
+    live = {}
+    for booking_id, user, title, start, end in conn.execute(
+        'SELECT id, "Booked By", "Meeting Title", "Start Time", "End Time" FROM bookings WHERE "Booked By" LIKE ?', (LOAD_USER + " %",)
+    ):
+        live.setdefault(user, []).append((booking_id, title, f"{start[11:16]}-{end[11:16]}"))
+    for final in [r for r in records if r["operation"] == "final"]:
+        user = f"{LOAD_USER} {final['session']}"
+        held = live.pop(user, [])
+        expected = final["booking"]
+        matching = [b for b in held if expected is not None and b[1] == expected[0]]
+        if expected is not None and not matching:
+            violations["lost_write"].append({"session": final["session"], "expected": expected})
+        for booking_id, title, slot in matching:
+            if slot != expected[1]:
+                violations["mismatched_write"].append({"session": final["session"], "booking": booking_id, "expected": expected[1], "stored": slot})
+        for booking_id, title, slot in [b for b in held if b not in matching[:1]]:
+            violations["phantom_write"].append({"session": final["session"], "booking": booking_id, "title": title, "slot": slot})
+    for user, held in live.items():
+        violations["phantom_write"].extend({"user": user, "booking": b[0], "title": b[1], "slot": b[2]} for b in held)
+
+    # The transaction log holds, in order, one row per operation a session was told succeeded, with the times it chose
+    logged = {}
+    for user, action, start, end in conn.execute(
+        'SELECT "User", "Action", "Start Time", "End Time" FROM transaction_log WHERE "User" LIKE ? ORDER BY id', (LOAD_USER + " %",)
+    ):
+        logged.setdefault(user, []).append((action, f"{start[11:16]}-{end[11:16]}"))
+    told = {}
+    for r in sorted((r for r in records if r.get("outcome") == "success"), key=lambda r: r["round"]):
+        told.setdefault(f"{LOAD_USER} {r['session']}", []).append(r)
+    for user in sorted(set(logged) | set(told)):
+        rows, successes = logged.get(user, []), told.get(user, [])
+        for i in range(max(len(rows), len(successes))):
+            row = rows[i] if i < len(rows) else None
+            success = successes[i] if i < len(successes) else None
+            if row is None or success is None or row[0] != LOG_ACTIONS[success["operation"]]:
+                violations["log_mismatch"].append({"user": user, "round": success and success["round"],
+                                                   "told": success and success["operation"], "logged": row})
+                break  # The rest of this user's rows are out of step
+            if success["operation"] != "cancel" and row[1] != success["slot"]:
+                violations["mismatched_write"].append({"user": user, "round": success["round"], "operation": success["operation"],
+                                                       "chosen": success["slot"], "logged": row[1]})
+
+    # Replaying the log gives the bookings table
+    schedule = audit_trail.schedule_at(conn, datetime.now() + timedelta(minutes=1))
+    replayed = {
+        (int(b), f"{s:%H:%M}-{e:%H:%M}")
+        for b, s, e, user in zip(schedule["Booking"], schedule["Start Time"], schedule["End Time"], schedule["User"])
+        if str(user).startswith(LOAD_USER + " ") and b is not None and b == b
+    }
+    stored = {
+        (booking_id, f"{start[11:16]}-{end[11:16]}")
+        for booking_id, start, end in conn.execute(
+            'SELECT id, "Start Time", "End Time" FROM bookings WHERE "Booked By" LIKE ?', (LOAD_USER + " %",)
+        )
+    }
+    for booking_id, slot in sorted(replayed ^ stored):
+        violations["log_mismatch"].append({"booking": booking_id, "slot": slot, "in": "log only" if (booking_id, slot) in replayed else "bookings only"})
+    conn.close()
+    return violations
+
+
+# Function to summarise click latencies in milliseconds
+def latency_summary(latencies):
+    if not latencies:
+        return None
+    ms = np.array(latencies) * 1e3
+    return {"count": len(ms), "p50_ms": float(np.percentile(ms, 50)), "p90_ms": float(np.percentile(ms, 90)),
+            "p99_ms": float(np.percentile(ms, 99)), "max_ms": float(ms.max())}
+
+
+# Function to build the report from the records, the wall time and the violations
+def summarise(records, elapsed, violations, settings):
+    operations = [r for r in records if r["operation"] in SUCCESS_MESSAGES]
+    clicks = [r for r in operations if r["latency"] is not None]
+    outcomes = {}
+    for r in operations:
+        outcomes.setdefault(r["operation"], {}).setdefault(r["outcome"], 0)
+        outcomes[r["operation"]][r["outcome"]] += 1
+    reruns = sum(r["reruns"] for r in records if r["operation"] == "final")
+    return {
+        "settings": {key: str(value) if key in ("date", "slots") else value for key, value in settings.items()},
+        "elapsed_s": elapsed,
+        "clicks": len(clicks),
+        "clicks_per_s": len(clicks) / elapsed,
+        "reruns_per_s": reruns / elapsed,
+        "outcomes": outcomes,
+        "latency": {op: latency_summary([r["latency"] for r in clicks if r["operation"] == op]) for op in SUCCESS_MESSAGES}
+                   | {"all": latency_summary([r["latency"] for r in clicks])},
+        "errors": [r for r in records if r.get("outcome") in ("exception", "no response")][:VIOLATION_EXAMPLES],
+        "violations": {kind: len(found) for kind, found in violations.items()},
+        "violation_examples": {kind: found[:VIOLATION_EXAMPLES] for kind, found in violations.items() if found},
+    }
+
+
+# Function to print the report
+def print_report(report):
+    print(f"\n{report['clicks']} clicks in {report['elapsed_s']:.1f}s: {report['clicks_per_s']:.1f} clicks/s, "
+          f"{report['reruns_per_s']:.1f} reruns/s")
+    print(f"\n{'operation':<10} {'outcomes':<48} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for op, stats in report["latency"].items():
+        outcomes = ", ".join(f"{k} {v}" for k, v in sorted(report["outcomes"].get(op, {}).items(), key=lambda kv: str(kv[0])))
+        times = " ".join(f"{stats[k]:7.0f}ms" for k in ("p50_ms", "p90_ms", "p99_ms", "max_ms")) if stats else ""
+        print(f"{op:<10} {outcomes:<48} {times}")
+    print("\nIntegrity violations:")
+    for kind, count in report["violations"].items():
+        print(f"  {kind:<20} {count}")
+        for example in report["violation_examples"].get(kind, []):
+            print(f"    {example}")
+    for error in report["errors"]:
+        print(f"\nSession {error['session']} {error['operation']} {error['outcome']}:\n{error['message']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test concurrent sessions of the booking app.")
+    parser.add_argument("--processes", type=int, default=4, help="app server processes sharing the database")
+    parser.add_argument("--sessions", type=int, default=2, help="concurrent sessions per process")
+    parser.add_argument("--rounds", type=int, default=20, help="operations per session")
+    parser.add_argument("--slots", type=int, default=6, help="overlapping one-hour slots the sessions compete for")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before a rerun or round times out")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory (its path is printed)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args()
+    quiet()
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("load-%Y%m%d-%H%M%S.json"))
+    work_dir = tempfile.mkdtemp(prefix="booking-load-")
+    run_dirs = prepare_workdir(work_dir, args.processes)
+    room = booking_db.read_rooms(booking_db.connect(booking_db.DB_FILE))["Name"].iloc[0]
+    settings = {"date": load_day(room), "room": room, "slots": hot_slots(args.slots), "rounds": args.rounds,
+                "seed": args.seed, "timeout": args.timeout, "processes": args.processes, "sessions": args.sessions}
+    print(f"Running {args.processes * args.sessions} sessions x {args.rounds} rounds on {room}, {settings['date']} "
+          f"({args.slots} slots) in {work_dir}...")
+
+    session_ids = [list(range(p * args.sessions + 1, (p + 1) * args.sessions + 1)) for p in range(args.processes)]
+    started = time.perf_counter()
+    if args.processes == 1:
+        records = run_sessions(run_dirs[0], session_ids[0], threading.Barrier(args.sessions), settings)
+    else:
+        context = multiprocessing.get_context("spawn")
+        barrier, results = context.Barrier(args.processes * args.sessions), context.Queue()
+        workers = [context.Process(target=_process_main, args=(run_dir, ids, barrier, settings, results))
+                   for run_dir, ids in zip(run_dirs, session_ids)]
+        for worker in workers:
+            worker.start()
+        records = [r for _ in workers for r in results.get()]
+        for worker in workers:
+            worker.join()
+    elapsed = time.perf_counter() - started
+
+    os.chdir(work_dir)
+    report = summarise(records, elapsed, check_integrity(records, settings), settings)
+    print_report(report)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print("\nResults written to", output)
+    if args.keep:
+        print("Scratch directory kept:", work_dir)
+    else:
+        os.chdir(ROOT_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(1 if any(report["violations"].values()) else 0)
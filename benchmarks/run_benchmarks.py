@@ -0,0 +1,218 @@
+# Hot-path benchmarks on synthetic data (see generate_data.py). Run from the repository root:
+#   python benchmarks/run_benchmarks.py --sizes 10000 100000 1000000
+#   python benchmarks/run_benchmarks.py --sizes 10000 --compare benchmarks/results/<previous>.json
+# Results are written as JSON to benchmarks/results/ so runs can be compared for regressions.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import audit_trail  # noqa: E402
+import booking_db  # noqa: E402
+import booking_snapshot  # noqa: E402
+from booking_store import BookingStore  # noqa: E402
+from calendar_events import create_calendar_events, bookings_in_window, month_window  # noqa: E402
+from usage_stats import business_day_calendar, filter_calendar, utilization_by, with_date  # noqa: E402
+from allocation import allocate  # noqa: E402
+from availability import SLOT_BOUNDARIES, SLOTS_PER_DAY  # noqa: E402
+from generate_data import ensure_data  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# Function to time fn() `repeat` times; returns a result row (seconds, per call)
+def measure(name, size, fn, repeat, ops=1):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) / ops)
+    return {
+        "benchmark": name,
+        "size": size,
+        "repeat": repeat,
+        "ops": ops,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.mean(timings),
+    }
+
+
+# Function to run every hot-path benchmark against one generated data set
+def run_size(size, repeat, queries):
+    data_dir = ensure_data(size)
+    bookings_csv = os.path.join(data_dir, "bookings.csv")
+    db_path = os.path.join(data_dir, "bookings.db")
+    for suffix in ["", "-wal", "-shm", ".bookings.parquet", ".transaction_log.parquet", ".log-queue.jsonl"]:
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    results = []
+    rng = np.random.default_rng(1)
+
+    # Initial load: the legacy CSV parse, the one-shot SQLite import and the store's cold start
+    def read_csv():
+        bookings = pd.read_csv(bookings_csv)
+        bookings['Start Time'] = pd.to_datetime(bookings['Start Time'])
+        bookings['End Time'] = pd.to_datetime(bookings['End Time'])
+        bookings['Contact Number'] = bookings['Contact Number'].astype(str)
+    results.append(measure("csv_load", size, read_csv, repeat))
+
+    conn = booking_db.connect(db_path)
+    results.append(measure("sqlite_import", size, lambda: booking_db.import_csv_files(
+        conn, bookings_csv, os.path.join(data_dir, "transaction_log.csv"), os.path.join(data_dir, "blocked_dates.csv")
+    ), 1))
+    def cold_start_without_snapshot():
+        if os.path.exists(booking_snapshot.snapshot_path(db_path, "bookings")):
+            os.remove(booking_snapshot.snapshot_path(db_path, "bookings"))
+        BookingStore(db_path)
+    results.append(measure("store_cold_start_sqlite", size, cold_start_without_snapshot, repeat))
+    results.append(measure("store_cold_start", size, lambda: BookingStore(db_path), repeat))
+    store = BookingStore(db_path)
+    bookings = store.bookings
+
+    # Book Room conflict check: random room/day/time queries against the interval index
+    sample = bookings.sample(n=queries, replace=True, random_state=1)
+    offsets = pd.to_timedelta(rng.integers(-2, 3, queries) * 30, unit="min")
+    starts = (sample['Start Time'] + offsets).tolist()
+    ends = (sample['Start Time'] + offsets + pd.Timedelta(minutes=60)).tolist()
+    conflict_queries = list(zip(sample['Room'], sample['Date'], starts, ends))
+    results.append(measure("conflict_check", size, lambda: [store.find_conflict(*q) for q in conflict_queries], repeat, queries))
+
+    # Calendar build for one month, both view types, all rooms and a single room
+    month_start = pd.Timestamp(bookings['Date'].iloc[len(bookings) // 2]).date().replace(day=1)
+    room = bookings['Room'].iloc[0]
+    for view_type in ["dayGridMonth", "listMonth"]:
+        for room_filter in ["All Rooms", room]:
+            name = f"calendar_events[{view_type},{'all' if room_filter == 'All Rooms' else 'room'}]"
+            results.append(measure(name, size, lambda: create_calendar_events(
+                bookings_in_window(store.bookings_between(*month_window(month_start)), room_filter, month_start), {}, view_type
+            ), repeat))
+
+    # Calendar window of a past month (read from its archive partitions)
+    past_month = (pd.Timestamp.today() - pd.DateOffset(months=1)).date().replace(day=1)
+    results.append(measure("calendar_window_past_month", size, lambda: store.bookings_between(*month_window(past_month)), repeat))
+    results.append(measure("admin_read_all_bookings", size, store.read_all_bookings, repeat))
+
+    # Edit tab password lookup
+    passwords = pd.read_csv(bookings_csv, usecols=["Password"])["Password"].sample(n=100, replace=True, random_state=1).tolist()
+    results.append(measure("password_lookup", size, lambda: [store.find_by_password(p, "2000-01-01") for p in passwords[:100]], repeat, 100))
+
+    # Transaction log append: synchronous transaction vs the write-behind queue (journal append only)
+    log_entry = {"Action": "Booking", "Room": room, "Date": "2026-01-05", "Start Time": "2026-01-05 09:00:00",
+                 "End Time": "2026-01-05 10:00:00", "User": "Benchmark", "Meeting Title": "Benchmark",
+                 "Contact Number": "0", "Password": "benchmark", "Timestamp": "2026-01-05 08:00:00"}
+    results.append(measure("log_transaction_sync", size, lambda: store.log_transaction(log_entry), repeat))
+    write_behind_store = BookingStore(db_path, write_behind=True)
+    results.append(measure("log_transaction_write_behind", size, lambda: write_behind_store.log_transaction(log_entry), repeat))
+    write_behind_store.log_writer.close()
+
+    # Audit trail: one user's events, taking the replay checkpoints, and the whole schedule as of the middle of the log
+    audit_user = bookings['Booked By'].iloc[0]
+    results.append(measure("audit_user_events", size, lambda: audit_trail.events(store.conn, users=[audit_user]), repeat))
+    audit_time = store.conn.execute(
+        'SELECT "Timestamp" FROM transaction_log ORDER BY "Timestamp" LIMIT 1 OFFSET ?', (size // 2,)
+    ).fetchone()[0]
+    results.append(measure("audit_checkpoints", size, lambda: audit_trail.update_checkpoints(store.conn), 1))
+    results.append(measure("audit_schedule_at", size, lambda: audit_trail.schedule_at(store.conn, audit_time), repeat))
+
+    # Room allocation: a batch of headcount/time-window requests over the busiest upcoming days
+    rooms = {room: int(room.split("Max ")[1].split(" ")[0]) for room in bookings['Room'].unique()}
+    days = pd.to_datetime(pd.Series(bookings['Date'].unique()).sort_values().head(5)).dt.date.tolist()
+    earliest = rng.integers(0, 16, queries)
+    allocation_requests = [
+        {"Date": days[i % len(days)], "Headcount": int(rng.integers(1, 25)), "Slots": int(rng.integers(1, 5)),
+         "Earliest": SLOT_BOUNDARIES[e], "Latest": SLOT_BOUNDARIES[min(e + 6, 20)]}
+        for i, e in enumerate(earliest)
+    ]
+    results.append(measure("allocate_batch", size, lambda: allocate(allocation_requests, rooms, store.day_mask, lambda d: False), repeat, queries))
+
+    # Usage Dashboard aggregations
+    usage, users = booking_db.read_usage_rollup(store.conn)
+    results.append(measure("dashboard_load_rollups", size, lambda: booking_db.read_usage_rollup(store.conn), repeat))
+    usage, users = with_date(usage), with_date(users)
+    first_day, last_day = datetime(int(usage['Year'].min()), 1, 1), datetime(int(usage['Year'].max()), 12, 31)
+    room_slots = {r: SLOTS_PER_DAY for r in rooms}
+    working_days = business_day_calendar(first_day, last_day, store.business_calendar, room_slots)
+    room_days = business_day_calendar(first_day, last_day, store.business_calendar, {room: SLOTS_PER_DAY})
+    results.append(measure("dashboard_business_days", size, lambda: business_day_calendar(
+        first_day, last_day, store.business_calendar, room_slots
+    ), repeat))
+    results.append(measure("dashboard_monthly_utilization", size, lambda: utilization_by(usage, working_days, ['Year', 'Month']), repeat))
+    results.append(measure("dashboard_daily_utilization", size, lambda: utilization_by(usage, working_days, ['Date']), repeat))
+    year = int(usage['Year'].min())
+    results.append(measure("dashboard_filtered_utilization", size, lambda: utilization_by(
+        usage[(usage['Year'] == year) & (usage['Room'] == room)], filter_calendar(room_days, year=year), ['Year', 'Month']
+    ), repeat))
+    results.append(measure("dashboard_monthly_bookings", size, lambda: usage.groupby(['Year', 'Month'])['Bookings'].sum(), repeat))
+    results.append(measure("dashboard_monthly_unique_users", size, lambda: users.groupby(['Year', 'Month'])['User'].nunique(), repeat))
+    results.append(measure("dashboard_daily_unique_users", size, lambda: users.groupby('Date')['User'].nunique(), repeat))
+
+    store.conn.close()
+    conn.close()
+    return results
+
+
+# Function to describe the environment the results were measured in
+def run_metadata():
+    try:
+        commit = subprocess.check_output(["git", "-C", ROOT_DIR, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+
+
+# Function to print the median of each benchmark next to a previous run (ratio > 1 means slower)
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"\n{'benchmark':<45} {'size':>9} {'median':>12} {'previous':>12} {'ratio':>7}")
+    for r in results:
+        old = previous.get((r["benchmark"], r["size"]))
+        old_median = old["median_s"] if old else None
+        ratio = f"{r['median_s'] / old_median:7.2f}" if old_median else "      -"
+        old_text = f"{old_median * 1e3:10.3f}ms" if old_median else "           -"
+        print(f"{r['benchmark']:<45} {r['size']:>9} {r['median_s'] * 1e3:10.3f}ms {old_text} {ratio}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the booking app's hot paths on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=1000, help="conflict-check queries per repeat")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        print(f"Running benchmarks for {size} bookings...")
+        for r in run_size(size, args.repeat, args.queries):
+            print(f"  {r['benchmark']:<45} median {r['median_s'] * 1e3:10.3f} ms (per op)")
+            results.append(r)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"metadata": run_metadata(), "results": results}, f, indent=2)
+    print("Results written to", output)
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+import pandas as pd
+import booking_db
+import booking_service
+import recurrence
+from availability import SLOT_MINUTES
+from instrumentation import span
+
+# Local HTTP/JSON API over the booking service (booking_service.py), for other systems to book rooms
+# without driving the Streamlit pages. Set BOOKING_API_PORT (and optionally BOOKING_API_HOST) and the Streamlit app starts it in a
+# background thread on the same in-process store the pages use (see start_booking_api in Bookingapp.py);
+# run as a script it serves its own store on the same database instead (then with synchronous
+# transaction log writes, as the write-behind journal belongs to the Streamlit server).
+# Requests are served by a thread each over keep-alive connections; reads are answered from the
+# store's in-memory index and writes are single SQLite transactions.
+#
+#   GET    /rooms                                                     bookable rooms
+#   GET    /availability?date=2026-01-05[&room=...]                   free times per room on a date
+#   GET    /search?date=2026-01-05&duration=60[&headcount=8][&room=...][&limit=10]   next free slots
+#   POST   /bookings          {"Room", "Date", "Start Time", "End Time", "Booked By", "Meeting Title",
+#                              "Contact Number", "Password"[, "Repeat": "Weekly", "Occurrences" or "Until",
+#                              "Skip Unavailable"]}
+#   POST   /bookings/lookup   {"Password"}                            upcoming bookings made with a password
+#   PATCH  /bookings/<id>     {"Password"[, "Version", "Room", "Date", "Start Time", "End Time",
+#                              "Meeting Title", "Whole Series"]}
+#   DELETE /bookings/<id>     {"Password"[, "Version", "Whole Series"]}
+#
+# Dates are YYYY-MM-DD and times HH:MM. Rejections answer {"error": message} with status 400 (invalid),
+# 404 (no booking with that id and password) or 409 (conflict, or changed since "Version").
+API_PORT_ENV = "BOOKING_API_PORT"
+API_HOST_ENV = "BOOKING_API_HOST"  # Default: local connections only
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+ERROR_STATUS = {"invalid": 400, "not_found": 404, "conflict": 409, "stale": 409}
+
+
+# Function to parse a date field ("YYYY-MM-DD"); None when it is absent and not required
+def _date(value, field, required=True):
+    if value in (None, ""):
+        if required:
+            raise booking_service.BookingError(f"Invalid request: missing {field}")
+        return None
+    try:
+        return pd.Timestamp(str(value)).date()
+    except ValueError:
+        raise booking_service.BookingError(f"Invalid request: {field} is not a date")
+
+
+# Function to parse a time field ("HH:MM"); None when it is absent and not required
+def _time(value, field, required=True):
+    if value in (None, ""):
+        if required:
+            raise booking_service.BookingError(f"Invalid request: missing {field}")
+        return None
+    try:
+        return pd.Timestamp(str(value)).time()
+    except ValueError:
+        raise booking_service.BookingError(f"Invalid request: {field} is not a time")
+
+
+# Function to parse an integer field
+def _int(value, field, default=None):
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise booking_service.BookingError(f"Invalid request: {field} is not a number")
+
+
+# Function to check a text field is a string (missing fields are left to the booking rules)
+def _text(value, field):
+    if value is not None and not isinstance(value, str):
+        raise booking_service.BookingError(f"Invalid request: {field} must be a string")
+    return value
+
+
+# Function to convert a booking row of the store to JSON
+def booking_json(booking_id, booking):
+    return {
+        "id": int(booking_id),
+        "Room": booking["Room"],
+        "Date": booking["Date"],
+        "Start Time": booking["Start Time"].strftime('%H:%M'),
+        "End Time": booking["End Time"].strftime('%H:%M'),
+        "Booked By": booking["Booked By"],
+        "Meeting Title": booking["Meeting Title"],
+        "Contact Number": booking["Contact Number"],
+        "Version": int(booking["Version"]),
+        "Series": None if pd.isna(booking["Series"]) else booking["Series"],
+    }
+
+
+# Routes: each handler takes (store, query or body, booking id) and returns (status, JSON-able result)
+def get_rooms(store, query, booking_id):
+    rooms = store.rooms
+    return 200, [
+        {"Name": name, "Capacity": int(capacity), "Site": site, "Opens": opens, "Closes": closes}
+        for name, capacity, site, opens, closes in zip(rooms["Name"], rooms["Capacity"], rooms["Site"], rooms["Opens"], rooms["Closes"])
+    ]
+
+
+def get_availability(store, query, booking_id):
+    date = _date(query.get("date"), "date")
+    free = booking_service.free_times(store, date, query.get("rooms"))
+    return 200, {
+        "Date": date.strftime('%Y-%m-%d'),
+        "Rooms": {room: [{"Start Time": s.strftime('%H:%M'), "End Time": e.strftime('%H:%M')} for s, e in times] for room, times in free.items()},
+    }
+
+
+def get_search(store, query, booking_id):
+    duration = _int(query.get("duration"), "duration", 60)
+    slots = booking_service.search_free_slots(
+        store, _date(query.get("date"), "date", required=False) or datetime.today().date(), -(-duration // SLOT_MINUTES),
+        _int(query.get("headcount"), "headcount", 1), query.get("rooms"), _int(query.get("limit"), "limit", 10)
+    )
+    return 200, {"Slots": [
+        {"Date": d.strftime('%Y-%m-%d'), "Room": room, "Start Time": s.strftime('%H:%M'), "End Time": e.strftime('%H:%M')}
+        for d, room, s, e in slots
+    ]}
+
+
+def post_booking(store, body, booking_id):
+    fields = (
+        _text(body.get("Room"), "Room"), _date(body.get("Date"), "Date"), _time(body.get("Start Time"), "Start Time"),
+        _time(body.get("End Time"), "End Time"), _text(body.get("Booked By"), "Booked By"), _text(body.get("Meeting Title"), "Meeting Title"),
+        _text(body.get("Contact Number"), "Contact Number"), _text(body.get("Password"), "Password"),
+    )
+    repeat = body.get("Repeat")
+    if not repeat:
+        return 201, {"ids": [int(booking_service.book(store, *fields))], "skipped": []}
+    if repeat not in recurrence.FREQUENCIES:
+        raise booking_service.BookingError(f"Invalid request: Repeat must be one of {', '.join(recurrence.FREQUENCIES)}")
+    occurrences = _int(body.get("Occurrences"), "Occurrences")
+    until = _date(body.get("Until"), "Until", required=occurrences is None)
+    booking_ids, skipped = booking_service.book_series(
+        store, *fields, recurrence.FREQUENCIES[repeat], occurrences, until, bool(body.get("Skip Unavailable"))
+    )
+    return 201, {"ids": [int(i) for i in booking_ids], "skipped": skipped.to_dict("records")}
+
+
+def post_lookup(store, body, booking_id):
+    if not _text(body.get("Password"), "Password"):
+        raise booking_service.BookingError("Invalid request: missing Password")
+    store.refresh()
+    matched = store.find_by_password(body["Password"], datetime.today().strftime('%Y-%m-%d'))
+    return 200, {"Bookings": [booking_json(i, row) for i, row in matched.iterrows()]}
+
+
+def patch_booking(store, body, booking_id):
+    changed = booking_service.edit(
+        store, booking_id, _text(body.get("Password"), "Password"), _text(body.get("Room"), "Room"), _date(body.get("Date"), "Date", required=False),
+        _time(body.get("Start Time"), "Start Time", required=False), _time(body.get("End Time"), "End Time", required=False),
+        _text(body.get("Meeting Title"), "Meeting Title"), _int(body.get("Version"), "Version"), bool(body.get("Whole Series"))
+    )
+    return 200, {"changed": changed}
+
+
+def delete_booking(store, body, booking_id):
+    cancelled = booking_service.cancel(store, booking_id, _text(body.get("Password"), "Password"), _int(body.get("Version"), "Version"), bool(body.get("Whole Series")))
+    return 200, {"cancelled": cancelled}
+
+
+ROUTES = {
+    ("GET", "/rooms"): get_rooms,
+    ("GET", "/availability"): get_availability,
+    ("GET", "/search"): get_search,
+    ("POST", "/bookings"): post_booking,
+    ("POST", "/bookings/lookup"): post_lookup,
+    ("PATCH", "/bookings/<id>"): patch_booking,
+    ("DELETE", "/bookings/<id>"): delete_booking,
+}
+
+
+class BookingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive: clients reuse one connection for many requests
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes; don't hold the body back for an ACK
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    # Function to route a request, run it and write the JSON response
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        path, booking_id = url.path.rstrip("/"), None
+        parts = path.split("/")
+        if len(parts) == 3 and parts[1] == "bookings" and parts[2].isdigit():
+            path, booking_id = "/bookings/<id>", int(parts[2])
+        route = ROUTES.get((method, path))
+        try:
+            if route is None:
+                status, result = 404, {"error": f"No such endpoint: {method} {unquote(url.path)}"}
+            else:
+                with span("api:" + method + " " + path):
+                    status, result = route(self.server.store, self._request_data(method, url), booking_id)
+        except booking_service.BookingError as e:
+            status, result = ERROR_STATUS.get(e.code, 400), {"error": str(e)}
+            if e.details is not None:
+                result["details"] = e.details.to_dict("records")
+        except (ValueError, TypeError) as e:
+            status, result = 400, {"error": f"Invalid request: {e}"}
+        self._send(status, result)
+
+    # Function to read the query string (GET: one value per parameter, "room" may repeat) or the JSON body
+    def _request_data(self, method, url):
+        if method == "GET":
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            query["rooms"] = parse_qs(url.query).get("room")
+            return query
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("the body must be a JSON object")
+        return body
+
+    def _send(self, status, result):
+        data = json.dumps(result, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Requests are not logged to stderr (at hundreds per second it would cost more than serving them)
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to create the API server for a store (call serve_forever() on it, or use start())
+def make_server(store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), BookingRequestHandler)
+    server.daemon_threads = True
+    server.store = store
+    return server
+
+
+# Function to serve the API for a store from a background thread; returns the server (server.shutdown() stops it)
+def start(store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = make_server(store, host, port)
+    threading.Thread(target=server.serve_forever, name="booking-api", daemon=True).start()
+    return server
+
+
+# Function to start the API for a store if BOOKING_API_PORT is set; returns the server, or None
+def start_from_env(store):
+    if not os.environ.get(API_PORT_ENV):
+        return None
+    return start(store, os.environ.get(API_HOST_ENV, DEFAULT_HOST), int(os.environ[API_PORT_ENV]))
+
+
+# Run as a script: python booking_api.py [--host 127.0.0.1] [--port 8502] [--db bookings.db]
+if __name__ == "__main__":
+    from booking_store import BookingStore
+
+    parser = argparse.ArgumentParser(description="Serve the booking HTTP/JSON API.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=booking_db.DB_FILE)
+    args = parser.parse_args()
+
+    api_server = make_server(BookingStore(args.db), args.host, args.port)
+    print("Serving the booking API on http://%s:%d" % (args.host, args.port))
+    try:
+        api_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,885 @@
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import sys
+from contextlib import contextmanager
+import pandas as pd
+
+DB_FILE = "bookings.db"
+BOOKINGS_CSV = "bookings.csv"
+TRANSACTION_LOG_CSV = "transaction_log.csv"
+BLOCKED_DATES_CSV = "blocked_dates.csv"
+ROOMS_CSV = "rooms.csv"
+
+BOOKING_COLUMNS = ["Room", "Date", "Start Time", "End Time", "Booked By", "Meeting Title", "Contact Number", "Password Hash"]
+LOG_COLUMNS = ["Action", "Room", "Date", "Start Time", "End Time", "User", "Meeting Title", "Contact Number", "Password Hash", "Timestamp", "Booking"]
+# Text columns of the transaction log holding a date/time, normalized to ISO text on the way in
+LOG_TIME_COLUMNS = ["Date", "Start Time", "End Time", "Timestamp"]
+# Version of the stored log format: 2 = ISO dates/times and a "Booking" id column
+LOG_FORMAT = "2"
+
+ROOM_COLUMNS = ["Name", "Capacity", "Site", "Opens", "Closes", "Colour"]
+
+# Low-cardinality text columns held as pandas categoricals in memory and in the columnar snapshots
+CATEGORY_COLUMNS = ["Room", "Booked By"]
+LOG_CATEGORY_COLUMNS = ["Action", "Room", "User"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    "Room" TEXT NOT NULL,
+    "Date" TEXT NOT NULL,
+    "Start Time" TEXT NOT NULL,
+    "End Time" TEXT NOT NULL,
+    "Booked By" TEXT,
+    "Meeting Title" TEXT,
+    "Contact Number" TEXT,
+    "Password Hash" TEXT,
+    "Version" INTEGER NOT NULL DEFAULT 1,  -- Bumped on every edit; edits and cancellations compare-and-swap on it
+    "Series" TEXT  -- Shared by the occurrences of a recurring booking (NULL for one-off bookings)
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_room_date_start ON bookings ("Room", "Date", "Start Time");
+CREATE INDEX IF NOT EXISTS idx_bookings_password_hash ON bookings ("Password Hash");
+CREATE INDEX IF NOT EXISTS idx_bookings_series ON bookings ("Series");
+
+-- Cold partition: bookings dated before today are moved here daily, partitioned by "Month" (YYYY-MM).
+-- Only the Usage Dashboard, the Admin Page and past calendar months read it.
+CREATE TABLE IF NOT EXISTS booking_archive (
+    id INTEGER PRIMARY KEY,
+    "Month" TEXT NOT NULL,
+    "Room" TEXT NOT NULL,
+    "Date" TEXT NOT NULL,
+    "Start Time" TEXT NOT NULL,
+    "End Time" TEXT NOT NULL,
+    "Booked By" TEXT,
+    "Meeting Title" TEXT,
+    "Contact Number" TEXT,
+    "Password Hash" TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_booking_archive_month ON booking_archive ("Month", "Room");
+
+CREATE TABLE IF NOT EXISTS transaction_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    "Action" TEXT NOT NULL,
+    "Room" TEXT,
+    "Date" TEXT,
+    "Start Time" TEXT,
+    "End Time" TEXT,
+    "User" TEXT,
+    "Meeting Title" TEXT,
+    "Contact Number" TEXT,
+    "Password Hash" TEXT,
+    "Timestamp" TEXT,  -- Event time (YYYY-MM-DD HH:MM:SS)
+    "Booking" INTEGER  -- Id of the booking the event belongs to (NULL for rows logged before ids were recorded)
+);
+
+-- Filters of the Admin Page history view (booking date, room, user, action)
+CREATE INDEX IF NOT EXISTS idx_transaction_log_date ON transaction_log ("Date");
+CREATE INDEX IF NOT EXISTS idx_transaction_log_room_date ON transaction_log ("Room", "Date");
+CREATE INDEX IF NOT EXISTS idx_transaction_log_user_date ON transaction_log ("User", "Date");
+CREATE INDEX IF NOT EXISTS idx_transaction_log_action_date ON transaction_log ("Action", "Date");
+-- Audit trail queries (see audit_trail.py): by event time, alone or per booking, room or user
+CREATE INDEX IF NOT EXISTS idx_transaction_log_timestamp ON transaction_log ("Timestamp");
+CREATE INDEX IF NOT EXISTS idx_transaction_log_booking_timestamp ON transaction_log ("Booking", "Timestamp");
+CREATE INDEX IF NOT EXISTS idx_transaction_log_room_timestamp ON transaction_log ("Room", "Timestamp");
+CREATE INDEX IF NOT EXISTS idx_transaction_log_user_timestamp ON transaction_log ("User", "Timestamp");
+
+-- Periodic checkpoints of the schedule replayed from the transaction log (see audit_trail.py): the live
+-- bookings after every event up to ("Event Time", "Last Event") in (Timestamp, id) order, as JSON.
+-- Derived data: dropped whenever a log row older than a checkpoint is written.
+CREATE TABLE IF NOT EXISTS audit_checkpoints (
+    "Event Time" TEXT NOT NULL,
+    "Last Event" INTEGER NOT NULL,
+    "Events" INTEGER NOT NULL,
+    "Bookings" INTEGER NOT NULL,
+    "State" TEXT NOT NULL,
+    PRIMARY KEY ("Event Time", "Last Event")
+);
+
+CREATE TRIGGER IF NOT EXISTS transaction_log_no_update BEFORE UPDATE ON transaction_log
+BEGIN SELECT RAISE(ABORT, 'transaction_log is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS transaction_log_no_delete BEFORE DELETE ON transaction_log
+BEGIN SELECT RAISE(ABORT, 'transaction_log is append-only'); END;
+
+CREATE TABLE IF NOT EXISTS blocked_dates (
+    "Blocked Date" TEXT PRIMARY KEY
+);
+-- Dates blocked for one room only (blocked_dates close every room)
+CREATE TABLE IF NOT EXISTS room_blocked_dates (
+    "Room" TEXT NOT NULL,
+    "Blocked Date" TEXT NOT NULL,
+    PRIMARY KEY ("Room", "Blocked Date")
+);
+
+-- Usage rollups maintained alongside every booking write (read by the Usage Dashboard).
+-- usage_rollup_users is the distinct-user sketch: a per-day count of bookings per user,
+-- so a cancellation can remove a user again (which a probabilistic sketch could not).
+CREATE TABLE IF NOT EXISTS usage_rollup (
+    "Room" TEXT NOT NULL,
+    "Year" INTEGER NOT NULL,
+    "Month" INTEGER NOT NULL,
+    "Day" INTEGER NOT NULL,
+    "Booked Minutes" REAL NOT NULL,
+    "Bookings" INTEGER NOT NULL,
+    PRIMARY KEY ("Room", "Year", "Month", "Day")
+);
+CREATE TABLE IF NOT EXISTS usage_rollup_users (
+    "Room" TEXT NOT NULL,
+    "Year" INTEGER NOT NULL,
+    "Month" INTEGER NOT NULL,
+    "Day" INTEGER NOT NULL,
+    "User" TEXT NOT NULL,
+    "Bookings" INTEGER NOT NULL,
+    PRIMARY KEY ("Room", "Year", "Month", "Day", "User")
+);
+
+-- Room registry, synced from rooms.csv (rooms dropped from the file are kept but marked inactive)
+CREATE TABLE IF NOT EXISTS rooms (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    "Name" TEXT NOT NULL UNIQUE,
+    "Capacity" INTEGER NOT NULL,
+    "Site" TEXT,
+    "Opens" TEXT NOT NULL DEFAULT '08:00',
+    "Closes" TEXT NOT NULL DEFAULT '18:00',
+    "Colour" TEXT,
+    "Active" INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Bumped by every write to bookings, so a snapshot of the table taken at generation N is current
+-- exactly while the counter is still N (see booking_snapshot.py)
+INSERT OR IGNORE INTO meta (key, value) VALUES ('bookings_generation', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('log_format', 2);  -- New databases start in the current format
+CREATE TRIGGER IF NOT EXISTS bookings_generation_insert AFTER INSERT ON bookings
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'bookings_generation'; END;
+CREATE TRIGGER IF NOT EXISTS bookings_generation_update AFTER UPDATE ON bookings
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'bookings_generation'; END;
+CREATE TRIGGER IF NOT EXISTS bookings_generation_delete AFTER DELETE ON bookings
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'bookings_generation'; END;
+
+-- Bumped by every write to the data the store keeps in memory (bookings, blocked dates, rooms), so the
+-- store can tell such a commit from one that only touched the transaction log (see booking_store.refresh)
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_generation', 0);
+CREATE TRIGGER IF NOT EXISTS bookings_data_generation_insert AFTER INSERT ON bookings
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS bookings_data_generation_update AFTER UPDATE ON bookings
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS bookings_data_generation_delete AFTER DELETE ON bookings
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS blocked_dates_data_generation_insert AFTER INSERT ON blocked_dates
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS blocked_dates_data_generation_update AFTER UPDATE ON blocked_dates
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS blocked_dates_data_generation_delete AFTER DELETE ON blocked_dates
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS room_blocked_dates_data_generation_insert AFTER INSERT ON room_blocked_dates
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS room_blocked_dates_data_generation_update AFTER UPDATE ON room_blocked_dates
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS room_blocked_dates_data_generation_delete AFTER DELETE ON room_blocked_dates
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS rooms_data_generation_insert AFTER INSERT ON rooms
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS rooms_data_generation_update AFTER UPDATE ON rooms
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+CREATE TRIGGER IF NOT EXISTS rooms_data_generation_delete AFTER DELETE ON rooms
+BEGIN UPDATE meta SET value = value + 1 WHERE key = 'data_generation'; END;
+"""
+
+
+# Raised when a write would overlap an existing booking in the same room
+class BookingConflictError(Exception):
+    def __init__(self, booked_by):
+        super().__init__(f"Room already booked by {booked_by}")
+        self.booked_by = booked_by
+
+
+# Raised when a booking was edited or cancelled elsewhere after the given version was read
+class StaleBookingError(Exception):
+    def __init__(self, booking_id, expected_version):
+        super().__init__(f"Booking {booking_id} is no longer at version {expected_version}")
+        self.booking_id = booking_id
+        self.expected_version = expected_version
+
+
+# Function to quote a column name for SQL ("Start Time" etc. contain spaces)
+def quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+# Function to convert a datetime/Timestamp/string to the stored text format
+def to_db_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+# Function to hash a meeting password with the database's secret salt (HMAC-SHA256).
+# The salt is the same for every row so a typed password can be looked up directly by its hash.
+def hash_password(salt, password):
+    if password is None or (not isinstance(password, str) and pd.isna(password)):
+        return None
+    return hmac.new(salt.encode(), str(password).encode(), hashlib.sha256).hexdigest()
+
+
+# Function to read (or create on first use) the database's password salt
+def get_password_salt(conn):
+    salt = get_meta(conn, "password_salt")
+    if salt is None:
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('password_salt', ?)", (secrets.token_hex(16),))
+        salt = get_meta(conn, "password_salt")
+    return salt
+
+
+# Function to list the column names of a table
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# One-time migration for databases created before passwords were hashed:
+# hash the plaintext "Password" columns into "Password Hash" and drop the plaintext
+def migrate_plaintext_passwords(conn):
+    if "Password" not in table_columns(conn, "bookings"):
+        return
+    salt = get_password_salt(conn)
+    with transaction(conn):
+        conn.execute('DROP TRIGGER IF EXISTS transaction_log_no_update')  # Re-created by SCHEMA afterwards
+        for table in ["bookings", "transaction_log"]:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN "Password Hash" TEXT')
+            rows = conn.execute(f'SELECT id, "Password" FROM {table}').fetchall()
+            conn.executemany(
+                f'UPDATE {table} SET "Password Hash" = ? WHERE id = ?',
+                [(hash_password(salt, password), row_id) for row_id, password in rows],
+            )
+            if table == "bookings":
+                conn.execute("DROP INDEX IF EXISTS idx_bookings_password")
+            conn.execute(f'ALTER TABLE {table} DROP COLUMN "Password"')
+
+
+# Columns added to the bookings table after its first release, with their definitions
+ADDED_BOOKING_COLUMNS = {"Version": "INTEGER NOT NULL DEFAULT 1", "Series": "TEXT"}
+
+
+# One-time migration for databases created before the ADDED_BOOKING_COLUMNS existed
+def migrate_booking_columns(conn):
+    missing = [column for column in ADDED_BOOKING_COLUMNS if column not in table_columns(conn, "bookings")]
+    if not missing:
+        return
+    with transaction(conn):
+        for column in missing:
+            conn.execute("ALTER TABLE bookings ADD COLUMN " + quote(column) + " " + ADDED_BOOKING_COLUMNS[column])
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'bookings_generation'")  # Snapshots lack the new columns
+
+
+# Function to normalize date/time text to ISO: "YYYY-MM-DD" (dates_only) or "YYYY-MM-DD HH:MM:SS".
+# Accepts ISO text, D/M/YYYY [H:MM] as written to transaction_log.csv by hand, and bare "9:00 AM" clock
+# times (combined with the matching entry of `dates`, a YYYY-MM-DD Series). Empty values become None;
+# text that parses as none of these is kept as it was.
+def normalize_times(values, dates_only=False, dates=None):
+    text = pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+    iso = text.str.match(r"\d{4}-\d{1,2}-\d{1,2}")
+    parsed = pd.to_datetime(text.where(iso), format="ISO8601", errors="coerce")
+    dayfirst = text.str.match(r"\d{1,2}/\d{1,2}/\d{4}")
+    if dayfirst.any():
+        parsed = parsed.fillna(pd.to_datetime(text.where(dayfirst), format="mixed", dayfirst=True, errors="coerce"))
+    if dates is not None:
+        clock = text.str.match(r"\d{1,2}:\d{2}\s*[AaPp][Mm]$")
+        if clock.any():
+            clock_times = pd.Series(dates, dtype=object).where(clock).str.cat(text.where(clock), sep=" ")
+            parsed = parsed.fillna(pd.to_datetime(clock_times, format="%Y-%m-%d %I:%M %p", errors="coerce"))
+    normalized = parsed.dt.strftime('%Y-%m-%d' if dates_only else '%Y-%m-%d %H:%M:%S').astype(object)
+    normalized = normalized.where(parsed.notna(), text)
+    return normalized.where(text != "", None)
+
+
+# Function to normalize the LOG_TIME_COLUMNS of a transaction log frame in place (see normalize_times)
+def normalize_log_times(transaction_log):
+    transaction_log["Date"] = normalize_times(transaction_log["Date"], dates_only=True).values
+    for column in ["Start Time", "End Time"]:
+        transaction_log[column] = normalize_times(transaction_log[column], dates=transaction_log["Date"]).values
+    transaction_log["Timestamp"] = normalize_times(transaction_log["Timestamp"]).values
+    return transaction_log
+
+
+# One-time migration for transaction logs stored before LOG_FORMAT 2: add the "Booking" column and
+# rewrite the dates/times imported as D/M/YYYY text to ISO, so they sort and compare as text
+def migrate_transaction_log(conn):
+    if get_meta(conn, "log_format") == LOG_FORMAT:
+        return
+    with transaction(conn):
+        if "Booking" not in table_columns(conn, "transaction_log"):
+            conn.execute('ALTER TABLE transaction_log ADD COLUMN "Booking" INTEGER')
+        conn.execute('DROP TRIGGER IF EXISTS transaction_log_no_update')  # Re-created by SCHEMA afterwards
+        times = pd.read_sql_query(
+            "SELECT id, " + ", ".join(quote(c) for c in LOG_TIME_COLUMNS) + " FROM transaction_log", conn, index_col="id"
+        )
+        normalized = normalize_log_times(times.copy())
+        changed = (normalized.fillna("") != times.fillna("")).any(axis=1)
+        conn.executemany(
+            "UPDATE transaction_log SET " + ", ".join(quote(c) + " = ?" for c in LOG_TIME_COLUMNS) + " WHERE id = ?",
+            [list(row[1:]) + [int(row[0])] for row in normalized[changed].itertuples(name=None)],
+        )
+        set_meta(conn, "log_format", LOG_FORMAT)
+
+
+# Function to list the tables of the database
+def _tables(conn):
+    return [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+
+# Function to open the database in WAL mode (readers never block the single writer).
+# synchronous=NORMAL makes each commit a plain append to the WAL file; fsync happens in
+# batches when the WAL is checkpointed, so small log/booking writes do not each pay for a flush.
+def connect(path=DB_FILE):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.execute("PRAGMA foreign_keys=ON")
+    if "bookings" in _tables(conn):
+        migrate_plaintext_passwords(conn)
+        migrate_booking_columns(conn)
+        migrate_transaction_log(conn)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Context manager for a write transaction; BEGIN IMMEDIATE takes the write lock up front
+# so a conflict check and the write that follows it cannot interleave with another writer.
+# Used inside another transaction on the same connection, it joins that one.
+@contextmanager
+def transaction(conn):
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+# Function to read a value from the meta table
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+# Function to write a value to the meta table (call inside a transaction)
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+# Function to return the counter SQLite bumps whenever another connection commits
+def data_version(conn):
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+# Function to return the counter bumped by every write to bookings, blocked dates or rooms
+def data_generation(conn):
+    return int(get_meta(conn, "data_generation", 0))
+
+
+# Function to parse the time columns of a bookings frame read from the database
+def _parse_bookings(bookings):
+    bookings['Start Time'] = pd.to_datetime(bookings['Start Time'], format='%Y-%m-%d %H:%M:%S')
+    bookings['End Time'] = pd.to_datetime(bookings['End Time'], format='%Y-%m-%d %H:%M:%S')
+    bookings['Contact Number'] = bookings['Contact Number'].astype(str)  # Ensure contact number is treated as string
+    bookings[CATEGORY_COLUMNS] = bookings[CATEGORY_COLUMNS].astype('category')
+    return bookings
+
+
+# Function to load the current and upcoming (hot) bookings, indexed by their row id
+def read_bookings(conn):
+    bookings = _parse_bookings(pd.read_sql_query("SELECT * FROM bookings ORDER BY id", conn, index_col="id"))
+    bookings['Version'] = bookings['Version'].astype('int64')  # An empty result comes back as object
+    return bookings
+
+
+# Function to return the key identifying the current contents of the bookings table
+# (the CSV import stamp plus the write generation kept up to date by the bookings triggers)
+def bookings_snapshot_key(conn):
+    return get_meta(conn, "csv_imported", "") + "/" + get_meta(conn, "bookings_generation", "0")
+
+
+# Function to load the hot bookings together with their snapshot key, both from one read transaction
+def read_bookings_with_key(conn):
+    conn.execute("BEGIN")
+    try:
+        return read_bookings(conn), bookings_snapshot_key(conn)
+    finally:
+        conn.execute("COMMIT")
+
+
+# Function to load archived (past) bookings, optionally only some month partitions ("YYYY-MM")
+def read_archived_bookings(conn, months=None):
+    query = "SELECT id, " + ", ".join(quote(c) for c in BOOKING_COLUMNS) + " FROM booking_archive"
+    params = ()
+    if months is not None:
+        months = list(months)
+        if not months:
+            return _parse_bookings(pd.DataFrame(columns=["id"] + BOOKING_COLUMNS).set_index("id"))
+        query += ' WHERE "Month" IN (' + ", ".join("?" for _ in months) + ")"
+        params = tuple(months)
+    return _parse_bookings(pd.read_sql_query(query + " ORDER BY id", conn, params=params, index_col="id"))
+
+
+# Function to move bookings dated before a YYYY-MM-DD date into their month partition of the archive.
+# Usage rollups already include these bookings, so they are left untouched.
+def archive_past_bookings(conn, before_date):
+    columns = ", ".join(quote(c) for c in BOOKING_COLUMNS)
+    with transaction(conn):
+        moved = conn.execute(
+            'INSERT INTO booking_archive (id, "Month", ' + columns + ') '
+            'SELECT id, substr("Date", 1, 7), ' + columns + ' FROM bookings WHERE "Date" < ?',
+            (before_date,),
+        ).rowcount
+        conn.execute('DELETE FROM bookings WHERE "Date" < ?', (before_date,))
+        set_meta(conn, "archived_through", before_date)
+    return moved
+
+
+# Function to load the transaction log in insertion order, optionally only rows appended after a given id
+def read_transaction_log(conn, after_id=0):
+    transaction_log = pd.read_sql_query(
+        "SELECT id, " + ", ".join(quote(c) for c in LOG_COLUMNS) + " FROM transaction_log WHERE id > ? ORDER BY id",
+        conn, params=(after_id,), index_col="id"
+    )
+    return _parse_transaction_log(transaction_log)
+
+
+# Function to type the columns of a transaction log frame read from the database: event and meeting
+# times as datetimes (NaT for legacy text that could not be normalized), booking ids as nullable integers
+def _parse_transaction_log(transaction_log):
+    for column in ["Start Time", "End Time", "Timestamp"]:
+        transaction_log[column] = pd.to_datetime(transaction_log[column], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    transaction_log['Booking'] = transaction_log['Booking'].astype('Int64')
+    transaction_log['Contact Number'] = transaction_log['Contact Number'].astype(str)  # Ensure contact number is treated as string
+    transaction_log[LOG_CATEGORY_COLUMNS] = transaction_log[LOG_CATEGORY_COLUMNS].astype('category')
+    return transaction_log
+
+
+# Function to return the key identifying the stored transaction log format (the CSV import stamp plus LOG_FORMAT);
+# the log is append-only, so any snapshot taken under the same key is a valid prefix
+def transaction_log_snapshot_key(conn):
+    return get_meta(conn, "csv_imported", "") + "/" + get_meta(conn, "log_format", "")
+
+
+# History views of the Admin Page: table -> (rows queried, filter column of each filter).
+# Booking history spans the hot bookings and the archive. Every filter is optional: "start"/"end"
+# (YYYY-MM-DD, inclusive, on the booking date) and lists of "rooms", "users" and "actions".
+HISTORY_SOURCES = {
+    "transaction_log": (
+        "SELECT id, " + ", ".join(quote(c) for c in LOG_COLUMNS) + " FROM transaction_log",
+        LOG_COLUMNS, {"rooms": "Room", "users": "User", "actions": "Action"},
+    ),
+    "bookings": (
+        "SELECT * FROM (SELECT id, " + ", ".join(quote(c) for c in BOOKING_COLUMNS) + " FROM booking_archive UNION ALL "
+        "SELECT id, " + ", ".join(quote(c) for c in BOOKING_COLUMNS) + " FROM bookings)",
+        BOOKING_COLUMNS, {"rooms": "Room", "users": "Booked By"},
+    ),
+}
+
+
+# Function to build the filtered query of a history view; returns (sql, params, columns)
+def _history_query(table, filters):
+    select, columns, filter_columns = HISTORY_SOURCES[table]
+    conditions, params = [], []
+    if filters.get("start"):
+        conditions.append('"Date" >= ?')
+        params.append(filters["start"])
+    if filters.get("end"):
+        conditions.append('"Date" <= ?')
+        params.append(filters["end"])
+    for name, column in filter_columns.items():
+        values = list(filters.get(name) or [])
+        if values:
+            conditions.append(quote(column) + " IN (" + ", ".join("?" for _ in values) + ")")
+            params.extend(values)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return select + where, params, columns
+
+
+# Function to count the rows of a history view
+def count_history(conn, table, filters):
+    sql, params, _ = _history_query(table, filters)
+    return conn.execute("SELECT COUNT(*) FROM (" + sql + ")", params).fetchone()[0]
+
+
+# Function to read one page of a history view (newest first), as stored (text columns), indexed by row id
+def read_history_page(conn, table, filters, page, page_size):
+    sql, params, _ = _history_query(table, filters)
+    return pd.read_sql_query(
+        sql + " ORDER BY id DESC LIMIT ? OFFSET ?", conn, params=params + [page_size, page * page_size], index_col="id"
+    )
+
+
+# Function to iterate over a history view in chunks of rows (oldest first), as DataFrames of the stored text;
+# only one chunk is held in memory at a time
+def iter_history(conn, table, filters, chunk_rows):
+    sql, params, columns = _history_query(table, filters)
+    cursor = conn.execute(sql + " ORDER BY id", params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield pd.DataFrame([row[1:] for row in rows], columns=columns, dtype=object)
+    finally:
+        cursor.close()
+
+
+# Function to list the distinct values of a column of a history view (for the filter options)
+def history_values(conn, table, column):
+    select, _, _ = HISTORY_SOURCES[table]
+    rows = conn.execute(
+        "SELECT DISTINCT " + quote(column) + " FROM (" + select + ") WHERE " + quote(column) + " IS NOT NULL ORDER BY 1"
+    )
+    return [row[0] for row in rows]
+
+
+# Function to load blocked dates as a DataFrame with a datetime "Blocked Date" column
+def read_blocked_dates(conn):
+    blocked_dates = pd.read_sql_query('SELECT "Blocked Date" FROM blocked_dates ORDER BY "Blocked Date"', conn)
+    blocked_dates['Blocked Date'] = pd.to_datetime(blocked_dates['Blocked Date'], format='%Y-%m-%d')
+    return blocked_dates
+
+
+# Function to load the dates blocked for single rooms
+def read_room_blocked_dates(conn):
+    blocked_dates = pd.read_sql_query('SELECT "Room", "Blocked Date" FROM room_blocked_dates ORDER BY "Blocked Date", "Room"', conn)
+    blocked_dates['Blocked Date'] = pd.to_datetime(blocked_dates['Blocked Date'], format='%Y-%m-%d')
+    return blocked_dates
+
+
+# Function to load the active rooms of the registry in registry order
+def read_rooms(conn):
+    return pd.read_sql_query(
+        "SELECT id, " + ", ".join(quote(c) for c in ROOM_COLUMNS) + ' FROM rooms WHERE "Active" = 1 ORDER BY id', conn
+    )
+
+
+# Function to sync the room registry from rooms.csv, only when the file changed since the last sync;
+# returns the number of rooms in the file, or None if nothing was done
+def import_rooms(conn, rooms_csv=ROOMS_CSV):
+    try:
+        modified = str(os.path.getmtime(rooms_csv))
+    except OSError:
+        return None
+    if get_meta(conn, "rooms_csv_mtime") == modified:
+        return None
+    rooms = pd.read_csv(rooms_csv, dtype=str, keep_default_na=False).reindex(columns=ROOM_COLUMNS)
+    rooms["Opens"] = rooms["Opens"].replace("", "08:00")
+    rooms["Closes"] = rooms["Closes"].replace("", "18:00")
+    with transaction(conn):
+        conn.execute('UPDATE rooms SET "Active" = 0')
+        conn.executemany(
+            "INSERT INTO rooms (" + ", ".join(quote(c) for c in ROOM_COLUMNS) + ', "Active") VALUES ('
+            + ", ".join("?" for _ in ROOM_COLUMNS) + ', 1) ON CONFLICT ("Name") DO UPDATE SET '
+            + ", ".join(quote(c) + " = excluded." + quote(c) for c in ROOM_COLUMNS[1:]) + ', "Active" = 1',
+            [(name, int(capacity), site, opens, closes, colour) for name, capacity, site, opens, closes, colour in rooms.itertuples(index=False)],
+        )
+        set_meta(conn, "rooms_csv_mtime", modified)
+    return len(rooms)
+
+
+# Function to find the first booking overlapping [start, end) in a room (uses the room/date/start index);
+# with booked_by, only bookings made by someone else count
+def find_conflict(conn, room, date, start, end, exclude_id=None, booked_by=None):
+    row = conn.execute(
+        'SELECT id, "Booked By" FROM bookings WHERE "Room" = ? AND "Date" = ? '
+        'AND "Start Time" < ? AND "End Time" > ? AND id IS NOT ? AND "Booked By" IS NOT ? ORDER BY "Start Time" LIMIT 1',
+        (room, date, to_db_value(end), to_db_value(start), exclude_id, booked_by),
+    ).fetchone()
+    return row
+
+
+# Function to add (sign=1) or remove (sign=-1) one booking's contribution to the usage rollups
+def apply_rollup(conn, room, date, start, end, user, sign):
+    year, month, day = (int(part) for part in str(date)[:10].split("-"))
+    minutes = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds() / 60
+    key = (room, year, month, day)
+    conn.execute(
+        'INSERT INTO usage_rollup ("Room", "Year", "Month", "Day", "Booked Minutes", "Bookings") VALUES (?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT ("Room", "Year", "Month", "Day") DO UPDATE SET '
+        '"Booked Minutes" = "Booked Minutes" + excluded."Booked Minutes", "Bookings" = "Bookings" + excluded."Bookings"',
+        key + (sign * minutes, sign),
+    )
+    conn.execute(
+        'INSERT INTO usage_rollup_users ("Room", "Year", "Month", "Day", "User", "Bookings") VALUES (?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT ("Room", "Year", "Month", "Day", "User") DO UPDATE SET "Bookings" = "Bookings" + excluded."Bookings"',
+        key + (user, sign),
+    )
+    if sign < 0:
+        conn.execute('DELETE FROM usage_rollup WHERE "Room" = ? AND "Year" = ? AND "Month" = ? AND "Day" = ? AND "Bookings" <= 0', key)
+        conn.execute(
+            'DELETE FROM usage_rollup_users WHERE "Room" = ? AND "Year" = ? AND "Month" = ? AND "Day" = ? AND "User" = ? AND "Bookings" <= 0',
+            key + (user,),
+        )
+
+
+# Function to rebuild the usage rollups from the bookings table (call inside a transaction)
+def build_rollups(conn):
+    conn.execute("DELETE FROM usage_rollup")
+    conn.execute("DELETE FROM usage_rollup_users")
+    day_key = ('"Room", CAST(substr("Date", 1, 4) AS INTEGER), CAST(substr("Date", 6, 2) AS INTEGER), '
+               'CAST(substr("Date", 9, 2) AS INTEGER)')
+    conn.execute(
+        'INSERT INTO usage_rollup ("Room", "Year", "Month", "Day", "Booked Minutes", "Bookings") '
+        'SELECT ' + day_key + ', SUM((julianday("End Time") - julianday("Start Time")) * 1440), COUNT(*) '
+        'FROM bookings GROUP BY ' + day_key
+    )
+    conn.execute(
+        'INSERT INTO usage_rollup_users ("Room", "Year", "Month", "Day", "User", "Bookings") '
+        'SELECT ' + day_key + ', "Booked By", COUNT(*) FROM bookings WHERE "Booked By" IS NOT NULL '
+        'GROUP BY ' + day_key + ', "Booked By"'
+    )
+    set_meta(conn, "rollups_built", pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+
+# Function to build the usage rollups once for databases created before they existed
+def ensure_rollups(conn):
+    if not get_meta(conn, "rollups_built"):
+        with transaction(conn):
+            build_rollups(conn)
+
+
+# Function to load the usage rollups: (per room/day totals, per room/day/user counts)
+def read_usage_rollup(conn):
+    usage = pd.read_sql_query('SELECT * FROM usage_rollup', conn)
+    users = pd.read_sql_query('SELECT * FROM usage_rollup_users', conn)
+    return usage, users
+
+
+# Function to insert a booking after re-checking for conflicts (call inside a transaction); returns the new id
+def _insert_booking(conn, booking):
+    conflict = find_conflict(conn, booking["Room"], booking["Date"], booking["Start Time"], booking["End Time"])
+    if conflict:
+        raise BookingConflictError(conflict[1])
+    columns = BOOKING_COLUMNS + ["Series"]
+    cursor = conn.execute(
+        "INSERT INTO bookings (" + ", ".join(quote(c) for c in columns) + ") VALUES ("
+        + ", ".join("?" for _ in columns) + ")",
+        [to_db_value(booking.get(c)) for c in columns],
+    )
+    apply_rollup(conn, booking["Room"], booking["Date"], booking["Start Time"], booking["End Time"], booking["Booked By"], 1)
+    return cursor.lastrowid
+
+
+# Function to insert a booking after re-checking for conflicts in the same transaction; returns the new id
+def insert_booking(conn, booking):
+    with transaction(conn):
+        return _insert_booking(conn, booking)
+
+
+# Function to insert several bookings (e.g. the occurrences of a series) in one transaction; returns their ids.
+# Nothing is written if any of them conflicts.
+def insert_bookings(conn, bookings):
+    with transaction(conn):
+        return [_insert_booking(conn, booking) for booking in bookings]
+
+
+# Function to read the fields of a booking needed for a write, checking its version when one is expected
+def _current_booking(conn, booking_id, expected_version):
+    current = conn.execute(
+        'SELECT "Room", "Date", "Start Time", "End Time", "Booked By", "Version" FROM bookings WHERE id = ?', (booking_id,)
+    ).fetchone()
+    if expected_version is not None and (current is None or current[5] != expected_version):
+        raise StaleBookingError(booking_id, expected_version)
+    return current
+
+
+# Function to update one booking (call inside a transaction) and return its new version;
+# conflicts with another user's booking are rejected (overlapping the same user's own booking is allowed,
+# as in the Edit tab). With expected_version this is a compare-and-swap: StaleBookingError if the
+# booking changed since that version.
+def _update_booking(conn, booking_id, changes, expected_version=None):
+    current = _current_booking(conn, booking_id, expected_version)
+    if current is None:
+        raise KeyError(booking_id)
+    room = changes.get("Room", current[0])
+    date = changes.get("Date", current[1])
+    start = changes.get("Start Time", current[2])
+    end = changes.get("End Time", current[3])
+    booked_by = changes.get("Booked By", current[4])
+    conflict = find_conflict(conn, room, date, start, end, exclude_id=booking_id, booked_by=booked_by)
+    if conflict:
+        raise BookingConflictError(conflict[1])
+    conn.execute(
+        "UPDATE bookings SET " + ", ".join(quote(c) + " = ?" for c in changes) + ', "Version" = "Version" + 1 WHERE id = ?',
+        [to_db_value(v) for v in changes.values()] + [booking_id],
+    )
+    apply_rollup(conn, current[0], current[1], current[2], current[3], current[4], -1)
+    apply_rollup(conn, room, date, start, end, booked_by, 1)
+    return current[5] + 1
+
+
+# Function to update one booking in its own transaction and return its new version (see _update_booking)
+def update_booking(conn, booking_id, changes, expected_version=None):
+    with transaction(conn):
+        return _update_booking(conn, booking_id, changes, expected_version)
+
+
+# Function to update several bookings ({id: changes}) in one transaction; returns {id: new version}.
+# expected_versions ({id: version}) makes every update a compare-and-swap; nothing is written if any fails.
+def update_bookings(conn, changes_by_id, expected_versions=None):
+    expected_versions = expected_versions or {}
+    with transaction(conn):
+        return {
+            booking_id: _update_booking(conn, booking_id, changes, expected_versions.get(booking_id))
+            for booking_id, changes in changes_by_id.items()
+        }
+
+
+# Function to delete one booking (call inside a transaction; a compare-and-swap when expected_version is given)
+def _delete_booking(conn, booking_id, expected_version=None):
+    current = _current_booking(conn, booking_id, expected_version)
+    if current is None:
+        return
+    conn.execute("DELETE FROM bookings WHERE id = ?", (booking_id,))
+    apply_rollup(conn, current[0], current[1], current[2], current[3], current[4], -1)
+
+
+# Function to delete one booking in its own transaction
+def delete_booking(conn, booking_id, expected_version=None):
+    with transaction(conn):
+        _delete_booking(conn, booking_id, expected_version)
+
+
+# Function to delete several bookings in one transaction (all or nothing when expected_versions are given)
+def delete_bookings(conn, booking_ids, expected_versions=None):
+    expected_versions = expected_versions or {}
+    with transaction(conn):
+        for booking_id in booking_ids:
+            _delete_booking(conn, booking_id, expected_versions.get(booking_id))
+
+
+# Function to append one row to the transaction log (the table rejects updates and deletes)
+def insert_transaction(conn, entry):
+    insert_transactions(conn, [entry])
+
+
+# Function to append several rows to the transaction log (call inside a transaction).
+# Audit checkpoints taken after the oldest new event no longer cover every event before them, so they are dropped.
+def _insert_transactions(conn, entries):
+    rows = [[to_db_value(entry.get(c)) for c in LOG_COLUMNS] for entry in entries]
+    conn.executemany(
+        "INSERT INTO transaction_log (" + ", ".join(quote(c) for c in LOG_COLUMNS) + ") VALUES ("
+        + ", ".join("?" for _ in LOG_COLUMNS) + ")",
+        rows,
+    )
+    timestamps = [row[LOG_COLUMNS.index("Timestamp")] for row in rows if row[LOG_COLUMNS.index("Timestamp")] is not None]
+    if timestamps:
+        conn.execute('DELETE FROM audit_checkpoints WHERE "Event Time" > ?', (min(timestamps),))
+
+
+# Function to append several rows to the transaction log in one transaction
+def insert_transactions(conn, entries):
+    with transaction(conn):
+        _insert_transactions(conn, entries)
+
+
+# Function to add blocked dates (iterable of dates) in one transaction, for every room or only one room
+def insert_blocked_dates(conn, dates, room=None):
+    with transaction(conn):
+        if room is None:
+            conn.executemany(
+                'INSERT OR IGNORE INTO blocked_dates ("Blocked Date") VALUES (?)',
+                [(d.strftime('%Y-%m-%d'),) for d in dates],
+            )
+        else:
+            conn.executemany(
+                'INSERT OR IGNORE INTO room_blocked_dates ("Room", "Blocked Date") VALUES (?, ?)',
+                [(room, d.strftime('%Y-%m-%d')) for d in dates],
+            )
+
+
+# Function to remove blocked dates (iterable of dates) in one transaction, for every room or only one room
+def delete_blocked_dates(conn, dates, room=None):
+    with transaction(conn):
+        if room is None:
+            conn.executemany(
+                'DELETE FROM blocked_dates WHERE "Blocked Date" = ?',
+                [(d.strftime('%Y-%m-%d'),) for d in dates],
+            )
+        else:
+            conn.executemany(
+                'DELETE FROM room_blocked_dates WHERE "Room" = ? AND "Blocked Date" = ?',
+                [(room, d.strftime('%Y-%m-%d')) for d in dates],
+            )
+
+
+# Function to read a CSV, returning an empty frame if it does not exist
+def _read_csv(path, columns):
+    try:
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=columns)
+
+
+# One-shot importer: load bookings.csv, transaction_log.csv and blocked_dates.csv into an empty database
+def import_csv_files(conn, bookings_csv=BOOKINGS_CSV, log_csv=TRANSACTION_LOG_CSV, blocked_csv=BLOCKED_DATES_CSV, force=False):
+    if get_meta(conn, "csv_imported") and not force:
+        return None
+
+    # Plaintext passwords in the CSV files are hashed here and never stored
+    salt = get_password_salt(conn)
+    bookings = _read_csv(bookings_csv, BOOKING_COLUMNS)
+    for column in ["Start Time", "End Time"]:
+        bookings[column] = pd.to_datetime(bookings[column]).dt.strftime('%Y-%m-%d %H:%M:%S')
+    transaction_log = _read_csv(log_csv, LOG_COLUMNS)
+    for frame in [bookings, transaction_log]:
+        if "Password" in frame.columns:
+            frame["Password Hash"] = [hash_password(salt, password) for password in frame["Password"]]
+    bookings = bookings.reindex(columns=BOOKING_COLUMNS)
+    transaction_log = normalize_log_times(transaction_log.reindex(columns=LOG_COLUMNS))
+    blocked_dates = _read_csv(blocked_csv, ["Blocked Date"])
+    blocked_dates = pd.to_datetime(blocked_dates['Blocked Date'], format='%d/%m/%Y').dt.strftime('%Y-%m-%d')
+
+    with transaction(conn):
+        if force:
+            conn.execute("DELETE FROM bookings")
+            conn.execute("DELETE FROM booking_archive")
+            conn.execute("DROP TRIGGER IF EXISTS transaction_log_no_delete")  # Re-created on the next connect()
+            conn.execute("DELETE FROM transaction_log")
+            conn.execute("DELETE FROM audit_checkpoints")
+            conn.execute("DELETE FROM blocked_dates")
+            conn.execute("DELETE FROM room_blocked_dates")
+        conn.executemany(
+            "INSERT INTO bookings (" + ", ".join(quote(c) for c in BOOKING_COLUMNS) + ") VALUES ("
+            + ", ".join("?" for _ in BOOKING_COLUMNS) + ")",
+            bookings.itertuples(index=False, name=None),
+        )
+        conn.executemany(
+            "INSERT INTO transaction_log (" + ", ".join(quote(c) for c in LOG_COLUMNS) + ") VALUES ("
+            + ", ".join("?" for _ in LOG_COLUMNS) + ")",
+            transaction_log.itertuples(index=False, name=None),
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO blocked_dates ("Blocked Date") VALUES (?)',
+            [(d,) for d in blocked_dates],
+        )
+        build_rollups(conn)
+        set_meta(conn, "csv_imported", pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'))
+    return len(bookings), len(transaction_log), len(blocked_dates)
+
+
+# Run as a script to import the CSV files: python booking_db.py [--force]
+if __name__ == "__main__":
+    conn = connect()
+    counts = import_csv_files(conn, force="--force" in sys.argv)
+    if counts is None:
+        print("CSV files were already imported into " + DB_FILE + " (use --force to re-import).")
+    else:
+        print("Imported %d bookings, %d log entries and %d blocked dates into %s." % (counts + (DB_FILE,)))
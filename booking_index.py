@@ -0,0 +1,103 @@
+from bisect import bisect_left, insort
+from availability import slot_mask
+
+# Per-room, per-day interval index used for conflict detection.
+# Each (room, date) key maps to an immutable tuple of parallel lists sorted by start time:
+# (starts, ends, ids, max_ends, mask), where max_ends[i] is the latest end among entries 0..i
+# and mask is the day's busy-slot bitmask on the 30-minute grid (see availability.py).
+# A lookup for [start, end) is a bisect on starts plus one comparison against max_ends,
+# so it is O(log k) in the bookings of that room and day, independent of the total history.
+# Updates rebuild only the affected day and swap the tuple in, so readers never see a half-updated day.
+class RoomIntervalIndex:
+    def __init__(self):
+        self.days = {}
+        self.keys = {}  # booking id -> (room, date), used to move or remove a booking
+
+    # Function to build the index from a bookings DataFrame indexed by booking id
+    @classmethod
+    def from_bookings(cls, bookings):
+        index = cls()
+        entries = {}
+        for booking_id, room, date, start, end in zip(bookings.index, bookings['Room'], bookings['Date'], bookings['Start Time'], bookings['End Time']):
+            entries.setdefault((room, date), []).append((start, end, booking_id))
+            index.keys[booking_id] = (room, date)
+        for key, day_entries in entries.items():
+            day_entries.sort()
+            index.days[key] = index._build_day(day_entries)
+        return index
+
+    # Function to turn a sorted list of (start, end, id) into the day tuple
+    @staticmethod
+    def _build_day(entries):
+        starts, ends, ids, max_ends, mask = [], [], [], [], 0
+        for start, end, booking_id in entries:
+            starts.append(start)
+            ends.append(end)
+            ids.append(booking_id)
+            max_ends.append(end if not max_ends or end > max_ends[-1] else max_ends[-1])
+            mask |= slot_mask(start, end)
+        return starts, ends, ids, max_ends, mask
+
+    # Function to list the (start, end, id) entries of a day
+    def _day_entries(self, key):
+        starts, ends, ids, _, _ = self.days.get(key, ([], [], [], [], 0))
+        return list(zip(starts, ends, ids))
+
+    # Function to add a booking to the index
+    def add(self, booking_id, room, date, start, end):
+        key = (room, date)
+        entries = self._day_entries(key)
+        insort(entries, (start, end, booking_id))
+        self.days[key] = self._build_day(entries)
+        self.keys[booking_id] = key
+
+    # Function to remove a booking from the index
+    def remove(self, booking_id):
+        key = self.keys.pop(booking_id, None)
+        if key is None:
+            return
+        entries = [entry for entry in self._day_entries(key) if entry[2] != booking_id]
+        if entries:
+            self.days[key] = self._build_day(entries)
+        else:
+            self.days.pop(key, None)
+
+    # Function to move a booking to a new room/date/time
+    def update(self, booking_id, room, date, start, end):
+        self.remove(booking_id)
+        self.add(booking_id, room, date, start, end)
+
+    # Function to list the ids of bookings overlapping [start, end) in a room on a date
+    def conflicts(self, room, date, start, end, exclude_id=None):
+        day = self.days.get((room, date))
+        if day is None:
+            return []
+        starts, ends, ids, max_ends, _ = day
+        i = bisect_left(starts, end)  # Entries from i onwards start at or after the requested end
+        if i == 0 or max_ends[i - 1] <= start:
+            return []
+        found = []
+        for j in range(i - 1, -1, -1):
+            if max_ends[j] <= start:
+                break
+            if ends[j] > start and ids[j] != exclude_id:
+                found.append(ids[j])
+        return found[::-1]
+
+    # Function to return the id of the first booking overlapping [start, end), or None
+    def find_conflict(self, room, date, start, end, exclude_id=None):
+        found = self.conflicts(room, date, start, end, exclude_id)
+        return found[0] if found else None
+
+    # Function to return the busy-slot bitmask of a room on a date, optionally ignoring some bookings
+    def day_mask(self, room, date, exclude_ids=()):
+        day = self.days.get((room, date))
+        if day is None:
+            return 0
+        if not exclude_ids:
+            return day[4]
+        mask = 0
+        for start, end, booking_id in zip(day[0], day[1], day[2]):
+            if booking_id not in exclude_ids:
+                mask |= slot_mask(start, end)
+        return mask
@@ -0,0 +1,28 @@
+from availability import SLOT_BOUNDARIES
+
+
+# Function to check a new booking with the rules of the "Book Room" button; returns the error message or None.
+# Dates and times are datetime.date/datetime.time objects; is_closed(date) is True on weekends and blocked dates
+# and rooms lists the bookable room names (BookingStore.room_names).
+def booking_error(room, date, start_time, end_time, booked_by, meeting_title, contact_number, password, is_closed, today, rooms):
+    if room not in rooms:
+        return f"Unknown room: {room}."
+    if date < today:
+        return "Bookings cannot be made for past dates."
+    if is_closed(date):
+        return f"The meeting room is closed on {date.strftime('%A, %B %d, %Y')} (weekend or blocked date)."
+    if not start_time or not end_time:
+        return "Please select both start and end times."
+    if start_time not in SLOT_BOUNDARIES or end_time not in SLOT_BOUNDARIES:
+        return "Start and end times must be on the half hour between 8:00 AM and 6:00 PM."
+    if start_time >= end_time:
+        return "End time must be after start time."
+    if not str(booked_by or "").strip():
+        return "Please enter your name."
+    if not str(meeting_title or "").strip():
+        return "Please enter a meeting title."
+    if not str(contact_number or "").strip():
+        return "Please enter a contact number."
+    if not str(password or "").strip():
+        return "Please enter a meeting password."
+    return None
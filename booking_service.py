@@ -0,0 +1,297 @@
+from datetime import datetime
+import pandas as pd
+import availability
+import booking_rules
+import recurrence
+from booking_db import BookingConflictError, StaleBookingError
+
+# Booking operations shared by the Streamlit pages and the HTTP API (booking_api.py). Each operation
+# validates a request with the Book Room rules, checks it against the store's interval index, commits it
+# through the store (which re-checks for conflicts inside its write transaction) and appends the
+# transaction log rows. A rejected request raises BookingError with the message the Book and Edit tabs
+# show and a code the API maps to an HTTP status.
+
+
+# Raised when a request is rejected. code is "invalid", "not_found", "conflict" or "stale";
+# details optionally holds rows explaining the rejection (e.g. the unavailable dates of a series).
+class BookingError(Exception):
+    def __init__(self, message, code="invalid", details=None):
+        super().__init__(message)
+        self.code = code
+        self.details = details
+
+
+# Function to build one transaction log entry (booking_id ties it to the booking for the audit trail)
+def transaction_entry(action, room, date, start_time, end_time, user, meeting_title, contact_number, password, booking_id=None):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "Action": action,
+        "Room": room,
+        "Date": date,
+        "Start Time": start_time,
+        "End Time": end_time,
+        "User": user,
+        "Meeting Title": meeting_title,
+        "Contact Number": str(contact_number),  # Ensure contact number is logged as string
+        "Password": password,
+        "Timestamp": timestamp,
+        "Booking": booking_id
+    }
+
+
+# Function to name the user of a booking found by the index (it may have been cancelled since)
+def _booked_by(store, booking_id):
+    bookings = store.bookings
+    return bookings.loc[booking_id, 'Booked By'] if booking_id in bookings.index else "another user"
+
+
+# Function to look up a booking by id for a change, checking the meeting password it was made with.
+# A booking the caller saw (expected_version given) that no longer exists was cancelled in another session.
+def _owned_booking(store, booking_id, password, expected_version=None):
+    bookings = store.bookings
+    if booking_id not in bookings.index and expected_version is not None:
+        raise BookingError("This booking was changed or cancelled in another session. Please review it and try again.", "stale")
+    if booking_id not in bookings.index or bookings.loc[booking_id, 'Password Hash'] != store.hash_password(password):
+        raise BookingError("No matching bookings found. Please check the meeting password.", "not_found")
+    return bookings.loc[booking_id]
+
+
+# Function to book a room once; returns the new booking id
+def book(store, room, date, start_time, end_time, booked_by, meeting_title, contact_number, password, today=None):
+    store.refresh()
+    error = booking_rules.booking_error(
+        room, date, start_time, end_time, booked_by, meeting_title, contact_number, password,
+        lambda d: store.business_calendar.is_closed(d, room), today or datetime.today().date(), store.room_names
+    )
+    if error:
+        raise BookingError(error)
+
+    date_str = date.strftime('%Y-%m-%d')
+    start_datetime = datetime.combine(date, start_time)
+    end_datetime = datetime.combine(date, end_time)
+    conflict_id = store.find_conflict(room, date_str, start_datetime, end_datetime)
+    if conflict_id is not None:
+        raise BookingError(f"This room is already booked during the selected time by: {_booked_by(store, conflict_id)}.", "conflict")
+    try:
+        booking_id = store.add_booking({
+            "Room": room,
+            "Date": date_str,
+            "Start Time": start_datetime,
+            "End Time": end_datetime,
+            "Booked By": booked_by,
+            "Meeting Title": meeting_title,
+            "Contact Number": str(contact_number),  # Ensure contact number is stored as string
+            "Password": password
+        })
+    except BookingConflictError as e:
+        # Another session booked the slot after the check
+        raise BookingError(f"This room is already booked during the selected time by: {e.booked_by}.", "conflict")
+    store.log_transaction(transaction_entry("Booking", room, date_str, start_datetime, end_datetime, booked_by, meeting_title, contact_number, password, booking_id))
+    return booking_id
+
+
+# Function to book a recurring series (every interval_weeks, a number of occurrences or up to a date).
+# Unavailable dates reject the whole series unless skip_unavailable is set.
+# Returns (booking ids, DataFrame of the skipped dates with their "Status").
+def book_series(store, room, date, start_time, end_time, booked_by, meeting_title, contact_number, password,
+                interval_weeks, occurrences=None, until=None, skip_unavailable=False, today=None):
+    store.refresh()
+    error = booking_rules.booking_error(
+        room, date, start_time, end_time, booked_by, meeting_title, contact_number, password,
+        lambda d: store.business_calendar.is_closed(d, room), today or datetime.today().date(), store.room_names
+    )
+    if error:
+        raise BookingError(error)
+
+    # Expand the series and check every occurrence against the index, weekends and blocked dates at once
+    series_dates = recurrence.expand_series(date, interval_weeks, occurrences, until)
+    series_check = recurrence.check_series(
+        series_dates, room, datetime.combine(date, start_time), datetime.combine(date, end_time),
+        store.day_mask, store.business_calendar
+    )
+    available = series_check['Status'] == "Available"
+    if not available.all() and not skip_unavailable:
+        raise BookingError("Some dates in this series are unavailable. Choose another time or skip those dates.", "conflict", series_check[~available])
+    if not available.any():
+        raise BookingError("None of the dates in this series are available.", "conflict")
+
+    occurrences = [
+        {
+            "Room": room,
+            "Date": d.strftime('%Y-%m-%d'),
+            "Start Time": datetime.combine(d, start_time),
+            "End Time": datetime.combine(d, end_time),
+            "Booked By": booked_by,
+            "Meeting Title": meeting_title,
+            "Contact Number": str(contact_number),
+            "Password": password
+        }
+        for d, ok in zip(series_dates, available) if ok
+    ]
+    try:
+        booking_ids = store.add_booking_series(occurrences)
+    except BookingConflictError as e:
+        # Another session booked one of the dates after the check; nothing was saved
+        raise BookingError(f"One of the dates in this series was just booked by: {e.booked_by}. No bookings were made.", "conflict")
+    store.log_transactions([
+        transaction_entry("Booking", o["Room"], o["Date"], o["Start Time"], o["End Time"], booked_by, meeting_title, contact_number, password, booking_id)
+        for o, booking_id in zip(occurrences, booking_ids)
+    ])
+    return booking_ids, series_check[~available].reset_index(drop=True)
+
+
+# Function to change the room, date, times or title of a booking made with the given meeting password
+# (fields left as None keep their value); returns the number of bookings changed.
+# With whole_series the new room, times and title apply to every upcoming occurrence (each keeps its date).
+# expected_version is the version the caller last saw: if anyone changed the booking since, nothing is written.
+def edit(store, booking_id, password, room=None, date=None, start_time=None, end_time=None, meeting_title=None,
+         expected_version=None, whole_series=False, today=None):
+    store.refresh()
+    today = today or datetime.today().date()
+    booking = _owned_booking(store, booking_id, password, expected_version)
+    room = booking['Room'] if room is None else room
+    booking_date = datetime.strptime(booking['Date'], '%Y-%m-%d').date()
+    date = booking_date if date is None or whole_series else date
+    start_time = booking['Start Time'].time() if start_time is None else start_time
+    end_time = booking['End Time'].time() if end_time is None else end_time
+    meeting_title = booking['Meeting Title'] if meeting_title is None else meeting_title
+    expected_version = int(booking['Version']) if expected_version is None else int(expected_version)
+
+    if not start_time or not end_time:
+        raise BookingError("Please select both start and end times.")
+    if start_time >= end_time:
+        raise BookingError("End time must be after start time.")
+    if not str(meeting_title).strip():
+        raise BookingError("Please enter a new meeting title.")
+    error = booking_rules.booking_error(
+        room, date, start_time, end_time, booking['Booked By'], meeting_title, booking['Contact Number'], password,
+        lambda d: store.business_calendar.is_closed(d, None if whole_series else room), today, store.room_names
+    )
+    if error:
+        raise BookingError(error)
+
+    # Check for conflicts with other users' bookings, ignoring this one (overlapping the same user's own booking is allowed)
+    new_start_datetime = datetime.combine(date, start_time)
+    new_end_datetime = datetime.combine(date, end_time)
+    conflict_ids = store.find_conflicts(room, date.strftime('%Y-%m-%d'), new_start_datetime, new_end_datetime, exclude_id=booking_id)
+    conflict_users = [user for user in (_booked_by(store, i) for i in conflict_ids) if user != booking['Booked By']]
+    if conflict_users:
+        raise BookingError(f"This room is already booked during the selected time by {conflict_users[0]}. Please choose a different time.", "conflict")
+
+    if whole_series and pd.notna(booking['Series']):
+        series_bookings = store.series_bookings(booking['Series'], today.strftime('%Y-%m-%d'))
+        if not store.business_calendar.is_open(series_bookings['Date'], room).all():
+            raise BookingError(f"{room} is blocked on one of the dates in this series. No bookings were changed.", "conflict")
+        # Versions as currently stored, except this booking's (the version the caller saw)
+        series_versions = dict(zip(series_bookings.index, series_bookings['Version'].astype(int)))
+        series_versions[booking_id] = expected_version
+        series_dates = pd.to_datetime(series_bookings['Date']).dt.date
+        changes_by_id = {
+            i: {
+                'Room': room,
+                'Start Time': datetime.combine(d, start_time),
+                'End Time': datetime.combine(d, end_time),
+                'Meeting Title': meeting_title
+            }
+            for i, d in zip(series_bookings.index, series_dates)
+        }
+        try:
+            store.update_bookings(changes_by_id, series_versions)
+        except BookingConflictError as e:
+            raise BookingError(f"One of the dates in this series is already booked at the selected time by {e.booked_by}. No bookings were changed.", "conflict")
+        except StaleBookingError:
+            raise BookingError("This series was changed or cancelled in another session. Please review it and try again.", "stale")
+        store.log_transactions([
+            transaction_entry(
+                "Edit", room, d.strftime('%Y-%m-%d'), changes['Start Time'], changes['End Time'],
+                booking['Booked By'], meeting_title, booking['Contact Number'], password, i
+            )
+            for d, (i, changes) in zip(series_dates, changes_by_id.items())
+        ])
+        return len(changes_by_id)
+
+    try:
+        store.update_booking(booking_id, {
+            'Date': date.strftime('%Y-%m-%d'),
+            'Room': room,
+            'Start Time': new_start_datetime,
+            'End Time': new_end_datetime,
+            'Meeting Title': meeting_title
+        }, expected_version=expected_version)
+    except BookingConflictError as e:
+        # Another session booked the slot after the check
+        raise BookingError(f"This room is already booked during the selected time by {e.booked_by}. Please choose a different time.", "conflict")
+    except StaleBookingError:
+        raise BookingError("This booking was changed or cancelled in another session. Please review it and try again.", "stale")
+    store.log_transaction(transaction_entry(
+        "Edit", room, date.strftime('%Y-%m-%d'), new_start_datetime, new_end_datetime,
+        booking['Booked By'], meeting_title, booking['Contact Number'], password, booking_id
+    ))
+    return 1
+
+
+# Function to cancel a booking made with the given meeting password (or, with whole_series, every upcoming
+# occurrence of its series); returns the number of bookings cancelled. expected_version works as in edit().
+def cancel(store, booking_id, password, expected_version=None, whole_series=False, today=None):
+    store.refresh()
+    today = today or datetime.today().date()
+    booking = _owned_booking(store, booking_id, password, expected_version)
+    expected_version = int(booking['Version']) if expected_version is None else int(expected_version)
+
+    if whole_series and pd.notna(booking['Series']):
+        # Remove every upcoming occurrence in one transaction (only if none changed since they were shown)
+        series_bookings = store.series_bookings(booking['Series'], today.strftime('%Y-%m-%d'))
+        series_versions = dict(zip(series_bookings.index, series_bookings['Version'].astype(int)))
+        series_versions[booking_id] = expected_version
+        try:
+            store.cancel_bookings(list(series_bookings.index), series_versions)
+        except StaleBookingError:
+            raise BookingError("This series was changed or cancelled in another session. Please review it and try again.", "stale")
+        store.log_transactions([
+            transaction_entry(
+                "Cancellation", row['Room'], row['Date'], row['Start Time'], row['End Time'],
+                row['Booked By'], row['Meeting Title'], row['Contact Number'], password, i
+            )
+            for i, row in series_bookings.iterrows()
+        ])
+        return len(series_bookings)
+
+    try:
+        store.cancel_booking(booking_id, expected_version=expected_version)
+    except StaleBookingError:
+        raise BookingError("This booking was changed or cancelled in another session. Please review it and try again.", "stale")
+    store.log_transaction(transaction_entry(
+        "Cancellation", booking['Room'], booking['Date'], booking['Start Time'], booking['End Time'],
+        booking['Booked By'], booking['Meeting Title'], booking['Contact Number'], password, booking_id
+    ))
+    return 1
+
+
+# Function to check requested room names against the room registry; returns them (all rooms when none are given)
+def _known_rooms(store, rooms):
+    unknown = [room for room in rooms or [] if room not in store.room_names]
+    if unknown:
+        raise BookingError(f"Unknown room: {', '.join(map(str, unknown))}")
+    return rooms or store.room_names
+
+
+# Function to list the free stretches of rooms on a date: {room: [(start, end), ...]} (empty when closed)
+def free_times(store, date, rooms=None):
+    store.refresh()
+    date_str = date.strftime('%Y-%m-%d')
+    return {
+        room: [] if store.business_calendar.is_closed(date, room) else availability.free_intervals(store.day_mask(room, date_str))
+        for room in _known_rooms(store, rooms)
+    }
+
+
+# Function to search the next free slots of a duration (in 30-minute slots) from a date, in rooms holding
+# at least headcount people; returns a list of (date, room, start, end)
+def search_free_slots(store, earliest_date, duration_slots, headcount=1, rooms=None, limit=10):
+    store.refresh()
+    rooms = [r for r in _known_rooms(store, rooms) if store.room_capacity[r] >= headcount]
+    if not rooms:
+        raise BookingError("No room can hold that many attendees.")
+    return availability.find_free_slots(
+        store.day_mask, rooms, earliest_date, duration_slots, store.business_calendar.is_closed, limit=limit, not_before=datetime.now()
+    )
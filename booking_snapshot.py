@@ -0,0 +1,49 @@
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Without pyarrow the store simply reads SQLite on every cold start
+    pa = pq = None
+
+# Columnar (Parquet) snapshots of the bookings table and the transaction log, stored next to the database.
+# A snapshot keeps the typed columns of the in-memory frames (datetime64 times, categorical Room/Booked By,
+# string contact numbers) so a cold start is one memory-mapped read with no re-parsing.
+# Each file carries the key of the data it was taken from in its schema metadata; a snapshot whose
+# key no longer matches the database is ignored and rewritten by the next load.
+SNAPSHOT_KEY = b"booking_snapshot_key"
+
+
+# Function to return the snapshot file of a table (e.g. bookings.db.bookings.parquet)
+def snapshot_path(db_path, table):
+    return db_path + "." + table + ".parquet"
+
+
+# Function to read a snapshot taken for the given key; returns None if it is missing, stale or unreadable
+def read_snapshot(path, key):
+    if pq is None or not os.path.exists(path):
+        return None
+    try:
+        if (pq.read_schema(path).metadata or {}).get(SNAPSHOT_KEY) != key.encode():
+            return None
+        return pq.read_table(path, memory_map=True).to_pandas()
+    except (OSError, pa.ArrowException):
+        return None
+
+
+# Function to write a snapshot of a frame for the given key (written to a temporary file, then renamed,
+# so readers never see a partial file). Snapshots are only a cache: failures are ignored.
+def write_snapshot(frame, path, key):
+    if pa is None:
+        return False
+    table = pa.Table.from_pandas(frame)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), SNAPSHOT_KEY: key.encode()})
+    temp_path = path + "." + str(os.getpid()) + ".tmp"
+    try:
+        pq.write_table(table, temp_path)
+        os.replace(temp_path, path)
+    except (OSError, pa.ArrowException):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
@@ -0,0 +1,390 @@
+import threading
+import uuid
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+import audit_trail
+import booking_db
+import booking_snapshot
+import history_export
+from availability import FULL_DAY_MASK, hours_mask
+from business_days import BusinessCalendar
+from booking_index import RoomIntervalIndex
+from instrumentation import timed
+from write_behind import WriteBehindLog
+from booking_db import BOOKING_COLUMNS, BookingConflictError, StaleBookingError  # noqa: F401 (re-exported for the pages)
+
+# Process-wide booking store shared by every page and session.
+# Data lives in SQLite (see booking_db.py); the bookings table (today and later only; past bookings
+# are rolled into the month-partitioned archive once a day) is read into a DataFrame once,
+# from its columnar snapshot when that is still current (see booking_snapshot.py),
+# and only re-read when another connection commits a change to it (PRAGMA data_version, then the
+# data generation in meta, so commits of the write-behind journal don't count). Writes made through
+# the store are single-row transactions, after which the in-memory frame is updated directly.
+# With write_behind=True (the Streamlit server) transaction log rows are queued and group-committed
+# by a background thread (see write_behind.py); reads of the log flush the queue first.
+class BookingStore:
+    def __init__(self, db_path=booking_db.DB_FILE, write_behind=False):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.version = 0
+        self.transaction_log = None  # Loaded on first use (Admin Page only), then extended incrementally
+        self.conn = booking_db.connect(db_path)
+        booking_db.import_csv_files(self.conn)  # No-op once the CSV files have been imported
+        booking_db.import_rooms(self.conn)  # No-op unless rooms.csv changed
+        booking_db.ensure_rollups(self.conn)
+        self.password_salt = booking_db.get_password_salt(self.conn)
+        self.usage_rollup = None  # (store version, (usage, users)) cached for the Usage Dashboard
+        self.archived_through = None
+        self._roll_archive()
+        self.reload()
+        self.log_writer = WriteBehindLog(db_path) if write_behind else None  # Replays rows left by a crash
+
+    # Function to re-read bookings and blocked dates from the database
+    @timed("store_reload")
+    def reload(self):
+        with self.lock:
+            self.data_version = booking_db.data_version(self.conn)
+            self.data_generation = booking_db.data_generation(self.conn)
+            self.bookings = self._load_bookings()
+            self.room_index = RoomIntervalIndex.from_bookings(self.bookings)
+            self.password_index = {}  # password hash -> set of booking ids
+            for booking_id, password_hash in zip(self.bookings.index, self.bookings['Password Hash']):
+                self.password_index.setdefault(password_hash, set()).add(booking_id)
+            self._load_blocked_dates()
+            self._load_rooms()
+            self.version += 1
+
+    # Function to load the blocked dates (all rooms and single rooms) and build the business-day calendar
+    def _load_blocked_dates(self):
+        self.blocked_dates = booking_db.read_blocked_dates(self.conn)
+        self.room_blocked_dates = booking_db.read_room_blocked_dates(self.conn)
+        self.business_calendar = BusinessCalendar(self.blocked_dates['Blocked Date'], self.room_blocked_dates)
+        self.room_blocked_days = set(zip(self.room_blocked_dates['Room'], self.room_blocked_dates['Blocked Date'].dt.strftime('%Y-%m-%d')))
+
+    # Function to load the room registry and derive the per-room lookups the pages use on every rerun
+    def _load_rooms(self):
+        self.rooms = booking_db.read_rooms(self.conn)
+        self.room_names = self.rooms['Name'].tolist()
+        self.room_capacity = dict(zip(self.rooms['Name'], self.rooms['Capacity'].astype(int)))
+        self.room_colors = dict(zip(self.rooms['Name'], self.rooms['Colour']))
+        # Slots outside a room's operating hours count as busy in its day masks
+        self.room_closed_masks = {
+            name: FULL_DAY_MASK & ~hours_mask(datetime.strptime(opens, '%H:%M'), datetime.strptime(closes, '%H:%M'))
+            for name, opens, closes in zip(self.rooms['Name'], self.rooms['Opens'], self.rooms['Closes'])
+        }
+        self.room_open_slots = {name: bin(FULL_DAY_MASK & ~mask).count("1") for name, mask in self.room_closed_masks.items()}
+
+    # Function to load the hot bookings from the snapshot, or from SQLite (then rewriting the snapshot)
+    @timed("load_bookings")
+    def _load_bookings(self):
+        path = booking_snapshot.snapshot_path(self.db_path, "bookings")
+        bookings = booking_snapshot.read_snapshot(path, booking_db.bookings_snapshot_key(self.conn))
+        if bookings is None or bookings.empty:  # Parquet cannot keep the categorical dtype of an empty column
+            bookings, key = booking_db.read_bookings_with_key(self.conn)
+            booking_snapshot.write_snapshot(bookings, path, key)
+        return bookings
+
+    # Function to move bookings dated before today into the archive (at most once per day);
+    # returns True if any booking was moved
+    def _roll_archive(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        if self.archived_through == today:
+            return False
+        moved = booking_db.archive_past_bookings(self.conn, today)
+        self.archived_through = today
+        return moved > 0
+
+    # Function to reload only if another connection has committed changes to bookings, blocked dates
+    # or rooms (or the day has rolled over); the data generation is only read once data_version moves
+    def refresh(self):
+        with self.lock:
+            if self._roll_archive():
+                self.reload()
+            elif booking_db.data_version(self.conn) != self.data_version:
+                self.data_version = booking_db.data_version(self.conn)
+                if booking_db.data_generation(self.conn) != self.data_generation:
+                    self.reload()
+            return self.bookings
+
+    # Function to run one of the store's own writes (applied to the in-memory copy by the caller) and move
+    # the loaded data generation past it; if another connection committed since the last refresh,
+    # the generation is left behind so the next refresh reloads
+    def _write(self, write, *args):
+        with booking_db.transaction(self.conn):
+            current = booking_db.data_generation(self.conn) == self.data_generation
+            result = write(self.conn, *args)
+            generation = booking_db.data_generation(self.conn)
+        if current:
+            self.data_generation = generation
+        return result
+
+    # Function to return the bookings dated in [start_date, end_date) (YYYY-MM-DD strings);
+    # the hot set is used as is, and only the archive partitions of past months in the range are read
+    @timed("load_bookings_window")
+    def bookings_between(self, start_date, end_date):
+        with self.lock:
+            bookings = self.refresh()
+            if start_date >= self.archived_through:
+                return bookings
+            months = pd.period_range(start_date[:7], min(end_date, self.archived_through)[:7], freq='M').strftime('%Y-%m')
+            archived = booking_db.read_archived_bookings(self.conn, months)
+        return pd.concat([archived, bookings])
+
+    # Function to read every booking, past and upcoming (Admin Page only)
+    @timed("load_all_bookings")
+    def read_all_bookings(self):
+        with self.lock:
+            bookings = self.refresh()
+            archived = booking_db.read_archived_bookings(self.conn)
+        return pd.concat([archived, bookings]).sort_index()
+
+    # Function to publish a new bookings frame (readers in other sessions keep the previous one)
+    def _publish(self, bookings):
+        self.bookings = bookings
+        self.version += 1
+
+    # Function to set (or append) one row of a bookings frame, keeping the categorical columns categorical
+    @staticmethod
+    def _set_row(bookings, booking_id, columns, values):
+        for column, value in zip(columns, values):
+            if column in booking_db.CATEGORY_COLUMNS and value not in bookings[column].cat.categories:
+                bookings[column] = bookings[column].cat.add_categories([value])
+        bookings.loc[booking_id, columns] = values
+
+    # Function to hash a meeting password with this database's salt
+    def hash_password(self, password):
+        return booking_db.hash_password(self.password_salt, password)
+
+    # Function to replace a plaintext "Password" entry with its "Password Hash"
+    def _with_password_hash(self, record):
+        record = dict(record)
+        if "Password" in record:
+            record["Password Hash"] = self.hash_password(record.pop("Password"))
+        return record
+
+    # Function to add a new booking (dict keyed by BOOKING_COLUMNS, with a plaintext "Password");
+    # raises BookingConflictError on overlap
+    def add_booking(self, booking):
+        return self.add_bookings([booking])[0]
+
+    # Function to add several bookings in one transaction (all or nothing); returns their ids
+    @timed("write_bookings")
+    def add_bookings(self, new_bookings):
+        with self.lock:
+            self.refresh()
+            new_bookings = [self._with_password_hash(booking) for booking in new_bookings]
+            booking_ids = self._write(booking_db.insert_bookings, new_bookings)
+            bookings = self.bookings.copy()
+            for booking_id, booking in zip(booking_ids, new_bookings):
+                self._set_row(bookings, booking_id, BOOKING_COLUMNS + ["Version", "Series"], [booking[column] for column in BOOKING_COLUMNS] + [1, booking.get("Series")])
+                self.room_index.add(booking_id, booking["Room"], booking["Date"], pd.Timestamp(booking["Start Time"]), pd.Timestamp(booking["End Time"]))
+                self.password_index.setdefault(booking["Password Hash"], set()).add(booking_id)
+            bookings['Version'] = bookings['Version'].astype('int64')  # Appending a row upcasts the column to float
+            self._publish(bookings)
+            return booking_ids
+
+    # Function to add the occurrences of a recurring booking under a new series id; returns their ids
+    def add_booking_series(self, occurrences):
+        series = uuid.uuid4().hex[:12]
+        return self.add_bookings([dict(booking, Series=series) for booking in occurrences])
+
+    # Function to update fields of an existing booking by its id and return its new version.
+    # With expected_version the write only happens if nobody changed the booking since that version
+    # (StaleBookingError otherwise), so sessions never overwrite each other's edits.
+    def update_booking(self, booking_id, changes, expected_version=None):
+        expected_versions = None if expected_version is None else {booking_id: expected_version}
+        return self.update_bookings({booking_id: changes}, expected_versions)[booking_id]
+
+    # Function to update several bookings ({id: changes}) in one transaction; returns {id: new version}
+    @timed("write_bookings")
+    def update_bookings(self, changes_by_id, expected_versions=None):
+        with self.lock:
+            self.refresh()
+            versions = self._write(booking_db.update_bookings, changes_by_id, expected_versions)
+            bookings = self.bookings.copy()
+            for booking_id, changes in changes_by_id.items():
+                self._set_row(bookings, booking_id, list(changes.keys()) + ["Version"], list(changes.values()) + [versions[booking_id]])
+                row = bookings.loc[booking_id]
+                self.room_index.update(booking_id, row['Room'], row['Date'], pd.Timestamp(row['Start Time']), pd.Timestamp(row['End Time']))
+            self._publish(bookings)
+            return versions
+
+    # Function to remove a booking by its id (a compare-and-swap when expected_version is given)
+    def cancel_booking(self, booking_id, expected_version=None):
+        self.cancel_bookings([booking_id], None if expected_version is None else {booking_id: expected_version})
+
+    # Function to remove several bookings in one transaction
+    @timed("write_bookings")
+    def cancel_bookings(self, booking_ids, expected_versions=None):
+        with self.lock:
+            self.refresh()
+            self._write(booking_db.delete_bookings, booking_ids, expected_versions)
+            # Ids no longer in the frame were already removed (e.g. cancelled in another session without a version)
+            booking_ids = [booking_id for booking_id in booking_ids if booking_id in self.bookings.index]
+            for booking_id in booking_ids:
+                self.room_index.remove(booking_id)
+                self.password_index.get(self.bookings.loc[booking_id, 'Password Hash'], set()).discard(booking_id)
+            self._publish(self.bookings.drop(booking_ids))
+
+    # Function to list the bookings of a recurring series dated after a given YYYY-MM-DD date
+    def series_bookings(self, series, after_date):
+        bookings = self.bookings
+        return bookings[(bookings['Series'] == series) & (bookings['Date'] > after_date)]
+
+    # Function to return the id of the first booking overlapping [start, end) in a room, or None
+    @timed("conflict_check")
+    def find_conflict(self, room, date, start, end, exclude_id=None):
+        return self.room_index.find_conflict(room, date, pd.Timestamp(start), pd.Timestamp(end), exclude_id)
+
+    # Function to list the ids of all bookings overlapping [start, end) in a room
+    @timed("conflict_check")
+    def find_conflicts(self, room, date, start, end, exclude_id=None):
+        return self.room_index.conflicts(room, date, pd.Timestamp(start), pd.Timestamp(end), exclude_id)
+
+    # Function to find the bookings made with a meeting password, dated after a given YYYY-MM-DD date
+    # (hash lookup in the password index; plaintext is never compared)
+    def find_by_password(self, password, after_date):
+        bookings = self.bookings
+        ids = sorted(i for i in self.password_index.get(self.hash_password(password), ()) if i in bookings.index)
+        matched = bookings.loc[ids]
+        return matched[matched['Date'] > after_date]
+
+    # Function to return the busy-slot bitmask of a room on a date (see availability.py), including the
+    # slots outside the room's operating hours (a date blocked for the room is busy all day),
+    # optionally ignoring some bookings
+    def day_mask(self, room, date, exclude_ids=()):
+        if (room, date) in self.room_blocked_days:
+            return FULL_DAY_MASK
+        return self.room_index.day_mask(room, date, exclude_ids) | self.room_closed_masks.get(room, 0)
+
+    # Function to read the usage rollups (re-read from the database only after a write)
+    @timed("load_usage_rollup")
+    def read_usage_rollup(self):
+        with self.lock:
+            self.refresh()
+            if self.usage_rollup is None or self.usage_rollup[0] != self.version:
+                self.usage_rollup = (self.version, booking_db.read_usage_rollup(self.conn))
+            return self.usage_rollup[1]
+
+    # Function to append one row to the transaction log (a plaintext "Password" is stored hashed)
+    def log_transaction(self, entry):
+        self.log_transactions([entry])
+
+    # Function to append several rows to the transaction log in one transaction (or queue them, with write_behind)
+    @timed("write_transaction_log")
+    def log_transactions(self, entries):
+        entries = [self._with_password_hash(entry) for entry in entries]
+        if self.log_writer is not None:
+            self.log_writer.enqueue(entries)
+            return
+        with self.lock:
+            booking_db.insert_transactions(self.conn, entries)
+
+    # Function to read the full transaction log (Admin Page only).
+    # The first call starts from the snapshot (the log is append-only, so any snapshot taken since
+    # the last CSV import, in the current log format, is a valid prefix); every call then only fetches rows appended since.
+    @timed("load_transaction_log")
+    def read_transaction_log(self):
+        self._flush_log("transaction_log")  # Read-your-writes: queued rows go to the database before it is read
+        with self.lock:
+            if self.transaction_log is None:
+                path = booking_snapshot.snapshot_path(self.db_path, "transaction_log")
+                key = booking_db.transaction_log_snapshot_key(self.conn)
+                snapshot = booking_snapshot.read_snapshot(path, key)
+                if snapshot is None:
+                    self.transaction_log = booking_db.read_transaction_log(self.conn)
+                    booking_snapshot.write_snapshot(self.transaction_log, path, key)
+                else:
+                    self.transaction_log = snapshot
+                    if self._extend_transaction_log():
+                        booking_snapshot.write_snapshot(self.transaction_log, path, key)
+            else:
+                self._extend_transaction_log()
+            return self.transaction_log
+
+    # Function to append the log rows written since the last read; returns True if there were any
+    def _extend_transaction_log(self):
+        last_id = int(self.transaction_log.index.max()) if not self.transaction_log.empty else 0  # sqlite3 binds numpy ints as blobs
+        new_rows = booking_db.read_transaction_log(self.conn, after_id=last_id)
+        if new_rows.empty:
+            return False
+        transaction_log = pd.concat([self.transaction_log, new_rows])
+        transaction_log[booking_db.LOG_CATEGORY_COLUMNS] = transaction_log[booking_db.LOG_CATEGORY_COLUMNS].astype('category')
+        self.transaction_log = transaction_log
+        return True
+
+    # Function to count the rows of a filtered history view (see booking_db.HISTORY_SOURCES)
+    def count_history(self, table, filters):
+        self._flush_log(table)
+        with self.lock:
+            return booking_db.count_history(self.conn, table, filters)
+
+    # Function to read one page (newest first) of a filtered history view
+    @timed("load_history_page")
+    def history_page(self, table, filters, page, page_size):
+        self._flush_log(table)
+        with self.lock:
+            return booking_db.read_history_page(self.conn, table, filters, page, page_size)
+
+    # Function to list the values a history view can be filtered on (e.g. every user in the log)
+    def history_values(self, table, column):
+        with self.lock:
+            return booking_db.history_values(self.conn, table, column)
+
+    # Function to export a filtered history view to a binary file object as CSV or Parquet, in chunks.
+    # It reads through its own connection, so the shared one stays free while a long export runs.
+    @timed("export_history")
+    def export_history(self, table, filters, export_format, out):
+        self._flush_log(table)
+        conn = booking_db.connect(self.db_path)
+        try:
+            return history_export.export_history(conn, table, filters, export_format, out)
+        finally:
+            conn.close()
+
+    # Function to query the audit trail (see audit_trail.events for the filters), oldest event first
+    @timed("audit_query")
+    def audit_events(self, **filters):
+        self._flush_log("transaction_log")
+        with self.lock:
+            return audit_trail.events(self.conn, **filters)
+
+    # Function to rebuild one booking as it stood at a time (None if it was not booked then)
+    @timed("audit_query")
+    def booking_state_at(self, booking_id, at):
+        self._flush_log("transaction_log")
+        with self.lock:
+            return audit_trail.booking_state_at(self.conn, booking_id, at)
+
+    # Function to rebuild the whole schedule as it stood at a time, from the latest audit checkpoint before it
+    @timed("audit_replay")
+    def schedule_at(self, at):
+        self._flush_log("transaction_log")
+        with self.lock:
+            return audit_trail.schedule_at(self.conn, at)
+
+    # Function to write queued transaction log rows before the log is read (read-your-writes)
+    def _flush_log(self, table):
+        if table == "transaction_log" and self.log_writer is not None:
+            self.log_writer.flush()
+
+    # Function to block additional dates (e.g. a whole range, in one transaction), for every room or only one room
+    def add_blocked_dates(self, dates, room=None):
+        with self.lock:
+            self._write(booking_db.insert_blocked_dates, dates, room)
+            self._load_blocked_dates()
+            self.version += 1
+
+    # Function to unblock dates, for every room or only one room
+    def remove_blocked_dates(self, dates, room=None):
+        with self.lock:
+            self._write(booking_db.delete_blocked_dates, dates, room)
+            self._load_blocked_dates()
+            self.version += 1
+
+
+# Shared store instance (one per Streamlit server process)
+@st.cache_resource(show_spinner=False)
+def get_booking_store():
+    return BookingStore(write_behind=True)
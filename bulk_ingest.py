@@ -0,0 +1,145 @@
+import argparse
+import json
+from datetime import datetime
+import pandas as pd
+import booking_db
+import booking_rules
+from booking_index import RoomIntervalIndex
+from booking_store import BookingStore, BookingConflictError
+
+# Headless batch ingester for booking requests, one JSON object per line, e.g.
+# {"Room": "I-Room (Max 10 Pax)", "Date": "2026-01-05", "Start Time": "09:00", "End Time": "10:00",
+#  "Booked By": "...", "Meeting Title": "...", "Contact Number": "...", "Password": "..."}
+# The file is streamed line by line. Each request is checked with the Book Room rules (booking_rules.py)
+# and against the store's interval index plus an index of the requests accepted so far, and accepted
+# bookings are committed in batches (one transaction and one log batch each).
+# Every line gets a result line: {"line": n, "status": "accepted", "id": ...} or {"line": n, "status": "rejected", "reason": ...}
+DEFAULT_BATCH_SIZE = 500
+
+
+# Function to parse a date/time field of a request (raises ValueError if it is missing or unparseable)
+def _parse_timestamp(request, field):
+    value = pd.Timestamp(str(request.get(field) or ""))
+    if pd.isna(value):
+        raise ValueError(f"missing {field}")
+    return value
+
+
+# Function to turn a request into a booking dict with datetime.date/datetime.time fields
+def parse_request(request):
+    return {
+        "Room": request.get("Room"),
+        "Date": _parse_timestamp(request, "Date").date(),
+        "Start Time": _parse_timestamp(request, "Start Time").time(),
+        "End Time": _parse_timestamp(request, "End Time").time(),
+        "Booked By": request.get("Booked By"),
+        "Meeting Title": request.get("Meeting Title"),
+        "Contact Number": request.get("Contact Number"),
+        "Password": request.get("Password"),
+    }
+
+
+# Function to ingest a JSONL file of booking requests into a store; returns (accepted, rejected) counts
+def ingest(store, requests_path, results_path, batch_size=DEFAULT_BATCH_SIZE, today=None):
+    today = today or datetime.today().date()
+    is_closed_for = store.business_calendar.is_closed
+    pending_index = RoomIntervalIndex()  # Requests accepted in this run but not yet committed
+    batch = []  # (result, booking) of the accepted requests not yet committed
+    results = []  # Results of the lines read since the first pending booking, written in line order once it is committed
+    counts = {"accepted": 0, "rejected": 0}
+
+    with open(requests_path, encoding="utf-8") as requests_file, open(results_path, "w", encoding="utf-8") as results_file:
+        def write_result(result):
+            counts[result["status"]] += 1
+            results_file.write(json.dumps(result) + "\n")
+
+        # With nothing pending, a rejection is written straight away rather than held in memory
+        def reject(line_number, reason):
+            result = {"line": line_number, "status": "rejected", "reason": reason}
+            if batch:
+                results.append(result)
+            else:
+                write_result(result)
+
+        def commit():
+            booking_ids = commit_batch(store, [booking for _, booking in batch]) if batch else []
+            for (result, _), booking_id in zip(batch, booking_ids):
+                if isinstance(booking_id, BookingConflictError):
+                    result.update(status="rejected", reason=f"This room is already booked during the selected time by: {booking_id.booked_by}.")
+                else:
+                    result.update(status="accepted", id=int(booking_id))
+            for result in results:
+                write_result(result)
+            batch.clear()
+            results.clear()
+
+        for line_number, line in enumerate(requests_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                request = parse_request(json.loads(line))
+            except (ValueError, TypeError, AttributeError) as e:
+                reject(line_number, f"Invalid request: {e}")
+                continue
+
+            error = booking_rules.booking_error(
+                request["Room"], request["Date"], request["Start Time"], request["End Time"], request["Booked By"],
+                request["Meeting Title"], request["Contact Number"], request["Password"], lambda d: is_closed_for(d, request["Room"]), today, store.room_names
+            )
+            if error:
+                reject(line_number, error)
+                continue
+
+            date = request["Date"].strftime('%Y-%m-%d')
+            start = pd.Timestamp(datetime.combine(request["Date"], request["Start Time"]))
+            end = pd.Timestamp(datetime.combine(request["Date"], request["End Time"]))
+            conflict_id = store.find_conflict(request["Room"], date, start, end)
+            if conflict_id is not None:
+                reject(line_number, f"This room is already booked during the selected time by: {store.bookings.loc[conflict_id, 'Booked By']}.")
+                continue
+            if pending_index.find_conflict(request["Room"], date, start, end) is not None:
+                reject(line_number, "Overlaps a booking accepted earlier in this file.")
+                continue
+
+            booking = dict(request, **{"Date": date, "Start Time": start, "End Time": end, "Contact Number": str(request["Contact Number"])})
+            pending_index.add(line_number, booking["Room"], date, start, end)
+            results.append({"line": line_number, "status": "pending"})
+            batch.append((results[-1], booking))
+            if len(batch) >= batch_size:
+                commit()
+                pending_index = RoomIntervalIndex()  # Committed bookings are now in the store's index
+        commit()
+    return counts["accepted"], counts["rejected"]
+
+
+# Function to commit a batch in one transaction; if another writer took one of the slots meanwhile,
+# falls back to one transaction per booking. Returns the new id (or the BookingConflictError) per booking.
+def commit_batch(store, bookings):
+    try:
+        results = store.add_bookings(bookings)
+    except BookingConflictError:
+        results = []
+        for booking in bookings:
+            try:
+                results.append(store.add_booking(booking))
+            except BookingConflictError as e:
+                results.append(e)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    store.log_transactions([
+        dict(booking, Action="Booking", User=booking["Booked By"], Timestamp=timestamp, Booking=result)
+        for booking, result in zip(bookings, results) if not isinstance(result, BookingConflictError)
+    ])
+    return results
+
+
+# Run as a script: python bulk_ingest.py requests.jsonl [--results results.jsonl] [--batch-size 500]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest booking requests from a JSONL file.")
+    parser.add_argument("requests", help="JSONL file with one booking request per line")
+    parser.add_argument("--results", help="Per-line result file (default: <requests>.results.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--db", default=booking_db.DB_FILE)
+    args = parser.parse_args()
+    results_path = args.results or args.requests.rsplit(".", 1)[0] + ".results.jsonl"
+    accepted, rejected = ingest(BookingStore(args.db), args.requests, results_path, args.batch_size)
+    print("Accepted %d and rejected %d requests; results written to %s." % (accepted, rejected, results_path))
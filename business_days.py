@@ -0,0 +1,65 @@
+from datetime import date as date_type
+import numpy as np
+import pandas as pd
+
+# Shared business-day calendar: Monday-Friday, minus the blocked dates (np.busdaycalendar holidays).
+# Dates blocked for a single room get their own calendar (the shared holidays plus the room's), so
+# one vectorised np.is_busday call answers a single date or a whole range, for all rooms or one room.
+WEEKMASK = "1111100"
+
+
+# Function to convert a date, a Timestamp, a YYYY-MM-DD string or a list/Series/array of them to datetime64[D]
+def to_days(dates):
+    if isinstance(dates, (date_type, pd.Timestamp, np.datetime64, str)):
+        return np.datetime64(dates, 'D')
+    return np.array(pd.to_datetime(pd.Series(dates)), dtype='datetime64[D]')
+
+
+class BusinessCalendar:
+    # blocked_dates: dates closed for every room; room_blocked_dates: DataFrame of "Room"/"Blocked Date" rows
+    def __init__(self, blocked_dates=(), room_blocked_dates=None):
+        self.holidays = np.unique(to_days(blocked_dates))
+        self.calendar = np.busdaycalendar(weekmask=WEEKMASK, holidays=self.holidays)
+        self.room_calendars = {}
+        if room_blocked_dates is not None:
+            for room, room_dates in room_blocked_dates.groupby('Room', observed=True)['Blocked Date']:
+                holidays = np.union1d(self.holidays, to_days(room_dates))
+                self.room_calendars[room] = np.busdaycalendar(weekmask=WEEKMASK, holidays=holidays)
+
+    # Function to return the calendar of a room (the shared one when the room has no blocks of its own)
+    def for_room(self, room=None):
+        return self.room_calendars.get(room, self.calendar)
+
+    # Function to check whether dates are open (bool for one date, a bool array for several)
+    def is_open(self, dates, room=None):
+        days = to_days(dates)
+        is_open = np.is_busday(days, busdaycal=self.for_room(room))
+        return bool(is_open) if np.ndim(days) == 0 else is_open
+
+    # Function to check whether a date is a weekend or a blocked date (for all rooms, or for one room)
+    def is_closed(self, date, room=None):
+        return not self.is_open(date, room)
+
+    # Function to tell why dates are closed: "Weekend", "Blocked date" or "" when open (array of strings)
+    def closed_reason(self, dates, room=None):
+        days = np.atleast_1d(to_days(dates))
+        weekend = ~np.is_busday(days, weekmask=WEEKMASK)
+        blocked = ~weekend & ~np.is_busday(days, busdaycal=self.for_room(room))
+        return np.select([weekend, blocked], ["Weekend", "Blocked date"], default="")
+
+    # Function to list every day of [start, end] (inclusive) with its open flag, in one call
+    def open_days(self, start, end, room=None):
+        days = np.arange(to_days(start), to_days(end) + 1)
+        return days, np.is_busday(days, busdaycal=self.for_room(room))
+
+    # Function to count the open days of [start, end] (inclusive)
+    def count_open(self, start, end, room=None):
+        return int(np.busday_count(to_days(start), to_days(end) + 1, busdaycal=self.for_room(room)))
+
+
+# Function to expand a date range (inclusive) into a list of datetime.date, optionally without weekends
+def date_range(start, end, skip_weekends=False):
+    days = np.arange(to_days(start), to_days(end) + 1)
+    if skip_weekends:
+        days = days[np.is_busday(days, weekmask=WEEKMASK)]
+    return days.astype(object).tolist()
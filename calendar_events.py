@@ -0,0 +1,69 @@
+import pandas as pd
+from datetime import timedelta
+from instrumentation import timed
+
+
+# Create events for the calendar view with room-specific display (built column-wise, no per-row loop)
+@timed("calendar_events")
+def create_calendar_events(bookings, room_colors, view_type):
+    if bookings.empty:
+        return []
+
+    # Handle missing values with defaults
+    title = bookings['Meeting Title'].fillna('Untitled Meeting').astype(str)
+    booked_by = bookings['Booked By'].astype(object).fillna('Unknown').astype(str)  # Categorical columns cannot be filled with new values
+    room = bookings['Room'].astype(object).fillna('Unspecified Room').astype(str)
+    contact_number = bookings['Contact Number'].fillna('N/A').astype(str)  # Optional field for contact
+    start_time = bookings['Start Time']
+    end_time = bookings['End Time']
+
+    # Format start and end times
+    formatted_start_time = start_time.dt.strftime('%I:%M %p').str.lstrip("0").str.lower()
+    formatted_end_time = end_time.dt.strftime('%I:%M%p').str.lstrip("0").str.lower()
+
+    # Adjust title and description based on view type
+    if view_type == "dayGridMonth":  # Grid view
+        event_title = "m-" + formatted_end_time
+        event_description = ""  # Grid view doesn't need a detailed description
+    elif view_type == "listMonth":  # List view
+        event_title = booked_by + " (" + contact_number + ") - " + title
+        event_description = (
+            "Room: " + room + "\n"
+            + "Booked by: " + booked_by + "\n"
+            + "Contact: " + contact_number + "\n"
+            + "Meeting Title: " + title + "\n"
+            + "Start: " + formatted_start_time + "\n"
+            + "End: " + formatted_end_time
+        )
+    else:
+        # Default fallback
+        event_title = title
+        event_description = ""
+
+    events = pd.DataFrame({
+        "title": event_title,
+        "start": start_time.dt.strftime('%Y-%m-%dT%H:%M:%S'),
+        "end": end_time.dt.strftime('%Y-%m-%dT%H:%M:%S'),
+        "resourceId": room,
+        "backgroundColor": "#FFFFFF",  # White background for events
+        "borderColor": room.map(room_colors).fillna("#3788d8"),  # Border color based on room
+        "description": event_description,
+    })
+    return events.to_dict("records")
+
+
+# Function to return the [start, end) YYYY-MM-DD date range shown in a month view
+# (the month plus the neighbouring days the grid shows)
+def month_window(month_start):
+    window_start = (month_start - timedelta(days=7)).strftime('%Y-%m-%d')
+    window_end = (month_start + timedelta(days=45)).strftime('%Y-%m-%d')
+    return window_start, window_end
+
+
+# Function to select the bookings shown in a month view, applying the room filter before any event is built
+def bookings_in_window(bookings, room, month_start):
+    window_start, window_end = month_window(month_start)
+    in_window = (bookings['Date'] >= window_start) & (bookings['Date'] < window_end)
+    if room != "All Rooms":
+        in_window &= bookings['Room'] == room
+    return bookings[in_window]
@@ -0,0 +1,75 @@
+import argparse
+import pandas as pd
+import booking_db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Without pyarrow only CSV exports are offered
+    pa = pq = None
+
+# Chunked exports of the transaction log and the booking history (see booking_db.HISTORY_SOURCES).
+# Rows are read from SQLite CHUNK_ROWS at a time and each chunk is encoded and written before the next
+# one is fetched, so memory stays flat however long the history is: CSV is appended chunk by chunk,
+# Parquet gets one row group per chunk. Values are exported as stored, as text.
+CHUNK_ROWS = 5000
+EXPORT_FORMATS = {"CSV": ("text/csv", ".csv"), "Parquet": ("application/vnd.apache.parquet", ".parquet")}
+
+
+# Function to list the export formats available here (Parquet needs pyarrow)
+def export_formats():
+    return [name for name in EXPORT_FORMATS if name != "Parquet" or pq is not None]
+
+
+# Function to write DataFrame chunks with the given columns to a binary file object as CSV
+def write_csv(chunks, columns, out):
+    out.write(pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8"))
+    for chunk in chunks:
+        out.write(chunk.to_csv(index=False, header=False).encode("utf-8"))
+
+
+# Function to write DataFrame chunks with the given columns to a binary file object as Parquet (one row group per chunk)
+def write_parquet(chunks, columns, out):
+    schema = pa.schema([(c, pa.string()) for c in columns])
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk.astype("string"), schema=schema, preserve_index=False))  # e.g. booking ids
+
+
+# Function to export a filtered history view ("transaction_log" or "bookings") to a binary file object;
+# returns the number of rows written
+def export_history(conn, table, filters, export_format, out, chunk_rows=CHUNK_ROWS):
+    columns = booking_db.HISTORY_SOURCES[table][1]
+    rows = [0]
+
+    def counted(chunks):
+        for chunk in chunks:
+            rows[0] += len(chunk)
+            yield chunk
+
+    chunks = counted(booking_db.iter_history(conn, table, filters, chunk_rows))
+    if export_format == "Parquet":
+        write_parquet(chunks, columns, out)
+    else:
+        write_csv(chunks, columns, out)
+    return rows[0]
+
+
+# Run as a script: python history_export.py transaction_log history.csv [--start 2025-01-01] [--room ...] [--format Parquet]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the transaction log or the booking history.")
+    parser.add_argument("table", choices=list(booking_db.HISTORY_SOURCES))
+    parser.add_argument("output", help="File to write")
+    parser.add_argument("--format", choices=export_formats(), default="CSV")
+    parser.add_argument("--start", help="First booking date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last booking date (YYYY-MM-DD)")
+    parser.add_argument("--room", action="append", dest="rooms")
+    parser.add_argument("--user", action="append", dest="users")
+    parser.add_argument("--action", action="append", dest="actions")
+    parser.add_argument("--db", default=booking_db.DB_FILE)
+    args = parser.parse_args()
+
+    filters = {"start": args.start, "end": args.end, "rooms": args.rooms, "users": args.users, "actions": args.actions}
+    with open(args.output, "wb") as output_file:
+        count = export_history(booking_db.connect(args.db), args.table, filters, args.format, output_file)
+    print("Exported %d rows to %s." % (count, args.output))
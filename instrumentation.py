@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+import numpy as np
+
+# Timing spans around the hot paths of a Streamlit rerun (store loads, conflict checks, database writes,
+# calendar events, dashboard groupbys). Off unless BOOKING_PROFILE=1 is set or it is switched on from the
+# Admin Page; while off, span() returns a shared no-op context manager and timed() adds one flag check.
+# Durations go to a rolling window per span (for percentiles) plus cumulative Prometheus histogram
+# buckets. Every finished rerun is appended to a JSON lines file, and the Prometheus text file is
+# rewritten at most every EXPORT_INTERVAL seconds.
+PROFILE_ENV = "BOOKING_PROFILE"
+METRICS_FILE = "booking_metrics.prom"
+RERUNS_FILE = "booking_reruns.jsonl"
+WINDOW = 1000  # Recent durations kept per span for the percentiles
+RECENT_RERUNS = 100
+EXPORT_INTERVAL = 10  # Seconds between rewrites of the Prometheus file
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NO_SPAN = nullcontext()
+
+
+# Rolling window and cumulative histogram of one span's durations (seconds)
+class SpanStats:
+    def __init__(self):
+        self.recent = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds):
+        self.recent.append(seconds)
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+# Context manager timing one span; the duration is added to the span's stats and to the current rerun
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Process-wide span registry (one per Streamlit server, shared by every session thread)
+class Profiler:
+    def __init__(self, enabled=False, metrics_path=METRICS_FILE, reruns_path=RERUNS_FILE):
+        self.enabled = enabled
+        self.metrics_path = metrics_path
+        self.reruns_path = reruns_path
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.reruns = deque(maxlen=RECENT_RERUNS)
+        self.current = threading.local()  # The rerun being timed on this thread, if any
+        self.exported_at = 0.0
+
+    # Function to add one duration to a span (and to the rerun in progress on this thread)
+    def record(self, name, seconds):
+        with self.lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(seconds)
+        rerun = getattr(self.current, "rerun", None)
+        if rerun is not None:
+            rerun["spans"][name] = rerun["spans"].get(name, 0.0) + seconds
+
+    # Function to start timing a rerun of a page (an unfinished rerun on this thread, e.g. after st.stop, is dropped)
+    def begin_rerun(self, page):
+        if not self.enabled:
+            return
+        self.current.rerun = {"page": page, "started": time.time(), "start": time.perf_counter(), "spans": {}}
+
+    # Function to finish the rerun in progress on this thread: records it and exports the metrics
+    def end_rerun(self):
+        rerun = getattr(self.current, "rerun", None)
+        if rerun is None:
+            return
+        self.current.rerun = None
+        seconds = time.perf_counter() - rerun.pop("start")
+        self.record("rerun:" + rerun["page"], seconds)
+        record = {
+            "page": rerun["page"],
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(rerun["started"])),
+            "seconds": round(seconds, 6),
+            "spans": {name: round(value, 6) for name, value in rerun["spans"].items()},
+        }
+        with self.lock:
+            self.reruns.append(record)
+            export = time.monotonic() - self.exported_at >= EXPORT_INTERVAL
+            if export:
+                self.exported_at = time.monotonic()
+        self.append_rerun(record)
+        if export:
+            self.write_prometheus()
+
+    # Function to append one rerun record to the JSON lines file (metrics are best effort: failures are ignored)
+    def append_rerun(self, record):
+        if not self.reruns_path:
+            return
+        try:
+            with open(self.reruns_path, "a", encoding="utf-8") as reruns_file:
+                reruns_file.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+    # Function to render every span as a Prometheus histogram (text exposition format)
+    def prometheus_text(self):
+        lines = [
+            "# HELP booking_span_seconds Time spent in instrumented hot paths of the booking app.",
+            "# TYPE booking_span_seconds histogram",
+        ]
+        with self.lock:
+            for name, stats in sorted(self.spans.items()):
+                label = 'span="%s"' % name.replace("\\", "\\\\").replace('"', '\\"')
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append('booking_span_seconds_bucket{%s,le="%g"} %d' % (label, bound, count))
+                lines.append('booking_span_seconds_bucket{%s,le="+Inf"} %d' % (label, stats.count))
+                lines.append("booking_span_seconds_sum{%s} %.6f" % (label, stats.total))
+                lines.append("booking_span_seconds_count{%s} %d" % (label, stats.count))
+        return "\n".join(lines) + "\n"
+
+    # Function to write the Prometheus text file (to a temporary file, then renamed, for scrapers)
+    def write_prometheus(self):
+        if not self.metrics_path:
+            return
+        temp_path = self.metrics_path + "." + str(os.getpid()) + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as metrics_file:
+                metrics_file.write(self.prometheus_text())
+            os.replace(temp_path, self.metrics_path)
+        except OSError:
+            pass
+
+    # Function to summarise every span: count, p50/p95/p99 and max of the recent window (milliseconds)
+    def summary(self):
+        with self.lock:
+            spans = {name: (stats.count, np.array(stats.recent)) for name, stats in self.spans.items()}
+        rows = []
+        for name, (count, recent) in sorted(spans.items()):
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1000
+            rows.append({"Span": name, "Count": count, "p50 (ms)": p50, "p95 (ms)": p95, "p99 (ms)": p99, "Max (ms)": recent.max() * 1000})
+        return rows
+
+    # Function to list the slowest of the recent reruns, slowest first
+    def slowest_reruns(self, limit=10):
+        with self.lock:
+            reruns = list(self.reruns)
+        return sorted(reruns, key=lambda rerun: rerun["seconds"], reverse=True)[:limit]
+
+    # Function to clear all collected timings
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+            self.reruns.clear()
+
+
+profiler = Profiler(enabled=os.environ.get(PROFILE_ENV, "") not in ("", "0"))
+
+
+# Function to time a block: with span("name"): ...
+def span(name):
+    if not profiler.enabled:
+        return _NO_SPAN
+    return _Span(profiler, name)
+
+
+# Decorator to time every call of a function as a span
+def timed(name):
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            with _Span(profiler, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Function to start timing a page rerun (call at the top of the page script)
+def begin_rerun(page):
+    profiler.begin_rerun(page)
+
+
+# Function to finish timing a page rerun (call at the end of the page script)
+def end_rerun():
+    profiler.end_rerun()
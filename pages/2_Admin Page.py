@@ -1,95 +1,126 @@
+import io
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from booking_store import get_booking_store
+import business_days
+import history_export
+import instrumentation
+from instrumentation import profiler
 
 ADMIN_PASSWORD = "admin123"
 BLOCKED_DATES_PASSWORD = "admin123"  # New password for managing blocked dates
+HISTORY_PAGE_SIZE = 50  # Rows shown per page of the history view
 
-# Load the transaction log
-try:
-    transaction_log = pd.read_csv("transaction_log.csv")
-except FileNotFoundError:
-    transaction_log = pd.DataFrame(columns=[
-        "Action", "Room", "Date", "Start Time", "End Time", "User", "Meeting Title", "Contact Number", "Password", "Timestamp"
-    ])
-
-
-# Load bookings data
-try:
-    bookings = pd.read_csv("bookings.csv")
-    bookings['Start Time'] = pd.to_datetime(bookings['Start Time'])
-    bookings['End Time'] = pd.to_datetime(bookings['End Time'])
-    bookings['Contact Number'] = bookings['Contact Number'].astype(str)  # Ensure contact number is treated as string
-except FileNotFoundError:
-    bookings = pd.DataFrame(columns=["Room", "Date", "Start Time", "End Time", "Booked By", "Meeting Title", "Contact Number", "Password"])
-
-# Load blocked dates from blocked_dates.csv
+# Time this rerun (no-op unless profiling is enabled, see instrumentation.py)
+instrumentation.begin_rerun("Admin Page")
+
+# Shared in-process store, brought up to date with changes committed by other connections
+booking_store = get_booking_store()
+booking_store.refresh()
+
+# Load blocked dates from the database (through the shared store): dates blocked for every room
+# ("All Rooms") and dates blocked for a single room
 def load_blocked_dates():
-    try:
-        blocked_dates = pd.read_csv("blocked_dates.csv")
-        # Ensure the Blocked Date column is parsed as datetime with the correct format
-        blocked_dates['Blocked Date'] = pd.to_datetime(blocked_dates['Blocked Date'], format='%d/%m/%Y')
-        return blocked_dates
-    except FileNotFoundError:
-        return pd.DataFrame(columns=["Blocked Date"])
-
-# Save blocked dates back to blocked_dates.csv
-def save_blocked_dates(blocked_dates):
-    # Ensure the 'Blocked Date' column is in the correct format
-    blocked_dates['Blocked Date'] = blocked_dates['Blocked Date'].dt.strftime('%d/%m/%Y')
-    blocked_dates.to_csv("blocked_dates.csv", index=False)
+    all_rooms = booking_store.blocked_dates.assign(Room="All Rooms")
+    blocked_dates = pd.concat([all_rooms, booking_store.room_blocked_dates], ignore_index=True)
+    return blocked_dates[['Blocked Date', 'Room']].sort_values(['Blocked Date', 'Room'], ignore_index=True)
+
+# Function to label a blocked date for the removal list (room blocks name their room)
+def blocked_date_label(blocked_date, room):
+    label = blocked_date.strftime('%d/%m/%Y')
+    return label if room == "All Rooms" else f"{label} ({room})"
 
 # Admin page
 st.title("Admin Page")
 
-st.subheader("Download Transaction History")
+st.subheader("Transaction and Booking History")
 
 # Password input for admin access (for transaction history only)
 admin_password = st.text_input("Enter Admin Password", type="password")
 
+# Stay logged in across the reruns of the filters, pages and downloads below
 if st.button("Login"):
-    if admin_password == ADMIN_PASSWORD:
-        st.success("Access granted. Welcome to the Admin Dashboard!")
+    st.session_state['admin_logged_in'] = admin_password == ADMIN_PASSWORD
+    if not st.session_state['admin_logged_in']:
+        st.error("Invalid password. Access denied.")
 
-        # Display transaction history
-        try:
-            # Reload the transaction log to ensure it reflects the most recent updates
-            transaction_log = pd.read_csv("transaction_log.csv")
-            booking_log = pd.read_csv("bookings.csv")
-
-            if not transaction_log.empty:
-                # Ensure the Contact Number column is displayed without commas
-                if "Contact Number" in transaction_log.columns:
-                    transaction_log["Contact Number"] = transaction_log["Contact Number"].astype(str)
-                    if "Contact Number" in booking_log.columns:
-                        booking_log["Contact Number"] = booking_log["Contact Number"].astype(str)
-
-                st.write("Below is the transaction history:")
-                st.dataframe(transaction_log, hide_index=True)
-                st.dataframe(booking_log, hide_index=True)
-
-                # Enable CSV download
-                csv = transaction_log.to_csv(index=False)
-                st.download_button(
-                    label="Download Transaction History",
-                    data=csv,
-                    file_name="transaction_log.csv",
-                    mime="text/csv"
-                )
-                csv = booking_log.to_csv(index=False)
-                st.download_button(
-                    label="Download Booking History",
-                    data=csv,
-                    file_name="bookings.csv",
-                    mime="text/csv"
-                )
+if st.session_state.get('admin_logged_in'):
+    st.success("Access granted. Welcome to the Admin Dashboard!")
+
+    # Choose the history to browse: the transaction log or every booking (upcoming and archived)
+    history_name = st.radio("History", ["Transaction History", "Booking History"], horizontal=True)
+    history_table = "transaction_log" if history_name == "Transaction History" else "bookings"
+    user_column = "User" if history_table == "transaction_log" else "Booked By"
+
+    # Filters are applied in the database (indexed by date, room, user and action)
+    filter_dates = st.date_input("Booking Date Range", value=(), format="DD/MM/YYYY")
+    filter_rooms = st.multiselect("Rooms", booking_store.history_values(history_table, "Room"))
+    filter_users = st.multiselect("Users", booking_store.history_values(history_table, user_column))
+    filter_actions = []
+    if history_table == "transaction_log":
+        filter_actions = st.multiselect("Actions", booking_store.history_values(history_table, "Action"))
+    filters = {
+        "start": filter_dates[0].strftime('%Y-%m-%d') if len(filter_dates) > 0 else None,
+        "end": filter_dates[-1].strftime('%Y-%m-%d') if len(filter_dates) > 0 else None,
+        "rooms": filter_rooms,
+        "users": filter_users,
+        "actions": filter_actions,
+    }
+
+    # Only the visible page is read (newest first)
+    total_rows = booking_store.count_history(history_table, filters)
+    if total_rows == 0:
+        st.info(f"No {history_name.lower()} matches the selected filters.")
+    else:
+        page_count = -(-total_rows // HISTORY_PAGE_SIZE)
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+        history_page = booking_store.history_page(history_table, filters, page - 1, HISTORY_PAGE_SIZE)
+        st.write(f"Below is the {history_name.lower()} (rows {(page - 1) * HISTORY_PAGE_SIZE + 1}-{(page - 1) * HISTORY_PAGE_SIZE + len(history_page)} of {total_rows}, newest first):")
+        st.dataframe(history_page, hide_index=True)
+
+        # Downloads are built on request, chunk by chunk from the database (not from the page above)
+        export_format = st.radio("Download Format", history_export.export_formats(), horizontal=True)
+        if st.button("Prepare Download"):
+            export_file = io.BytesIO()
+            booking_store.export_history(history_table, filters, export_format, export_file)
+            mime, extension = history_export.EXPORT_FORMATS[export_format]
+            st.download_button(
+                label=f"Download {history_name}",
+                data=export_file.getvalue(),
+                file_name=history_table + extension,
+                mime=mime
+            )
+
+    # Audit trail: every event of one booking, and a booking or the whole schedule as it stood at a time
+    st.subheader("Audit Trail")
+    audit_booking = st.number_input("Booking ID (0 for none)", min_value=0, value=0, step=1)
+    as_of_date = st.date_input("As of Date", value=datetime.now().date(), format="DD/MM/YYYY")
+    as_of_time = st.time_input("As of Time", value=datetime.now().time().replace(second=0, microsecond=0))
+    as_of = datetime.combine(as_of_date, as_of_time)
+
+    if audit_booking:
+        booking_events = booking_store.audit_events(booking=audit_booking)
+        if booking_events.empty:
+            st.info(f"No events were logged for booking {audit_booking}.")
+        else:
+            st.write(f"Events of booking {audit_booking}:")
+            st.dataframe(booking_events, hide_index=True)
+            booking_state = booking_store.booking_state_at(audit_booking, as_of)
+            if booking_state is None:
+                st.info(f"Booking {audit_booking} was not booked on {as_of.strftime('%d/%m/%Y %H:%M')}.")
             else:
-                st.info("The transaction history is currently empty.")
-        except FileNotFoundError:
-            st.error("No transaction history file found.")
+                st.write(f"Booking {audit_booking} as of {as_of.strftime('%d/%m/%Y %H:%M')}:")
+                st.dataframe(pd.DataFrame([booking_state]), hide_index=True)
 
-    else:
-        st.error("Invalid password. Access denied.")
+    if st.button("Show Schedule as of Date and Time"):
+        schedule = booking_store.schedule_at(as_of)
+        st.write(f"{len(schedule)} bookings as of {as_of.strftime('%d/%m/%Y %H:%M')}:")
+        st.dataframe(schedule, hide_index=True)
+
+    if st.button("Log Out"):
+        st.session_state['admin_logged_in'] = False
+        st.rerun()
 
 
 # Blocked Dates Section
@@ -111,39 +142,110 @@ if blocked_dates_password == BLOCKED_DATES_PASSWORD:
         st.dataframe(blocked_dates, hide_index=True)
 
         # Allow the admin to select blocked dates for removal
-        dates_to_remove = st.multiselect("Select Blocked Dates to Remove", options=blocked_dates['Blocked Date'].dt.strftime('%d/%m/%Y').tolist())
+        blocked_labels = {
+            blocked_date_label(blocked_date, room): (blocked_date, room)
+            for blocked_date, room in zip(blocked_dates['Blocked Date'], blocked_dates['Room'])
+        }
+        dates_to_remove = st.multiselect("Select Blocked Dates to Remove", options=list(blocked_labels))
 
         if st.button("Remove Selected Blocked Dates"):
-            # Remove the selected dates from the DataFrame
-            blocked_dates = blocked_dates[~blocked_dates['Blocked Date'].dt.strftime('%d/%m/%Y').isin(dates_to_remove)]
+            # Remove the selected dates from the database (one transaction per room)
+            dates_by_room = {}
+            for label in dates_to_remove:
+                blocked_date, room = blocked_labels[label]
+                dates_by_room.setdefault(room, []).append(blocked_date)
+            for room, dates in dates_by_room.items():
+                booking_store.remove_blocked_dates(dates, None if room == "All Rooms" else room)
             # Update session state with modified blocked dates
+            blocked_dates = load_blocked_dates()
             st.session_state['blocked_dates'] = blocked_dates
-            # Save the updated blocked dates back to CSV
-            save_blocked_dates(blocked_dates)
             st.success("Selected blocked dates have been removed.")
 
     else:
         st.info("No blocked dates found.")
 
-    # Add new blocked date
-    st.write("Add a New Blocked Date:")
+    # Add a new blocked date or date range, for every room or a single room
+    st.write("Add a New Blocked Date or Date Range:")
 
-    new_blocked_date = st.text_input("Enter a blocked date (DD/MM/YYYY)", "")
+    new_blocked_date = st.text_input("Enter a blocked date (DD/MM/YYYY) or range (DD/MM/YYYY - DD/MM/YYYY)", "")
+    block_room = st.selectbox("Block for", ["All Rooms"] + booking_store.room_names)
+    skip_weekends = st.checkbox("Skip weekends in a range", value=True)
 
     if st.button("Add Blocked Date"):
         try:
-            # Parse the new blocked date
-            new_date = datetime.strptime(new_blocked_date, "%d/%m/%Y")
-            # Append the new date to the blocked dates dataframe
-            new_blocked_row = pd.DataFrame({"Blocked Date": [new_date]})
-            blocked_dates = pd.concat([blocked_dates, new_blocked_row], ignore_index=True)
-            # Update session state with new blocked dates
-            st.session_state['blocked_dates'] = blocked_dates
-            # Save the updated blocked dates back to CSV
-            save_blocked_dates(blocked_dates)
-            st.success(f"The date {new_date.strftime('%d/%m/%Y')} has been blocked.")
+            # Parse the new blocked date (or the first and last date of the range)
+            range_dates = [datetime.strptime(part.strip(), "%d/%m/%Y") for part in new_blocked_date.split("-")]
+            if len(range_dates) > 2:
+                raise ValueError(new_blocked_date)
+            start_date, end_date = range_dates[0], range_dates[-1]
+            new_dates = business_days.date_range(start_date, end_date, skip_weekends and end_date > start_date)
+            room_note = "" if block_room == "All Rooms" else f" for {block_room}"
+
+            if end_date < start_date:
+                st.error("The end of the range must not be before its start.")
+            elif not new_dates:
+                st.error("The range contains no weekdays to block.")
+            else:
+                # Save every date of the range to the database in one transaction
+                booking_store.add_blocked_dates(new_dates, None if block_room == "All Rooms" else block_room)
+                # Update session state with new blocked dates
+                blocked_dates = load_blocked_dates()
+                st.session_state['blocked_dates'] = blocked_dates
+                if len(new_dates) == 1:
+                    st.success(f"The date {start_date.strftime('%d/%m/%Y')} has been blocked{room_note}.")
+                else:
+                    st.success(f"{len(new_dates)} dates from {start_date.strftime('%d/%m/%Y')} to {end_date.strftime('%d/%m/%Y')} have been blocked{room_note}.")
 
         except ValueError:
-            st.error("Invalid date format. Please enter the date in DD/MM/YYYY format.")
+            st.error("Invalid date format. Please enter the date in DD/MM/YYYY format, or a range as DD/MM/YYYY - DD/MM/YYYY.")
 else:
     st.info("Enter the correct password to manage blocked dates.")
+
+
+# Performance Section (admin only)
+st.subheader("Performance")
+
+# Password input for the performance panel
+performance_password = st.text_input("Enter Admin Password to View Performance", type="password")
+
+if performance_password == ADMIN_PASSWORD:
+    # Profiling is process-wide: switching it on times every session's reruns
+    profiler.enabled = st.toggle("Enable profiling", value=profiler.enabled)
+
+    span_summary = pd.DataFrame(profiler.summary())
+    if span_summary.empty:
+        st.info("No timings recorded yet. Enable profiling and use the app to collect them.")
+    else:
+        st.write("Timings per span (recent window):")
+        st.dataframe(span_summary.round(2), hide_index=True)
+
+        st.write("Slowest recent reruns:")
+        slowest = pd.DataFrame([
+            {
+                "Page": rerun["page"],
+                "Timestamp": rerun["timestamp"],
+                "Total (ms)": round(rerun["seconds"] * 1000, 2),
+                "Slowest Spans": ", ".join(
+                    f"{name} {seconds * 1000:.1f} ms"
+                    for name, seconds in sorted(rerun["spans"].items(), key=lambda item: item[1], reverse=True)[:3]
+                ),
+            }
+            for rerun in profiler.slowest_reruns()
+        ])
+        st.dataframe(slowest, hide_index=True)
+
+        st.download_button(
+            label="Download Prometheus Metrics",
+            data=profiler.prometheus_text(),
+            file_name=instrumentation.METRICS_FILE,
+            mime="text/plain"
+        )
+
+        if st.button("Reset Timings"):
+            profiler.reset()
+            st.success("Timings have been reset.")
+else:
+    st.info("Enter the correct password to view performance timings.")
+
+# Finish timing this rerun
+instrumentation.end_rerun()
@@ -3,24 +3,22 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
+from booking_store import get_booking_store
+import usage_stats
+from availability import SLOTS_PER_DAY
+from usage_stats import business_day_calendar, filter_calendar, utilization_by, with_date
+import instrumentation
+from instrumentation import span
 
-# Function to load and preprocess bookings data
-def load_bookings():
-    bookings = pd.read_csv('./bookings.csv')
-    bookings['Date'] = pd.to_datetime(bookings['Date'])
-    bookings['Start Time'] = pd.to_datetime(bookings['Start Time'])
-    bookings['End Time'] = pd.to_datetime(bookings['End Time'])
-    bookings['Year'] = bookings['Date'].dt.year
-    bookings['Month'] = bookings['Date'].dt.month
-    bookings['Day'] = bookings['Date'].dt.day
-    return bookings
+# Time this rerun (no-op unless profiling is enabled, see instrumentation.py)
+instrumentation.begin_rerun("Usage Dashboard")
+
+# Function to load the pre-aggregated usage rollups (maintained by the shared store on every booking write)
+def load_usage():
+    usage, users = get_booking_store().read_usage_rollup()
+    return with_date(usage), with_date(users)
 
 
-# Function to load and preprocess blocked dates
-def load_blocked_dates():
-    blocked_dates = pd.read_csv('./blocked_dates.csv')
-    blocked_dates['Blocked Date'] = pd.to_datetime(blocked_dates['Blocked Date'], format='%d/%m/%Y')
-    return blocked_dates
 
 st.set_page_config(
     page_title="Booking Usage Dashboard",
@@ -29,27 +27,26 @@ st.set_page_config(
 )
 
 # Load data
-bookings = load_bookings()
-blocked_dates = load_blocked_dates()
+usage, usage_users = load_usage()
 
-# Store bookings and blocked dates in session state
-if 'bookings' not in st.session_state:
-    st.session_state.bookings = bookings
-if 'blocked_dates' not in st.session_state:
-    st.session_state.blocked_dates = blocked_dates
+# Store usage rollups in session state (they always follow the shared store)
+st.session_state.usage = usage
+st.session_state.usage_users = usage_users
 
 # Sidebar for filtering dashboard
 with st.sidebar:
     st.header("Filter options")
     
     # Year selection with 'All Years' option
-    selected_year = st.selectbox("Select Year", options=['All Years'] + [str(year) for year in sorted(st.session_state.bookings['Year'].unique(), reverse=True)])
+    selected_year = st.selectbox("Select Year", options=['All Years'] + [str(year) for year in sorted(st.session_state.usage['Year'].unique(), reverse=True)])
     
     # Filter data for selected year (if not 'All Years' selected)
     if selected_year != 'All Years':
-        filtered_by_year = st.session_state.bookings[st.session_state.bookings['Year'] == int(selected_year)]
+        filtered_by_year = st.session_state.usage[st.session_state.usage['Year'] == int(selected_year)]
+        users_by_year = st.session_state.usage_users[st.session_state.usage_users['Year'] == int(selected_year)]
     else:
-        filtered_by_year = st.session_state.bookings  # Use all data if 'All Years' is selected
+        filtered_by_year = st.session_state.usage  # Use all data if 'All Years' is selected
+        users_by_year = st.session_state.usage_users
 
     # Room selection with an option for 'All Rooms'
     selected_room = st.selectbox("Select Room", options=['All Rooms'] + sorted(filtered_by_year['Room'].unique().tolist()))
@@ -67,73 +64,54 @@ with st.sidebar:
     # Day of the month filter (1, 2, 3, etc.)
     day_of_month = st.multiselect("Select Day(s) of the Month", options=list(range(1, 32)))
 
-# Filter the bookings data for the selected room, year, month, and day
+# Filter the usage rollups for the selected room, year, month, and day
 if selected_room == 'All Rooms':
-    filtered_bookings = filtered_by_year
+    filtered_usage = filtered_by_year
+    filtered_users = users_by_year
 else:
-    filtered_bookings = filtered_by_year[filtered_by_year['Room'] == selected_room]
+    filtered_usage = filtered_by_year[filtered_by_year['Room'] == selected_room]
+    filtered_users = users_by_year[users_by_year['Room'] == selected_room]
 
 if selected_month:
-    filtered_bookings = filtered_bookings[filtered_bookings['Month'] == selected_month]
+    filtered_usage = filtered_usage[filtered_usage['Month'] == selected_month]
+    filtered_users = filtered_users[filtered_users['Month'] == selected_month]
 
 if day_of_month:
-    filtered_bookings = filtered_bookings[filtered_bookings['Day'].isin(day_of_month)]
+    filtered_usage = filtered_usage[filtered_usage['Day'].isin(day_of_month)]
+    filtered_users = filtered_users[filtered_users['Day'].isin(day_of_month)]
 
 # Check if there are no bookings after filtering
-if filtered_bookings.empty:
+if filtered_usage.empty:
     st.warning("No bookings found for the selected filters.")
 else:
-    # Define available time slots (8 AM to 6 PM, 30-minute intervals)
-    def available_time_slots(year, month, day_of_month=None):
-        # Get the first and last date of the selected month
-        first_day = datetime(year, month, 1)
-        last_day = datetime(year, month, 1) + pd.DateOffset(months=1) - pd.DateOffset(days=1)
-
-        # Generate a list of all dates in the month
-        all_dates = pd.date_range(start=first_day, end=last_day, freq='D')
-
-        # Filter by the selected days of the month (if any)
-        if day_of_month:
-            available_dates = all_dates[all_dates.day.isin(day_of_month)]
-        else:
-            available_dates = all_dates
-
-        # Blocked dates filtering
-        blocked_dates = st.session_state.blocked_dates['Blocked Date'].dt.date
-        available_dates = [d for d in available_dates if d.date() not in blocked_dates.values]
-
-        # Number of available dates
-        num_available_dates = len(available_dates)
-
-        # Multiply by slots per day (20 slots per day from 8 AM to 6 PM)
-        return num_available_dates * 20  # 20 slots per day (8 AM - 6 PM)
-
-    # Calculate booked time slots (number of time slots booked)
-    def booked_time_slots(bookings):
-        total_booked_slots = 0
-        for _, row in bookings.iterrows():
-            start_time = row['Start Time']
-            end_time = row['End Time']
-            # Calculate the difference in minutes and divide by 30 for slots
-            booked_slots = (end_time - start_time).total_seconds() / 1800  # 1800 seconds = 30 minutes
-            total_booked_slots += booked_slots
-        return total_booked_slots
-
-    # Get available time slots based on filtered data
-    if selected_month and selected_year:
-        available_slots = available_time_slots(int(selected_year), selected_month, day_of_month)
+    # Slots open per day from the room registry (operating hours of the selected room, or of every room)
+    room_open_slots = get_booking_store().room_open_slots
+    if selected_room == 'All Rooms':
+        room_slots = room_open_slots
     else:
-        available_slots = 0
-
-    # Get booked time slots from the filtered bookings
-    booked_slots = booked_time_slots(filtered_bookings)
-
-    # Adjust available slots if "All Rooms" is selected
-    adjustment_factor = 2 if selected_room == 'All Rooms' else 1
-    adjusted_available_slots = available_slots * adjustment_factor
-
-    # Calculate the utilization rate (booked slots / adjusted available slots)
-    utilization_rate = (booked_slots / adjusted_available_slots) * 100 if adjusted_available_slots > 0 else 0
+        room_slots = {selected_room: room_open_slots.get(selected_room, SLOTS_PER_DAY)}
+
+    # Business-day calendar (weekends and blocked dates closed) covering every year in the data
+    working_days = business_day_calendar(
+        datetime(int(st.session_state.usage['Year'].min()), 1, 1),
+        datetime(int(st.session_state.usage['Year'].max()), 12, 31),
+        get_booking_store().business_calendar, room_slots
+    )
+    filtered_days = filter_calendar(
+        working_days,
+        year=int(selected_year) if selected_year != 'All Years' else None,
+        month=selected_month,
+        days=day_of_month
+    )
+
+    # Get available time slots based on the filtered calendar days
+    available_slots = usage_stats.available_slots(filtered_days)
+
+    # Get booked time slots from the filtered usage rollups
+    booked_slots = usage_stats.booked_slots(filtered_usage).sum()
+
+    # Calculate the utilization rate (booked slots / available slots)
+    utilization_rate = (booked_slots / available_slots) * 100 if available_slots > 0 else 0
 
     # Display key metrics
     with st.container():
@@ -153,12 +131,12 @@ else:
         )
         met2.metric(
             label="Total Bookings",
-            value=filtered_bookings.shape[0],
+            value=int(filtered_usage['Bookings'].sum()),
             help="Total number of bookings for the selected period"
         )
         met3.metric(
             label="Unique Users",
-            value=filtered_bookings['Booked By'].nunique(),
+            value=filtered_users['User'].nunique(),
             help="Number of unique users who made bookings"
         )
 
@@ -173,16 +151,10 @@ else:
         with subtab_monthly:
             st.subheader("Monthly Utilization Rate")
             all_months = pd.MultiIndex.from_product(
-                [filtered_bookings['Year'].unique(), range(1, 13)], names=['Year', 'Month']
+                [filtered_usage['Year'].unique(), range(1, 13)], names=['Year', 'Month']
             ).to_frame(index=False)
 
-            monthly_utilization = (
-                filtered_bookings.groupby(['Year', 'Month'])
-                .apply(lambda df: (
-                    (booked_time_slots(df) / (available_time_slots(df['Year'].iloc[0], df['Month'].iloc[0]) * adjustment_factor)) * 100
-                ))
-                .reset_index(name="Utilization Rate")
-            )
+            monthly_utilization = utilization_by(filtered_usage, filtered_days, ['Year', 'Month'])
             monthly_utilization = all_months.merge(monthly_utilization, on=['Year', 'Month'], how='left').fillna(0)
             monthly_utilization['Month Name'] = monthly_utilization['Month'].apply(lambda x: datetime(1900, x, 1).strftime('%b'))
 
@@ -196,17 +168,11 @@ else:
         with subtab_daily:
             st.subheader("Daily Utilization Rate")
             all_dates = pd.date_range(
-                start=filtered_bookings['Date'].min(), end=filtered_bookings['Date'].max(), freq='D'
+                start=filtered_usage['Date'].min(), end=filtered_usage['Date'].max(), freq='D'
             )
             all_dates_df = pd.DataFrame(all_dates, columns=['Date'])
 
-            daily_utilization = (
-                filtered_bookings.groupby(filtered_bookings['Date'])
-                .apply(lambda df: (
-                    (booked_time_slots(df) / (available_time_slots(df['Year'].iloc[0], df['Month'].iloc[0], [df['Day'].iloc[0]]) * adjustment_factor)) * 100
-                ))
-                .reset_index(name="Utilization Rate")
-            )
+            daily_utilization = utilization_by(filtered_usage, filtered_days, ['Date'])
             daily_utilization = all_dates_df.merge(daily_utilization, on='Date', how='left').fillna(0)
 
             fig = px.line(
@@ -223,7 +189,8 @@ else:
 
         with subtab_monthly:
             st.subheader("Monthly Total Bookings")
-            monthly_bookings = filtered_bookings.groupby(['Year', 'Month'])['Room'].count().reset_index(name="Total Bookings")
+            with span("dashboard_groupby"):
+                monthly_bookings = filtered_usage.groupby(['Year', 'Month'])['Bookings'].sum().reset_index(name="Total Bookings")
             monthly_bookings = all_months.merge(monthly_bookings, on=['Year', 'Month'], how='left').fillna(0)
             monthly_bookings['Month Name'] = monthly_bookings['Month'].apply(lambda x: datetime(1900, x, 1).strftime('%b'))
 
@@ -236,7 +203,8 @@ else:
 
         with subtab_daily:
             st.subheader("Daily Total Bookings")
-            daily_bookings = filtered_bookings.groupby('Date')['Room'].count().reset_index(name="Total Bookings")
+            with span("dashboard_groupby"):
+                daily_bookings = filtered_usage.groupby('Date')['Bookings'].sum().reset_index(name="Total Bookings")
             daily_bookings = all_dates_df.merge(daily_bookings, on='Date', how='left').fillna(0)
 
             fig = px.line(
@@ -253,7 +221,8 @@ else:
 
         with subtab_monthly:
             st.subheader("Monthly Unique Users")
-            monthly_users = filtered_bookings.groupby(['Year', 'Month'])['Booked By'].nunique().reset_index(name="Unique Users")
+            with span("dashboard_groupby"):
+                monthly_users = filtered_users.groupby(['Year', 'Month'])['User'].nunique().reset_index(name="Unique Users")
             monthly_users = all_months.merge(monthly_users, on=['Year', 'Month'], how='left').fillna(0)
             monthly_users['Month Name'] = monthly_users['Month'].apply(lambda x: datetime(1900, x, 1).strftime('%b'))
 
@@ -266,7 +235,8 @@ else:
 
         with subtab_daily:
             st.subheader("Daily Unique Users")
-            daily_users = filtered_bookings.groupby('Date')['Booked By'].nunique().reset_index(name="Unique Users")
+            with span("dashboard_groupby"):
+                daily_users = filtered_users.groupby('Date')['User'].nunique().reset_index(name="Unique Users")
             daily_users = all_dates_df.merge(daily_users, on='Date', how='left').fillna(0)
 
             fig = px.line(
@@ -276,3 +246,5 @@ else:
             )
             st.plotly_chart(fig, use_container_width=True)
 
+# Finish timing this rerun
+instrumentation.end_rerun()
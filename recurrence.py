@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from availability import slot_mask
+
+# Recurrence options of the Book a Room tab: weeks between occurrences
+FREQUENCIES = {"Weekly": 1, "Biweekly": 2}
+MAX_OCCURRENCES = 52
+
+
+# Function to expand a series into its occurrence dates: every interval_weeks from first_date,
+# either a number of occurrences or up to (and including) an end date, capped at MAX_OCCURRENCES
+def expand_series(first_date, interval_weeks, occurrences=None, until=None):
+    step = pd.Timedelta(weeks=interval_weeks)
+    if occurrences is not None:
+        dates = pd.date_range(first_date, periods=min(occurrences, MAX_OCCURRENCES), freq=step)
+    else:
+        dates = pd.date_range(first_date, until, freq=step)[:MAX_OCCURRENCES]
+    return [d.date() for d in dates]
+
+
+# Function to check every occurrence of a series in one pass: weekends and blocked dates with one vectorised
+# business-calendar query (calendar is a BusinessCalendar, see business_days.py), overlaps by AND-ing the
+# requested slots with each day's busy mask (day_mask_for, e.g. BookingStore.day_mask).
+# Returns a DataFrame with one row per date and a "Status" of "Available", "Weekend", "Blocked date" or "Booked".
+def check_series(dates, room, start_time, end_time, day_mask_for, calendar):
+    date_strings = [d.strftime('%Y-%m-%d') for d in dates]
+    requested = slot_mask(start_time, end_time)
+    masks = np.array([day_mask_for(room, d) for d in date_strings], dtype=np.int64)
+
+    closed = calendar.closed_reason(dates, room)
+    booked = (masks & requested) != 0
+    status = np.select([closed != "", booked], [closed, "Booked"], default="Available")
+    return pd.DataFrame({"Date": date_strings, "Status": status})
@@ -0,0 +1,48 @@
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_store import BookingStore  # noqa: E402
+
+# Shared fixtures: a store on a fresh database in a temporary directory (no CSV history to import),
+# with a registry of two rooms of different sizes
+ROOMS_CSV = """Name,Capacity,Site,Opens,Closes,Colour
+Small Room,4,HQ,08:00,18:00,#2196F3
+Large Room,12,HQ,08:00,18:00,#4CAF50
+"""
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "rooms.csv").write_text(ROOMS_CSV)
+    return BookingStore(str(tmp_path / "bookings.db"))
+
+
+# A weekday at least a week ahead, so bookings on it are never in the past
+@pytest.fixture
+def workday():
+    day = date.today() + timedelta(days=7)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+# Function to build a booking dict for BookingStore.add_booking(s) on a day, from HH:MM times
+@pytest.fixture
+def make_booking():
+    def make(room, day, start, end, booked_by="Alice", password="secret"):
+        return {
+            "Room": room,
+            "Date": day.strftime('%Y-%m-%d'),
+            "Start Time": datetime.combine(day, time.fromisoformat(start)),
+            "End Time": datetime.combine(day, time.fromisoformat(end)),
+            "Booked By": booked_by,
+            "Meeting Title": "Planning",
+            "Contact Number": "91234567",
+            "Password": password,
+        }
+    return make
@@ -0,0 +1,76 @@
+import json
+from datetime import time
+import allocation
+from availability import slot_mask
+
+ROOMS = {"Small Room": 4, "Large Room": 12}
+MONDAY = "2030-01-07"
+
+
+def line(**fields):
+    return json.dumps(dict({"Date": MONDAY, "Headcount": 3, "Duration": 60}, **fields))
+
+
+def allocate(requests, busy=None, closed=False):
+    busy = busy or {}
+    return allocation.allocate(requests, ROOMS, lambda room, date: busy.get(room, 0), lambda date: closed)
+
+
+def test_malformed_lines_are_rejected_one_at_a_time(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text("\n".join([
+        line(),
+        "{not json",
+        line(Headcount="8"),  # A number given as a string is accepted
+        line(Headcount=None),
+        line(Headcount="many"),
+        line(Duration=0),
+        json.dumps({"Headcount": 3, "Duration": 60}),
+        "[1]",
+        line(),
+    ]) + "\n")
+    requests, rejected = allocation.read_requests(str(path))
+    assert [r["Line"] for r in requests] == [1, 3, 9]
+    assert requests[1]["Headcount"] == 8
+    assert [r["line"] for r in rejected] == [2, 4, 5, 6, 7, 8]
+    assert all(r["status"] == "rejected" and r["reason"].startswith("Invalid request:") for r in rejected)
+    assert [r["reason"] for r in rejected[1:5]] == [
+        "Invalid request: missing Headcount",
+        "Invalid request: Headcount is not a number",
+        "Invalid request: Duration must be at least 1",
+        "Invalid request: missing Date",
+    ]
+    assert all("Room" in result for result in allocate(requests))
+
+
+def test_duration_is_rounded_up_to_whole_slots():
+    assert allocation.parse_request(line(Duration=45), 1)["Slots"] == 2
+
+
+def test_group_goes_to_the_smallest_room_that_holds_it():
+    small, large = allocate([allocation.parse_request(line(Headcount=3), 1), allocation.parse_request(line(Headcount=8), 2)])
+    assert small["Room"] == "Small Room"
+    assert large["Room"] == "Large Room"
+
+
+def test_group_moves_up_a_tier_when_its_own_is_full():
+    request = allocation.parse_request(line(Headcount=3, Earliest="09:00", Latest="10:00"), 1)
+    result, = allocate([request], busy={"Small Room": slot_mask(time(9), time(10))})
+    assert result == {"Room": "Large Room", "Start Time": time(9), "End Time": time(10)}
+
+
+def test_start_packs_against_existing_bookings():
+    result, = allocate([allocation.parse_request(line(), 1)], busy={"Small Room": slot_mask(time(11), time(12))})
+    assert result["Room"] == "Small Room"
+    assert result["Start Time"] in (time(8), time(10), time(12))
+
+
+def test_unallocatable_requests_get_a_reason():
+    too_big, too_short = allocate([
+        allocation.parse_request(line(Headcount=20), 1),
+        allocation.parse_request(line(Duration=120, Earliest="09:00", Latest="10:00"), 2),
+    ])
+    assert too_big == {"Reason": "No room can hold 20 attendees."}
+    assert too_short == {"Reason": "The time window is shorter than the meeting."}
+    closed, = allocate([allocation.parse_request(line(), 1)], closed=True)
+    assert closed["Reason"].startswith("The meeting room is closed")
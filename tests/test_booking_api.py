@@ -0,0 +1,76 @@
+import json
+from http.client import HTTPConnection
+import pytest
+import booking_api
+
+
+@pytest.fixture
+def api(store):
+    server = booking_api.start(store, port=0)
+
+    def request(method, path, body=None):
+        connection = HTTPConnection(*server.server_address)
+        connection.request(method, path, body=None if body is None else json.dumps(body), headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        result = response.status, json.loads(response.read())
+        connection.close()
+        return result
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def booking_body(day, start="09:00", end="10:00", **fields):
+    return dict({
+        "Room": "Small Room", "Date": day.strftime('%Y-%m-%d'), "Start Time": start, "End Time": end,
+        "Booked By": "Alice", "Meeting Title": "Planning", "Contact Number": "91234567", "Password": "secret",
+    }, **fields)
+
+
+def test_rooms_and_availability(api, workday):
+    status, rooms = api("GET", "/rooms")
+    assert status == 200
+    assert [room["Name"] for room in rooms] == ["Small Room", "Large Room"]
+    status, result = api("GET", f"/availability?date={workday}&room=Small+Room")
+    assert status == 200
+    assert result["Rooms"] == {"Small Room": [{"Start Time": "08:00", "End Time": "18:00"}]}
+
+
+def test_unknown_room_is_a_bad_request(api, workday):
+    assert api("GET", f"/availability?date={workday}&room=Nope") == (400, {"error": "Unknown room: Nope"})
+    assert api("GET", f"/search?date={workday}&room=Nope")[0] == 400
+
+
+def test_book_edit_and_cancel(api, workday):
+    status, result = api("POST", "/bookings", booking_body(workday))
+    assert status == 201
+    booking_id = result["ids"][0]
+    assert api("PATCH", f"/bookings/{booking_id}", {"Password": "secret", "Version": 1, "Meeting Title": "Review"}) == (200, {"changed": 1})
+    status, result = api("POST", "/bookings/lookup", {"Password": "secret"})
+    assert [(b["id"], b["Meeting Title"], b["Version"]) for b in result["Bookings"]] == [(booking_id, "Review", 2)]
+    assert api("DELETE", f"/bookings/{booking_id}", {"Password": "secret", "Version": 2}) == (200, {"cancelled": 1})
+
+
+@pytest.mark.parametrize("fields", [
+    {"Meeting Title": 5},
+    {"Contact Number": 91234567},
+    {"Booked By": ["Alice"]},
+    {"Room": None, "Date": "not a date"},
+    {"End Time": "08:00"},
+])
+def test_invalid_booking_is_a_bad_request(api, workday, store, fields):
+    status, result = api("POST", "/bookings", booking_body(workday, **fields))
+    assert status == 400
+    assert "error" in result
+    assert store.bookings.empty
+
+
+def test_errors_map_to_statuses(api, workday):
+    booking_id = api("POST", "/bookings", booking_body(workday))[1]["ids"][0]
+    status, result = api("POST", "/bookings", booking_body(workday, start="09:30", end="10:30", **{"Booked By": "Bob"}))
+    assert (status, result) == (409, {"error": "This room is already booked during the selected time by: Alice."})
+    assert api("DELETE", f"/bookings/{booking_id}", {"Password": "wrong"})[0] == 404
+    assert api("PATCH", f"/bookings/{booking_id}", {"Password": "secret", "Meeting Title": 5})[0] == 400
+    api("PATCH", f"/bookings/{booking_id}", {"Password": "secret", "Meeting Title": "Review"})
+    assert api("DELETE", f"/bookings/{booking_id}", {"Password": "secret", "Version": 1})[0] == 409
+    assert api("GET", "/nowhere")[0] == 404
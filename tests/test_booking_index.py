@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+import booking_db
+from booking_index import RoomIntervalIndex
+
+
+def ts(hhmm):
+    return pd.Timestamp("2030-01-07 " + hhmm)
+
+
+@pytest.fixture
+def index():
+    index = RoomIntervalIndex()
+    index.add(1, "Small Room", "2030-01-07", ts("08:00"), ts("12:00"))
+    index.add(2, "Small Room", "2030-01-07", ts("09:00"), ts("09:30"))
+    index.add(3, "Small Room", "2030-01-07", ts("13:00"), ts("14:00"))
+    return index
+
+
+def test_overlaps_are_found_in_start_order(index):
+    assert index.conflicts("Small Room", "2030-01-07", ts("09:00"), ts("13:30")) == [1, 2, 3]
+
+
+def test_long_earlier_booking_is_found_past_shorter_ones(index):
+    # Booking 2 ends before 10:00, but booking 1 (started earlier) still runs until 12:00
+    assert index.find_conflict("Small Room", "2030-01-07", ts("10:00"), ts("10:30")) == 1
+
+
+def test_touching_bookings_do_not_conflict(index):
+    assert index.find_conflict("Small Room", "2030-01-07", ts("12:00"), ts("13:00")) is None
+    assert index.find_conflict("Large Room", "2030-01-07", ts("09:00"), ts("10:00")) is None
+
+
+def test_exclude_id_sets_a_booking_aside(index):
+    assert index.conflicts("Small Room", "2030-01-07", ts("08:30"), ts("09:15"), exclude_id=1) == [2]
+
+
+def test_update_and_remove_move_a_booking(index):
+    index.update(1, "Large Room", "2030-01-07", ts("08:00"), ts("12:00"))
+    assert index.find_conflict("Small Room", "2030-01-07", ts("10:00"), ts("10:30")) is None
+    assert index.find_conflict("Large Room", "2030-01-07", ts("10:00"), ts("10:30")) == 1
+    index.remove(1)
+    index.remove(1)  # Removing twice is a no-op
+    assert index.find_conflict("Large Room", "2030-01-07", ts("10:00"), ts("10:30")) is None
+
+
+def test_from_bookings_matches_incremental_adds(index):
+    bookings = pd.DataFrame({
+        "Room": ["Small Room"] * 3,
+        "Date": ["2030-01-07"] * 3,
+        "Start Time": [ts("13:00"), ts("08:00"), ts("09:00")],
+        "End Time": [ts("14:00"), ts("12:00"), ts("09:30")],
+    }, index=[3, 1, 2])
+    assert RoomIntervalIndex.from_bookings(bookings).days == index.days
+
+
+def test_store_index_follows_writes(store, workday, make_booking):
+    booking_id = store.add_booking(make_booking("Small Room", workday, "09:00", "10:00"))
+    date = workday.strftime('%Y-%m-%d')
+    start, end = pd.Timestamp(f"{date} 09:30"), pd.Timestamp(f"{date} 10:30")
+    assert store.find_conflict("Small Room", date, start, end) == booking_id
+    store.cancel_booking(booking_id)
+    assert store.find_conflict("Small Room", date, start, end) is None
+
+
+def test_edit_overlapping_own_booking_is_allowed(store, workday, make_booking):
+    first, second = store.add_bookings([
+        make_booking("Small Room", workday, "09:00", "10:00"),
+        make_booking("Small Room", workday, "11:00", "12:00"),
+    ])
+    store.update_booking(second, {"Start Time": pd.Timestamp(f"{workday} 09:30"), "End Time": pd.Timestamp(f"{workday} 10:30")})
+    assert store.bookings.loc[second, "Version"] == 2
+
+
+def test_edit_overlapping_another_users_booking_past_own_booking_is_rejected(store, workday, make_booking):
+    # The first overlap in start order is the user's own booking; the other user's booking comes after it
+    _, _, moved = store.add_bookings([
+        make_booking("Small Room", workday, "09:00", "10:00"),
+        make_booking("Small Room", workday, "10:00", "11:00", booked_by="Bob"),
+        make_booking("Small Room", workday, "12:00", "13:00"),
+    ])
+    with pytest.raises(booking_db.BookingConflictError) as e:
+        store.update_booking(moved, {"Start Time": pd.Timestamp(f"{workday} 09:00"), "End Time": pd.Timestamp(f"{workday} 11:00")})
+    assert e.value.booked_by == "Bob"
@@ -0,0 +1,62 @@
+from datetime import time
+import pytest
+import booking_service
+from booking_db import StaleBookingError
+
+
+def _times(start, end):
+    return time.fromisoformat(start), time.fromisoformat(end)
+
+
+def test_update_with_current_version_bumps_it(store, workday, make_booking):
+    booking_id = store.add_booking(make_booking("Small Room", workday, "09:00", "10:00"))
+    assert store.update_booking(booking_id, {"Meeting Title": "Review"}, expected_version=1) == 2
+    assert store.bookings.loc[booking_id, "Meeting Title"] == "Review"
+    assert store.bookings.loc[booking_id, "Version"] == 2
+
+
+def test_update_with_stale_version_is_rejected(store, workday, make_booking):
+    booking_id = store.add_booking(make_booking("Small Room", workday, "09:00", "10:00"))
+    store.update_booking(booking_id, {"Meeting Title": "Review"}, expected_version=1)
+    with pytest.raises(StaleBookingError):
+        store.update_booking(booking_id, {"Meeting Title": "Retro"}, expected_version=1)
+    assert store.bookings.loc[booking_id, "Meeting Title"] == "Review"
+
+
+def test_cancel_with_stale_version_is_rejected(store, workday, make_booking):
+    booking_id = store.add_booking(make_booking("Small Room", workday, "09:00", "10:00"))
+    store.update_booking(booking_id, {"Meeting Title": "Review"})
+    with pytest.raises(StaleBookingError):
+        store.cancel_booking(booking_id, expected_version=1)
+    assert booking_id in store.bookings.index
+
+
+def test_cancel_of_already_cancelled_booking_without_version(store, workday, make_booking):
+    booking_id = store.add_booking(make_booking("Small Room", workday, "09:00", "10:00"))
+    store.cancel_booking(booking_id)
+    store.cancel_booking(booking_id)  # e.g. a second session cancelling the same booking
+    assert booking_id not in store.bookings.index
+    assert store.find_by_password("secret", workday.strftime('%Y-%m-%d')).empty
+
+
+def test_service_reports_a_stale_edit_and_cancel(store, workday):
+    booking_id = booking_service.book(store, "Small Room", workday, *_times("09:00", "10:00"), "Alice", "Planning", "91234567", "secret")
+    booking_service.edit(store, booking_id, "secret", meeting_title="Review", expected_version=1)
+    for change in (
+        lambda: booking_service.edit(store, booking_id, "secret", meeting_title="Retro", expected_version=1),
+        lambda: booking_service.cancel(store, booking_id, "secret", expected_version=1),
+    ):
+        with pytest.raises(booking_service.BookingError) as e:
+            change()
+        assert e.value.code == "stale"
+
+
+def test_service_reports_a_cancelled_booking_the_user_saw_as_stale(store, workday):
+    booking_id = booking_service.book(store, "Small Room", workday, *_times("09:00", "10:00"), "Alice", "Planning", "91234567", "secret")
+    booking_service.cancel(store, booking_id, "secret", expected_version=1)
+    with pytest.raises(booking_service.BookingError) as e:
+        booking_service.cancel(store, booking_id, "secret", expected_version=1)
+    assert e.value.code == "stale"
+    with pytest.raises(booking_service.BookingError) as e:
+        booking_service.cancel(store, booking_id, "secret")
+    assert e.value.code == "not_found"
@@ -0,0 +1,56 @@
+import json
+import pytest
+import bulk_ingest
+
+
+@pytest.fixture
+def ingest_file(store, tmp_path):
+    def ingest(lines, batch_size=bulk_ingest.DEFAULT_BATCH_SIZE):
+        requests_path, results_path = tmp_path / "requests.jsonl", tmp_path / "results.jsonl"
+        requests_path.write_text("\n".join(lines) + "\n")
+        counts = bulk_ingest.ingest(store, str(requests_path), str(results_path), batch_size)
+        return counts, [json.loads(line) for line in results_path.read_text().splitlines()]
+    return ingest
+
+
+def request(day, start, end, **fields):
+    return json.dumps(dict({
+        "Room": "Small Room", "Date": day.strftime('%Y-%m-%d'), "Start Time": start, "End Time": end,
+        "Booked By": "Alice", "Meeting Title": "Planning", "Contact Number": "91234567", "Password": "secret",
+    }, **fields))
+
+
+def test_every_line_gets_a_result_in_line_order(store, workday, ingest_file):
+    (accepted, rejected), results = ingest_file([
+        "{not json",
+        request(workday, "09:00", "10:00"),
+        "",
+        "[]",
+        request(workday, "09:30", "10:30"),  # Overlaps line 2
+        request(workday, "11:00", "12:00", **{"Meeting Title": ""}),
+        request(workday, "11:00", "12:00"),
+    ], batch_size=1)
+    assert (accepted, rejected) == (2, 4)
+    assert [(r["line"], r["status"]) for r in results] == [
+        (1, "rejected"), (2, "accepted"), (4, "rejected"), (5, "rejected"), (6, "rejected"), (7, "accepted"),
+    ]
+    assert results[0]["reason"].startswith("Invalid request:")
+    assert results[4]["reason"] == "Please enter a meeting title."
+    assert set(store.bookings.index) == {results[1]["id"], results[5]["id"]}
+
+
+def test_overlap_within_one_batch_is_rejected(store, workday, ingest_file):
+    _, results = ingest_file([request(workday, "09:00", "10:00"), request(workday, "09:30", "10:30")])
+    assert [r["status"] for r in results] == ["accepted", "rejected"]
+    assert results[1]["reason"] == "Overlaps a booking accepted earlier in this file."
+
+
+def test_overlap_with_a_stored_booking_is_rejected(store, workday, make_booking, ingest_file):
+    store.add_booking(make_booking("Small Room", workday, "09:00", "10:00", booked_by="Bob"))
+    _, results = ingest_file([request(workday, "09:30", "10:30")])
+    assert results == [{"line": 1, "status": "rejected", "reason": "This room is already booked during the selected time by: Bob."}]
+
+
+def test_missing_fields_are_rejected(store, workday, ingest_file):
+    _, results = ingest_file([request(workday, "09:00", "10:00", **{"Start Time": None})])
+    assert results == [{"line": 1, "status": "rejected", "reason": "Invalid request: missing Start Time"}]
@@ -0,0 +1,47 @@
+from datetime import date, time, timedelta
+import pytest
+import booking_service
+import recurrence
+
+
+def test_expand_weekly_by_occurrences():
+    assert recurrence.expand_series(date(2030, 1, 7), 1, occurrences=3) == [date(2030, 1, 7), date(2030, 1, 14), date(2030, 1, 21)]
+
+
+def test_expand_biweekly_until_includes_the_end_date():
+    assert recurrence.expand_series(date(2030, 1, 7), 2, until=date(2030, 2, 4)) == [date(2030, 1, 7), date(2030, 1, 21), date(2030, 2, 4)]
+
+
+def test_expand_is_capped():
+    assert len(recurrence.expand_series(date(2030, 1, 7), 1, occurrences=500)) == recurrence.MAX_OCCURRENCES
+    assert len(recurrence.expand_series(date(2030, 1, 7), 1, until=date(2040, 1, 1))) == recurrence.MAX_OCCURRENCES
+
+
+def _book_series(store, day, **options):
+    return booking_service.book_series(
+        store, "Small Room", day, time(9), time(10), "Alice", "Planning", "91234567", "secret", 1, **options
+    )
+
+
+def test_series_is_booked_under_one_series_id(store, workday):
+    booking_ids, skipped = _book_series(store, workday, occurrences=3)
+    series = store.bookings.loc[booking_ids]
+    assert skipped.empty
+    assert series["Series"].nunique() == 1
+    assert list(series["Date"]) == [(workday + timedelta(weeks=i)).strftime('%Y-%m-%d') for i in range(3)]
+
+
+def test_series_with_a_booked_date_is_rejected_whole(store, workday, make_booking):
+    store.add_booking(make_booking("Small Room", workday + timedelta(weeks=1), "09:30", "10:30", booked_by="Bob"))
+    with pytest.raises(booking_service.BookingError) as e:
+        _book_series(store, workday, occurrences=3)
+    assert e.value.code == "conflict"
+    assert e.value.details.to_dict("records") == [{"Date": (workday + timedelta(weeks=1)).strftime('%Y-%m-%d'), "Status": "Booked"}]
+    assert len(store.bookings) == 1
+
+
+def test_series_can_skip_unavailable_dates(store, workday):
+    store.add_blocked_dates([workday + timedelta(weeks=2)])
+    booking_ids, skipped = _book_series(store, workday, occurrences=3, skip_unavailable=True)
+    assert len(booking_ids) == 2
+    assert skipped.to_dict("records") == [{"Date": (workday + timedelta(weeks=2)).strftime('%Y-%m-%d'), "Status": "Blocked date"}]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from availability import SLOT_MINUTES
+from instrumentation import timed
+
+
+# Function to build a business-day calendar: one row per date with an "Open" flag (False on weekends and
+# dates blocked for every room) and the "Open Slots" of the given rooms that day. calendar is the shared
+# BusinessCalendar (see business_days.py) and room_slots maps room -> slots open per day
+# (BookingStore.room_open_slots); a date blocked for one room only closes that room's slots.
+@timed("dashboard_calendar")
+def business_day_calendar(start, end, calendar, room_slots):
+    days, is_open = calendar.open_days(start, end)
+    open_slots = np.zeros(len(days), dtype=np.int64)
+    for room, slots in room_slots.items():
+        open_slots += calendar.open_days(start, end, room)[1] * slots
+    frame = pd.DataFrame({
+        'Date': pd.to_datetime(days),
+        'Open': is_open,
+        'Open Slots': open_slots,
+    })
+    frame['Year'] = frame['Date'].dt.year
+    frame['Month'] = frame['Date'].dt.month
+    frame['Day'] = frame['Date'].dt.day
+    return frame
+
+
+# Function to keep only the calendar days matching the dashboard filters
+def filter_calendar(calendar, year=None, month=None, days=None):
+    keep = np.ones(len(calendar), dtype=bool)
+    if year is not None:
+        keep &= (calendar['Year'] == year).values
+    if month is not None:
+        keep &= (calendar['Month'] == month).values
+    if days:
+        keep &= calendar['Day'].isin(days).values
+    return calendar[keep]
+
+
+# Function to convert the booked minutes of usage rollup rows into 30-minute slots (column-wise)
+def booked_slots(usage):
+    return usage['Booked Minutes'] / SLOT_MINUTES
+
+
+# Function to count the bookable slots on the open days of a calendar
+def available_slots(calendar):
+    return int(calendar['Open Slots'].sum())
+
+
+# Function to compute the utilization rate (%) per group: one groupby-sum of booked slots
+# over the usage rollup rows, divided by the open slots of each group in the business-day calendar
+@timed("dashboard_utilization")
+def utilization_by(usage, calendar, keys):
+    booked = usage.assign(**{'Booked Slots': booked_slots(usage)}).groupby(keys)['Booked Slots'].sum()
+    available = calendar.groupby(keys)['Open Slots'].sum()
+    booked = booked.reindex(available.index, fill_value=0)
+    rate = (booked / available.where(available > 0)).fillna(0) * 100
+    return rate.reset_index(name="Utilization Rate")
+
+
+# Function to add a datetime "Date" column built from the Year/Month/Day columns of rollup rows
+def with_date(rollup):
+    rollup = rollup.copy()
+    rollup['Date'] = pd.to_datetime(rollup[['Year', 'Month', 'Day']])
+    return rollup
@@ -0,0 +1,139 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import booking_db
+from instrumentation import span
+
+# Write-behind queue for the transaction log. A booking, edit or cancellation is committed to the
+# bookings table synchronously (its conflict check needs the write lock), but its log row only has
+# to be durable eventually: log_transactions() appends it to a journal file and returns, and a
+# background thread group-commits everything queued during the last flush interval in one transaction.
+# The journal is what makes the queue crash safe. The database stores how many journal bytes it
+# already holds (meta "log_queue_offset", written in the same transaction as the rows), so on
+# start-up the rows after that offset are replayed exactly once; the journal is emptied whenever
+# the queue drains. One write-behind store (Streamlit server process) per database.
+FLUSH_INTERVAL = 0.5  # Seconds a burst of log rows is coalesced before it is written
+# fsync policy of the journal: "always" before log_transactions() returns (survives power loss),
+# "flush" once per group commit, "never" (left to the OS; still survives a process crash)
+FSYNC_POLICIES = ("always", "flush", "never")
+DEFAULT_FSYNC = "flush"
+OFFSET_KEY = "log_queue_offset"
+
+
+# Function to return the journal file of a database (e.g. bookings.db.log-queue.jsonl)
+def journal_path(db_path):
+    return db_path + ".log-queue.jsonl"
+
+
+class WriteBehindLog:
+    def __init__(self, db_path, flush_interval=FLUSH_INTERVAL, fsync=DEFAULT_FSYNC):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync!r}")
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.path = journal_path(db_path)
+        self.conn = booking_db.connect(db_path)
+        self.lock = threading.Lock()  # Guards the journal file and the queue
+        self.flush_lock = threading.Lock()  # One group commit at a time
+        self.pending = []  # Rows in the journal that are not yet in the database
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.replay()
+        self.journal = open(self.path, "ab")
+        self.journal_size = self.journal.tell()
+        self.thread = threading.Thread(target=self._run, name="transaction-log-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # Function to write the journal rows left over from a previous run (e.g. after a crash) to the database
+    def replay(self):
+        offset = int(booking_db.get_meta(self.conn, OFFSET_KEY, 0))
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if offset > size:  # The journal was emptied but the offset not yet reset
+            offset = 0
+        rows, end = [], offset
+        if size > offset:
+            with open(self.path, "rb") as journal:
+                journal.seek(offset)
+                for line in journal:
+                    if not line.endswith(b"\n"):  # Torn last write: the caller never got an answer for it
+                        break
+                    rows.append(json.loads(line))
+                    end += len(line)
+        if rows:
+            self._commit(rows, end)
+        with open(self.path, "wb"):
+            pass
+        self._reset_offset()
+        return len(rows)
+
+    # Function to queue log rows (dicts keyed by LOG_COLUMNS); returns once they are in the journal
+    def enqueue(self, entries):
+        rows = [{c: booking_db.to_db_value(entry.get(c)) for c in booking_db.LOG_COLUMNS} for entry in entries]
+        data = b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+        with self.lock:
+            self.journal.write(data)
+            self.journal.flush()
+            if self.fsync == "always":
+                os.fsync(self.journal.fileno())
+            self.journal_size += len(data)
+            self.pending.extend(rows)
+        self.wake.set()
+
+    # Function to write every queued row to the database in one transaction; returns the number written
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                rows, self.pending = self.pending, []
+                end = self.journal_size
+            if not rows:
+                return 0
+            try:
+                if self.fsync == "flush":
+                    os.fsync(self.journal.fileno())
+                self._commit(rows, end)
+            except BaseException:
+                with self.lock:
+                    self.pending[:0] = rows  # Keep the rows (and their order) for the next attempt
+                raise
+            with self.lock:
+                if not self.pending:  # Drained: empty the journal so it never grows past one burst
+                    self.journal.truncate(0)
+                    self.journal_size = 0
+                    self._reset_offset()
+            return len(rows)
+
+    # Function to insert journal rows and record the journal offset they end at, in one transaction
+    def _commit(self, rows, end):
+        with span("flush_transaction_log"):
+            with booking_db.transaction(self.conn):
+                booking_db._insert_transactions(self.conn, rows)
+                booking_db.set_meta(self.conn, OFFSET_KEY, end)
+
+    # Function to reset the stored journal offset after the journal has been emptied
+    def _reset_offset(self):
+        with booking_db.transaction(self.conn):
+            booking_db.set_meta(self.conn, OFFSET_KEY, 0)
+
+    # Background thread: wait for rows, let the burst build up for one flush interval, then group-commit it
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wake.wait()
+            self.stopped.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except (sqlite3.Error, OSError):
+                self.wake.set()  # Rows stay queued (and journalled); retry after the next interval
+
+    # Function to stop the writer thread and write what is still queued
+    def close(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.wake.set()
+        self.thread.join()
+        self.flush()
+        self.journal.close()